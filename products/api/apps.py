@@ -1,5 +1,18 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_migrate
 
 
 class ApiConfig(AppConfig):
     name = 'api'
+
+    def ready(self):
+        # Connect the cache invalidation, search index and product document
+        # signal receivers, and register the system checks.
+        from api import cache, checks, documents  # noqa
+        from api import db, search
+        from api.models.product import clear_interned_vocabulary
+        connection_created.connect(db.apply_sqlite_pragmas)
+        post_migrate.connect(search.setup_search_index, sender=self)
+        # Flushing the database sends post_migrate too.
+        post_migrate.connect(clear_interned_vocabulary, sender=self)
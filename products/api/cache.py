@@ -0,0 +1,372 @@
+# -*- coding: utf-8 -*-
+"""API caches."""
+
+import hashlib
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import router, transaction
+from django.db.models import signals
+from django.utils.encoding import force_bytes
+
+from api.db import use_primary
+from api.models import (Attribute, Category, Country, Industry, Keyword,
+                        Product, ProductAttribute, State)
+from api.models.company import Company
+from api.signals import products_changed
+
+REFERENCE_MODELS = (Industry, Country, State, Category)
+
+
+def get_shared_cache():
+    """
+    Return the cache backend shared by every process, configured through the
+    ``API_SHARED_CACHE`` alias, or ``None`` to keep everything process local.
+    """
+    alias = getattr(settings, 'API_SHARED_CACHE', None)
+    return caches[alias] if alias else None
+
+
+class Versions(object):
+    """
+    Version tokens per model label. A token changes every time the data of
+    the model changes, so anything derived from that data can be keyed or
+    validated by it.
+
+    Tokens live in the shared cache when there is one. Otherwise each
+    process only sees its own changes, so its tokens also expire after
+    ``API_LOCAL_VERSION_TTL`` seconds, which bounds how long it keeps data
+    another process changed. Run several processes with a shared cache.
+    """
+    key_prefix = 'api:version:'
+
+    def __init__(self):
+        self._local = {}
+
+    def get(self, label):
+        shared = get_shared_cache()
+        if shared is None:
+            local = self._local.get(label)
+            if local is None or time.time() > local[1]:
+                return self.bump(label)
+            return local[0]
+        key = self.key_prefix + label
+        version = shared.get(key)
+        if version is None:
+            shared.add(key, uuid.uuid4().hex, None)
+            version = shared.get(key)
+        return version
+
+    def bump(self, label):
+        version = uuid.uuid4().hex
+        shared = get_shared_cache()
+        if shared is None:
+            self._local[label] = (version, time.time() + getattr(
+                settings, 'API_LOCAL_VERSION_TTL', 60))
+        else:
+            shared.set(self.key_prefix + label, version, None)
+        return version
+
+
+versions = Versions()
+
+
+def bump_version(model):
+    """
+    Bump the version of ``model`` now, so the current transaction sees its
+    own changes, and again on commit, so values other processes derived
+    from the data before the commit are not kept.
+    """
+    label = model._meta.label_lower
+    versions.bump(label)
+    transaction.on_commit(lambda: versions.bump(label),
+                          using=router.db_for_write(model))
+
+
+class DerivedCache(object):
+    """
+    Values derived from the data of a model, such as aggregates, cached in
+    local memory and in the shared cache until the model version changes.
+    """
+    key_prefix = 'api:derived:'
+
+    def __init__(self, versions):
+        self.versions = versions
+        self._local = {}
+
+    def get_or_set(self, name, model, compute):
+        version = self.versions.get(model._meta.label_lower)
+        local = self._local.get(name)
+        if local is not None and local[0] == version:
+            return local[1]
+        shared = get_shared_cache()
+        key = '%s%s:%s' % (self.key_prefix, name, version)
+        value = shared.get(key) if shared is not None else None
+        if value is None:
+            # Replicas may not have the changes behind the version yet.
+            with use_primary():
+                value = compute()
+            if shared is not None:
+                shared.set(key, value)
+        self._local[name] = (version, value)
+        return value
+
+
+derived_cache = DerivedCache(versions)
+
+
+class ReferenceCache(object):
+    """
+    Cache of the near immutable reference tables, ``REFERENCE_MODELS``.
+
+    Each table is kept in local memory, and in the shared cache when there
+    is one, together with the version it was loaded at. Reading a table
+    costs no database query until its version is bumped. Each table also
+    has a digest of its rows, the same in every process holding the same
+    rows, unlike the version.
+    """
+    key_prefix = 'api:reference:'
+
+    def __init__(self, versions):
+        self.versions = versions
+        self._tables = {}
+
+    def is_cached(self, model):
+        return model in REFERENCE_MODELS
+
+    def _load(self, model, version):
+        shared = get_shared_cache()
+        key = '%s%s:%s' % (self.key_prefix, model._meta.label_lower, version)
+        rows = shared.get(key) if shared is not None else None
+        if rows is None:
+            with use_primary():
+                rows = list(model._default_manager.order_by('pk'))
+            if shared is not None:
+                shared.set(key, rows, None)
+        digest = hashlib.md5(force_bytes(repr([
+            [(field.attname, field.value_from_object(row))
+             for field in model._meta.concrete_fields] for row in rows])))
+        return dict((row.pk, row) for row in rows), rows, digest.hexdigest()
+
+    def _get_table(self, model):
+        label = model._meta.label_lower
+        # Read the version before loading, a concurrent change then makes
+        # the next read reload the table instead of keeping stale rows.
+        version = self.versions.get(label)
+        table = self._tables.get(label)
+        if table is None or table[0] != version:
+            table = (version,) + self._load(model, version)
+            self._tables[label] = table
+        return table
+
+    def all(self, model):
+        """Return every row of ``model`` ordered by primary key."""
+        return list(self._get_table(model)[2])
+
+    def digest(self, model):
+        """Return the digest of the rows of ``model``."""
+        return self._get_table(model)[3]
+
+    def get(self, model, pk):
+        """Return the ``model`` row with primary key ``pk``."""
+        pk = model._meta.pk.to_python(pk)
+        try:
+            return self._get_table(model)[1][pk]
+        except KeyError:
+            raise model.DoesNotExist(
+                '%s matching query does not exist.' % model._meta.object_name)
+
+    def invalidate(self, model):
+        bump_version(model)
+        self._tables.pop(model._meta.label_lower, None)
+
+    def clear(self):
+        for model in REFERENCE_MODELS:
+            self.invalidate(model)
+
+
+reference_cache = ReferenceCache(versions)
+
+
+def invalidate_reference_data(sender, **kwargs):
+    reference_cache.invalidate(sender)
+
+
+for model in REFERENCE_MODELS:
+    signals.post_save.connect(invalidate_reference_data, sender=model)
+    signals.post_delete.connect(invalidate_reference_data, sender=model)
+
+
+def invalidate_catalog(sender, pks, **kwargs):
+    bump_version(Product)
+
+
+products_changed.connect(invalidate_catalog)
+
+
+def invalidate_vocabulary(sender, created=False, raw=False, **kwargs):
+    # The interned terms stay valid when a term is added, unless it is
+    # loaded from a fixture, possibly over an existing one.
+    if created and not raw:
+        return
+    bump_version(ProductAttribute if sender is Attribute else sender)
+
+
+for model in (Keyword, ProductAttribute, Attribute):
+    signals.post_save.connect(invalidate_vocabulary, sender=model)
+    signals.post_delete.connect(invalidate_vocabulary, sender=model)
+
+
+def invalidate_companies(sender, **kwargs):
+    bump_version(Company)
+
+
+# The categories are only set along with a save of the company, and an
+# m2m_changed receiver would keep the through rows from being fast deleted.
+signals.post_save.connect(invalidate_companies, sender=Company)
+signals.post_delete.connect(invalidate_companies, sender=Company)
+
+
+class ResponseCache(object):
+    """
+    Rendered responses, keyed by the request and the versions of the models
+    they are built from, kept in a local LRU of ``API_RESPONSE_CACHE_SIZE``
+    entries for ``API_RESPONSE_CACHE_LOCAL_TTL`` seconds and in the shared
+    cache when there is one. The views only use it with a shared cache, see
+    ``is_enabled``.
+
+    Concurrent misses on a key compute the value once: the other threads of
+    the process wait for it, and with a shared cache the other processes
+    wait for the one holding the key lock, up to ``lock_timeout`` seconds.
+    Hits, shared cache hits, waits, misses and evictions are counted per
+    name.
+    """
+    key_prefix = 'api:response:'
+    lock_timeout = 10
+    poll_interval = 0.05
+
+    def __init__(self, versions):
+        self.versions = versions
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._flights = {}
+        self._stats = {}
+
+    def is_enabled(self):
+        """
+        Whether ``API_RESPONSE_CACHE`` is set along with
+        ``API_SHARED_CACHE``. The keys change with the version tokens, which
+        only change in every process through the shared cache, the api.E002
+        check reports the response cache set without it.
+        """
+        return bool(getattr(settings, 'API_RESPONSE_CACHE', False) and
+                    get_shared_cache() is not None)
+
+    def make_key(self, request_key, models):
+        """Key ``request_key`` by the current versions of ``models``."""
+        versions = [self.versions.get(model._meta.label_lower)
+                    for model in models]
+        return self.key_prefix + hashlib.md5(force_bytes('|'.join(
+            [request_key] + versions))).hexdigest()
+
+    def _count(self, name, event):
+        stats = self._stats.setdefault(name, {
+            'hits': 0, 'shared_hits': 0, 'waits': 0, 'misses': 0,
+            'evictions': 0})
+        stats[event] += 1
+
+    def _get_local(self, name, key, event):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None or entry[0] <= time.time():
+                return None
+            self._entries[key] = entry
+            self._count(name, event)
+            return entry[1]
+
+    def _set_local(self, name, key, value):
+        size = getattr(settings, 'API_RESPONSE_CACHE_SIZE', 256)
+        expires = time.time() + getattr(settings,
+                                        'API_RESPONSE_CACHE_LOCAL_TTL', 60)
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (expires, value)
+            while len(self._entries) > size:
+                self._entries.popitem(last=False)
+                self._count(name, 'evictions')
+
+    def get_or_set(self, name, key, compute):
+        """
+        Return the value cached under ``key``, computing it with ``compute``
+        on a miss. ``compute`` returns ``None`` for values not to cache.
+        """
+        value = self._get_local(name, key, 'hits')
+        if value is not None:
+            return value
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = threading.Event()
+        if not leader:
+            flight.wait(self.lock_timeout)
+            value = self._get_local(name, key, 'waits')
+            if value is not None:
+                return value
+            with self._lock:
+                self._count(name, 'misses')
+            return compute()
+        try:
+            value = self._get_shared(name, key, compute)
+            if value is not None:
+                self._set_local(name, key, value)
+            return value
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.set()
+
+    def _get_shared(self, name, key, compute):
+        shared = get_shared_cache()
+        lock, locked = key + ':lock', False
+        if shared is not None:
+            value = shared.get(key)
+            deadline = time.time() + self.lock_timeout
+            while value is None:
+                locked = shared.add(lock, 1, self.lock_timeout)
+                if locked or time.time() > deadline:
+                    break
+                time.sleep(self.poll_interval)
+                value = shared.get(key)
+            if value is not None:
+                with self._lock:
+                    self._count(name, 'shared_hits')
+                return value
+        with self._lock:
+            self._count(name, 'misses')
+        try:
+            value = compute()
+            if shared is not None and value is not None:
+                shared.set(key, value, getattr(
+                    settings, 'API_RESPONSE_CACHE_TIMEOUT', 300))
+        finally:
+            if locked:
+                shared.delete(lock)
+        return value
+
+    def stats(self):
+        with self._lock:
+            return dict((name, dict(stats))
+                        for name, stats in self._stats.items())
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._stats.clear()
+
+
+response_cache = ResponseCache(versions)
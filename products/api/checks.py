@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""API system checks."""
+
+from django.conf import settings
+from django.core import checks
+
+
+@checks.register(checks.Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    """
+    The version tokens validating the product responses only change in
+    every process through ``API_SHARED_CACHE``.
+    """
+    errors = []
+    if not settings.DEBUG and getattr(settings, 'API_SHARED_CACHE',
+                                      None) is None:
+        errors.append(checks.Error(
+            'API_SHARED_CACHE is not set.',
+            hint='The product ETags come from version tokens local to each '
+                 'process, which differ between processes and rotate every '
+                 'API_LOCAL_VERSION_TTL seconds. Configure a cache shared '
+                 'by the processes, or silence api.E001 when serving from '
+                 'a single process.',
+            id='api.E001',
+        ))
+    return errors
+
+
+@checks.register(checks.Tags.caches)
+def check_response_cache(app_configs, **kwargs):
+    """
+    The response cache keys only change in every process through
+    ``API_SHARED_CACHE``, the response cache is off without it.
+    """
+    errors = []
+    if (getattr(settings, 'API_RESPONSE_CACHE', False) and
+            getattr(settings, 'API_SHARED_CACHE', None) is None):
+        errors.append(checks.Error(
+            'API_RESPONSE_CACHE is set without API_SHARED_CACHE.',
+            hint='The processes would serve responses from before the '
+                 'writes of the others, so no response is cached. Configure '
+                 'a cache shared by the processes or unset '
+                 'API_RESPONSE_CACHE.',
+            id='api.E002',
+        ))
+    return errors
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""Database connection setup and routing."""
+
+import random
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+
+_state = threading.local()
+
+
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    """
+    Run the ``API_SQLITE_PRAGMAS`` ``(name, value)`` pairs on every new
+    SQLite connection.
+
+    ``legacy_alter_table`` is always on: the migrations rebuild altered
+    tables by renaming them, and since SQLite 3.26 the foreign keys of the
+    other tables would follow the renamed table instead of the rebuilt one.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = [('legacy_alter_table', 'ON')]
+    pragmas.extend(getattr(settings, 'API_SQLITE_PRAGMAS', ()))
+    with connection.cursor() as cursor:
+        for name, value in pragmas:
+            cursor.execute('PRAGMA %s = %s' % (name, value))
+
+
+def get_replicas():
+    """Return the aliases of the read replicas, ``API_DATABASE_REPLICAS``."""
+    return getattr(settings, 'API_DATABASE_REPLICAS', ())
+
+
+def is_pinned():
+    """Whether the reads of this thread go to the primary database."""
+    return getattr(_state, 'pinned', False)
+
+
+def has_written():
+    """Whether this thread wrote to the primary since ``reset_routing``."""
+    return getattr(_state, 'written', False)
+
+
+def pin_primary():
+    """
+    Record that this thread writes to the primary and send its next reads
+    there, so it sees its own writes. Called by the code paths that write,
+    asking the router for a database does not pin.
+    """
+    _state.pinned = _state.written = True
+
+
+def get_replica():
+    """
+    Return the replica the reads of this thread go to, chosen once until
+    ``reset_routing`` so a request reads a single consistent copy.
+    """
+    replica = getattr(_state, 'replica', None)
+    if replica not in get_replicas():
+        replica = _state.replica = random.choice(get_replicas())
+    return replica
+
+
+def reset_routing(pinned=False):
+    _state.pinned = pinned
+    _state.written = False
+    _state.replica = None
+
+
+@contextmanager
+def use_primary():
+    """Send the reads of the block to the primary database."""
+    pinned = is_pinned()
+    _state.pinned = True
+    try:
+        yield
+    finally:
+        _state.pinned = pinned
+
+
+class ReplicaRouter(object):
+    """
+    Send the reads of the api models to one of the ``API_DATABASE_REPLICAS``
+    and their writes to the primary, ``default``.
+
+    Once a thread is pinned by ``pin_primary``, its reads go to the
+    primary too, so a request sees its own writes.
+    ``ReplicaPinningMiddleware`` extends that to the next requests of the
+    same client while the replicas catch up.
+    """
+
+    def db_for_read(self, model, **hints):
+        replicas = get_replicas()
+        if model._meta.app_label != 'api' or not replicas or is_pinned():
+            return None
+        return get_replica()
+
+    def db_for_write(self, model, **hints):
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary.
+        aliases = {'default'}.union(get_replicas())
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""Product documents, the stored representation of each product."""
+
+import json
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import router
+
+from rest_framework import serializers
+from rest_framework.utils.encoders import JSONEncoder
+
+from api.models import Product, ProductDocument
+from api.models.product import batches
+from api.serializers.product import ProductSerializer
+from api.signals import products_changed
+
+
+def documents_enabled():
+    """
+    Whether the product reads are served from the product documents, see
+    the ``API_PRODUCT_DOCUMENTS`` setting.
+    """
+    return getattr(settings, 'API_PRODUCT_DOCUMENTS', False)
+
+
+def render_products(pks, using=None):
+    """Serialize the products ``pks`` from the tables, by primary key."""
+    rendered = {}
+    for batch in batches(pks):
+        products = Product.objects.using(using).filter(
+            pk__in=batch).with_related().with_flags()
+        rendered.update((product.pk, ProductSerializer(product).data)
+                        for product in products)
+    return rendered
+
+
+def build_documents(pks):
+    """
+    Serialize the products ``pks`` and store their documents, dropping the
+    documents of the deleted ones. Return the new documents by product.
+    """
+    using = router.db_for_write(ProductDocument)
+    built = {}
+    for batch in batches(pks):
+        ProductDocument.objects.using(using).filter(pk__in=batch).delete()
+        documents = [
+            ProductDocument(product_id=pk, data=json.dumps(
+                data, cls=JSONEncoder))
+            for pk, data in render_products(batch, using).items()]
+        ProductDocument.objects.using(using).bulk_create(documents)
+        built.update((document.product_id, document)
+                     for document in documents)
+    return built
+
+
+def load_documents(pks):
+    """
+    Return the documents of the products ``pks``, in the same order, with
+    one query. Products without a document yet are rendered from the
+    tables, reads never write: documents are built by the product writes
+    and the ``rebuild_product_documents`` command.
+    """
+    documents = dict(
+        (pk, json.loads(document.data, object_pairs_hook=OrderedDict))
+        for pk, document in ProductDocument.objects.in_bulk(pks).items())
+    missing = [pk for pk in pks if pk not in documents]
+    if missing:
+        documents.update(render_products(
+            missing, router.db_for_read(Product)))
+    return [documents[pk] for pk in pks if pk in documents]
+
+
+class ProductDocumentListSerializer(serializers.ListSerializer):
+
+    def to_representation(self, data):
+        return load_documents([product.pk for product in data])
+
+
+class ProductDocumentSerializer(serializers.BaseSerializer):
+    """Read only product serializer returning the stored documents."""
+
+    class Meta:
+        list_serializer_class = ProductDocumentListSerializer
+
+    def to_representation(self, instance):
+        return load_documents([instance.pk])[0]
+
+
+def update_documents(sender, pks, **kwargs):
+    if documents_enabled():
+        build_documents(pks)
+
+
+products_changed.connect(update_documents)
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""JSON encoding backends of the API renderers and parsers."""
+
+import json
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import six
+
+from rest_framework.utils.encoders import JSONEncoder
+
+# REST framework's compact output: unescaped unicode, and the types JSON
+# has no notation for, such as Decimal and datetime, handled by its encoder.
+_encoder = JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+
+# Valid in JSON strings but not in JavaScript ones, REST framework escapes
+# them and so do the backends.
+_ESCAPES = ((u'\u2028'.encode('utf-8'), b'\\u2028'),
+            (u'\u2029'.encode('utf-8'), b'\\u2029'))
+
+
+def _escape(content):
+    if b'\xe2\x80' in content:
+        for char, escape in _ESCAPES:
+            content = content.replace(char, escape)
+    return content
+
+
+class Backend(object):
+    """
+    JSON backend. ``dumps`` returns the compact UTF-8 encoding of the data,
+    ``loads`` decodes UTF-8 bytes or text and raises ``ValueError`` on
+    invalid documents. Backends raise ``ImportError`` when their library is
+    not installed.
+    """
+    name = None
+
+    def dumps(self, data):
+        raise NotImplementedError
+
+    def loads(self, content):
+        raise NotImplementedError
+
+
+class StandardBackend(Backend):
+    """The standard library ``json`` module, as REST framework uses it."""
+    name = 'json'
+
+    def dumps(self, data):
+        content = _encoder.encode(data)
+        if isinstance(content, six.text_type):
+            content = content.encode('utf-8')
+        return _escape(content)
+
+    def loads(self, content):
+        if isinstance(content, bytes):
+            content = content.decode('utf-8')
+        return json.loads(content)
+
+
+class OrjsonBackend(Backend):
+    """
+    ``orjson``, encoding straight to bytes. Datetimes are passed to REST
+    framework's encoder, orjson would write UTC as ``+00:00`` instead of
+    ``Z``.
+    """
+    name = 'orjson'
+
+    def __init__(self):
+        import orjson
+        self.orjson = orjson
+        self.option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+    def dumps(self, data):
+        return _escape(self.orjson.dumps(data, default=_encoder.default,
+                                         option=self.option))
+
+    def loads(self, content):
+        return self.orjson.loads(content)
+
+
+class UjsonBackend(Backend):
+    """``ujson``, from the version with a ``default`` hook, 5.0."""
+    name = 'ujson'
+
+    def __init__(self):
+        import ujson
+        try:
+            ujson.dumps(None, default=None)
+        except TypeError:
+            raise ImportError('ujson 5.0 or later is required.')
+        self.ujson = ujson
+
+    def dumps(self, data):
+        content = self.ujson.dumps(data, ensure_ascii=False,
+                                   escape_forward_slashes=False,
+                                   default=_encoder.default)
+        return _escape(content.encode('utf-8'))
+
+    def loads(self, content):
+        return self.ujson.loads(content)
+
+
+BACKENDS = dict((backend.name, backend) for backend in (
+    OrjsonBackend, UjsonBackend, StandardBackend))
+
+_backends = {}
+
+
+def get_backend():
+    """
+    Return the first installed backend of ``API_JSON_BACKENDS``, falling
+    back to the standard library.
+    """
+    names = tuple(getattr(settings, 'API_JSON_BACKENDS', ()))
+    backend = _backends.get(names)
+    if backend is not None:
+        return backend
+    for name in names:
+        if name not in BACKENDS:
+            raise ImproperlyConfigured('Unknown JSON backend %s.' % name)
+        try:
+            backend = BACKENDS[name]()
+        except ImportError:
+            continue
+        break
+    else:
+        backend = StandardBackend()
+    _backends[names] = backend
+    return backend
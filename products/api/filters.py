@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""API filters."""
+
+from django.db.models import Q
+
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+from api.models import Keyword, ProductAttribute
+
+
+class ProductFilterBackend(BaseFilterBackend):
+    """
+    Filter the products by their vocabulary, classification and price.
+
+    ``attribute=name:value`` and ``keyword=name`` can be repeated, a product
+    must have all of them. ``category`` and ``made_in`` take primary keys,
+    ``price_min`` and ``price_max`` are inclusive.
+    """
+    params = ('attribute', 'keyword', 'category', 'made_in', 'price_min',
+              'price_max')
+
+    def is_filtered(self, request):
+        return any(param in request.query_params for param in self.params)
+
+    def get_integer(self, request, param):
+        value = request.query_params.get(param)
+        if value is None:
+            return None
+        try:
+            return int(value)
+        except ValueError:
+            raise ValidationError({param: 'A valid integer is required.'})
+
+    def get_attribute_pairs(self, request):
+        pairs = []
+        for param in request.query_params.getlist('attribute'):
+            name, separator, value = param.partition(':')
+            if not separator or not name or not value:
+                raise ValidationError(
+                    {'attribute': 'Expected name:value, received %s.' % param})
+            pairs.append((name, value))
+        return pairs
+
+    def filter_attributes(self, queryset, pairs):
+        # Resolve every pair to its attribute values with one query, then
+        # join the through table once per pair.
+        condition = Q()
+        for name, value in pairs:
+            condition |= Q(attribute__name=name, value__iexact=value)
+        matches = {}
+        for pk, name, value in ProductAttribute.objects.filter(
+                condition).values_list('pk', 'attribute__name', 'value'):
+            matches.setdefault((name, value.lower()), []).append(pk)
+        for name, value in pairs:
+            pks = matches.get((name, value.lower()))
+            if not pks:
+                return queryset.none()
+            queryset = queryset.filter(attributes__in=pks)
+            if len(pks) > 1:
+                queryset = queryset.distinct()
+        return queryset
+
+    def filter_keywords(self, queryset, names):
+        keywords = dict(Keyword.objects.filter(
+            name__in=names).values_list('name', 'pk'))
+        for name in names:
+            if name not in keywords:
+                return queryset.none()
+            queryset = queryset.filter(keywords=keywords[name])
+        return queryset
+
+    def filter_queryset(self, request, queryset, view):
+        for param in ('category', 'made_in'):
+            value = self.get_integer(request, param)
+            if value is not None:
+                queryset = queryset.filter(**{param: value})
+        price_min = self.get_integer(request, 'price_min')
+        if price_min is not None:
+            queryset = queryset.filter(price__gte=price_min)
+        price_max = self.get_integer(request, 'price_max')
+        if price_max is not None:
+            queryset = queryset.filter(price__lte=price_max)
+        pairs = self.get_attribute_pairs(request)
+        if pairs:
+            queryset = self.filter_attributes(queryset, pairs)
+        keywords = request.query_params.getlist('keyword')
+        if keywords:
+            queryset = self.filter_keywords(queryset, keywords)
+        return queryset
@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+"""Password hashers."""
+
+from django.conf import settings
+from django.contrib.auth import hashers
+
+
+class PBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    """
+    PBKDF2 hasher running ``API_PASSWORD_ITERATIONS`` iterations, Django's
+    default when unset. Hashes keep their own iteration count, so changing
+    the setting only affects new hashes, and existing ones are rehashed on
+    the next login.
+    """
+
+    @property
+    def iterations(self):
+        return getattr(settings, 'API_PASSWORD_ITERATIONS',
+                       hashers.PBKDF2PasswordHasher.iterations)
@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+"""Helpers shared by the benchmark management commands."""
+
+from __future__ import division
+
+import math
+
+
+def percentile(values, percent):
+    """Nearest-rank ``percent`` percentile of ``values``."""
+    values = sorted(values)
+    index = int(math.ceil(percent / 100 * len(values))) - 1
+    return values[max(index, 0)]
+
+
+def summarize(timings):
+    """Summarize a list of timings, in seconds, as milliseconds."""
+    return {
+        'count': len(timings),
+        'p50': percentile(timings, 50) * 1000,
+        'p95': percentile(timings, 95) * 1000,
+        'p99': percentile(timings, 99) * 1000,
+    }
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""Benchmark running API servers with concurrent HTTP clients."""
+
+from __future__ import division
+
+import json
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.six.moves import range
+from django.utils.six.moves.urllib.error import URLError
+from django.utils.six.moves.urllib.request import urlopen
+
+from api.management.bench import summarize
+
+
+class Command(BaseCommand):
+    help = ('Request each URL with concurrent clients and report '
+            'throughput and latency. To compare the WSGI and ASGI entry '
+            'points, serve the same database with both, for instance '
+            '"gunicorn products.wsgi --threads 16" and '
+            '"uvicorn products.asgi:application", pass their base URLs '
+            'with --wsgi and --asgi and the paths to request on both.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('urls', nargs='+', metavar='url')
+        parser.add_argument('--concurrency', type=int, default=16,
+                            help='Concurrent clients.')
+        parser.add_argument('--requests', type=int, default=500,
+                            help='Requests per URL.')
+        parser.add_argument('--warmup', type=int, default=20,
+                            help='Unmeasured requests per URL.')
+        parser.add_argument('--timeout', type=float, default=30,
+                            help='Timeout of each request, in seconds.')
+        parser.add_argument('--wsgi', metavar='base',
+                            help='Base URL of the WSGI server to compare.')
+        parser.add_argument('--asgi', metavar='base',
+                            help='Base URL of the ASGI server to compare.')
+        parser.add_argument('--json', dest='output',
+                            help='Write the results to this JSON file.')
+
+    def fetch(self, url, timeout):
+        response = urlopen(url, timeout=timeout)
+        try:
+            response.read()
+        finally:
+            response.close()
+
+    def measure(self, url, options):
+        for _ in range(options['warmup']):
+            self.fetch(url, options['timeout'])
+        remaining = [options['requests']]
+        timings, errors = [], []
+        lock = threading.Lock()
+
+        def client():
+            while True:
+                with lock:
+                    if not remaining[0]:
+                        return
+                    remaining[0] -= 1
+                start = time.time()
+                try:
+                    self.fetch(url, options['timeout'])
+                except (URLError, IOError) as error:
+                    with lock:
+                        errors.append(error)
+                    continue
+                elapsed = time.time() - start
+                with lock:
+                    timings.append(elapsed)
+
+        clients = [threading.Thread(target=client)
+                   for _ in range(options['concurrency'])]
+        start = time.time()
+        for thread in clients:
+            thread.start()
+        for thread in clients:
+            thread.join()
+        elapsed = time.time() - start
+        if not timings:
+            raise CommandError('Every request to %s failed: %s' % (
+                url, errors[0]))
+        result = summarize(timings)
+        result.update(errors=len(errors), rps=len(timings) / elapsed)
+        return result
+
+    def report(self, url, result):
+        self.stdout.write(
+            '{url}\n    {rps:8.1f} requests/s  p50 {p50:8.2f} ms  '
+            'p95 {p95:8.2f} ms  p99 {p99:8.2f} ms  {errors} errors'
+            .format(url=url, **result))
+
+    def compare(self, paths, options):
+        """
+        Measure each path on the WSGI and the ASGI servers, one after the
+        other so they do not compete for the database, and report the
+        ASGI throughput relative to the WSGI one.
+        """
+        results = {}
+        for path in paths:
+            results[path] = {}
+            for server in ('wsgi', 'asgi'):
+                url = options[server].rstrip('/') + '/' + path.lstrip('/')
+                results[path][server] = self.measure(url, options)
+                self.report(url, results[path][server])
+            results[path]['ratio'] = (results[path]['asgi']['rps'] /
+                                      results[path]['wsgi']['rps'])
+            self.stdout.write('    asgi/wsgi {ratio:8.2f}x requests/s'.format(
+                **results[path]))
+        return results
+
+    def handle(self, *args, **options):
+        if bool(options['wsgi']) != bool(options['asgi']):
+            raise CommandError('--wsgi and --asgi must be given together.')
+        if options['wsgi']:
+            results = self.compare(options['urls'], options)
+        else:
+            results = {}
+            for url in options['urls']:
+                results[url] = self.measure(url, options)
+                self.report(url, results[url])
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(results, output, indent=2, sort_keys=True)
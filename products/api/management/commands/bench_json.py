@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""Benchmark the JSON backends on product lists."""
+
+from __future__ import division
+
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from rest_framework.renderers import JSONRenderer
+
+from api.encoders import BACKENDS
+from api.management.bench import summarize
+from api.models import Product
+from api.serializers.product import ProductSerializer
+from api.serializers.rows import RowSerializer
+
+
+class Command(BaseCommand):
+    help = ('Encode and decode a serialized product list with REST '
+            'framework\'s renderer and each installed JSON backend, and '
+            'report the throughput. Seed a catalog with bench_lookups '
+            '--seed first.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000,
+                            help='Products in the list.')
+        parser.add_argument('--repeat', type=int, default=20,
+                            help='Encodings per backend.')
+        parser.add_argument('--json', dest='output',
+                            help='Write the results to this JSON file.')
+
+    def measure(self, function, data, repeat):
+        timings, result = [], None
+        for _ in range(repeat):
+            start = time.time()
+            result = function(data)
+            timings.append(time.time() - start)
+        summary = summarize(timings)
+        summary['total'] = max(sum(timings), 1e-9)
+        return summary, result
+
+    def handle(self, *args, **options):
+        queryset = Product.objects.with_related().with_flags().order_by(
+            '-pk')[:options['rows']]
+        rows = RowSerializer(ProductSerializer())
+        data = rows.to_representation(rows.values(queryset))
+        if not data:
+            raise CommandError('The catalog is empty, seed it first.')
+        expected = JSONRenderer().render(data)
+        encoders = [('rest_framework', JSONRenderer().render, json.loads)]
+        for name in sorted(BACKENDS):
+            try:
+                backend = BACKENDS[name]()
+            except ImportError:
+                self.stdout.write('%-16s not installed' % name)
+                continue
+            encoders.append((name, backend.dumps, backend.loads))
+        results = {}
+        megabytes = len(expected) / 1e6
+        for name, dumps, loads in encoders:
+            result, content = self.measure(dumps, data, options['repeat'])
+            if loads(content) != json.loads(expected.decode('utf-8')):
+                raise CommandError('%s encoded different data.' % name)
+            result['same_bytes'] = content == expected
+            total = result.pop('total')
+            result['mb_per_second'] = megabytes * options['repeat'] / total
+            result['rows_per_second'] = len(data) * options['repeat'] / total
+            result['decode_p50'] = self.measure(
+                loads, content, options['repeat'])[0]['p50']
+            results[name] = result
+            self.stdout.write(
+                '{name:<16} encode {mb_per_second:8.1f} MB/s  '
+                '{rows_per_second:10.1f} rows/s  p50 {p50:8.2f} ms  decode '
+                'p50 {decode_p50:8.2f} ms  same bytes: {same_bytes}'.format(
+                    name=name, **result))
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(results, output, indent=2, sort_keys=True)
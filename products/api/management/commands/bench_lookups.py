@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""Time the catalog lookups the API relies on."""
+
+from __future__ import division
+
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from api.management.bench import summarize
+from api.models import (
+    Attribute, Category, Country, Industry, Keyword, Product,
+    ProductAttribute)
+from api.models.company import Company
+from api.models.product import batches
+
+
+class Command(BaseCommand):
+    help = ('Time the keyword, attribute, product and company lookups done '
+            'by the API and print their query plans, optionally seeding a '
+            'large catalog first.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Create this many synthetic products, '
+                                 'keywords and attribute values first.')
+        parser.add_argument('--repeat', type=int, default=200,
+                            help='Executions per lookup.')
+        parser.add_argument('--json', dest='output',
+                            help='Write the results to this JSON file.')
+
+    def seed(self, size):
+        country, category = Country.objects.first(), Category.objects.first()
+        if country is None or category is None:
+            raise CommandError('Load the static data before seeding.')
+        with transaction.atomic():
+            offset = Product.objects.count()
+            rows = range(offset, offset + size)
+            for batch in batches(rows):
+                Keyword.objects.bulk_create(
+                    Keyword(name='keyword-%d' % row) for row in batch)
+                Product.objects.bulk_create(
+                    Product(name='Product %d' % row, brand='brand-%d' % (
+                        row % 500), model='model-%d' % row, price=row,
+                        made_in=country, category=category)
+                    for row in batch)
+            attribute = Attribute.objects.resolve(['bench'])['bench']
+            for batch in batches(rows):
+                ProductAttribute.objects.bulk_create(
+                    ProductAttribute(attribute=attribute,
+                                     value='value-%d' % row)
+                    for row in batch)
+
+    def get_lookups(self):
+        product = Product.objects.order_by('-pk').first()
+        keyword = Keyword.objects.order_by('-pk').first()
+        value = ProductAttribute.objects.select_related(
+            'attribute').order_by('-pk').first()
+        industry = Industry.objects.order_by('-pk').first()
+        if None in (product, keyword, value, industry):
+            raise CommandError('The catalog is empty, run with --seed.')
+        return [
+            ('keyword-name', Keyword.objects.filter(name=keyword.name)),
+            ('attribute-value', ProductAttribute.objects.filter(
+                attribute__name=value.attribute.name, value=value.value)),
+            ('product-page', Product.objects.order_by(
+                '-last_modification', '-id')[:50]),
+            ('product-brand', Product.objects.filter(brand=product.brand)),
+            ('company-industry', Company.objects.filter(industry=industry)),
+        ]
+
+    def explain(self, queryset):
+        prefix = ('EXPLAIN QUERY PLAN ' if connection.vendor == 'sqlite'
+                  else 'EXPLAIN ')
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(prefix + sql, params)
+            return [' '.join(str(column) for column in row)
+                    for row in cursor.fetchall()]
+
+    def measure(self, queryset, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.time()
+            list(queryset.all())
+            timings.append(time.time() - start)
+        return summarize(timings)
+
+    def handle(self, *args, **options):
+        if options['seed']:
+            self.seed(options['seed'])
+        results = {}
+        for name, queryset in self.get_lookups():
+            results[name] = self.measure(queryset, options['repeat'])
+            results[name]['plan'] = self.explain(queryset)
+            self.stdout.write(
+                '{name:<18} p50 {p50:8.3f} ms  p95 {p95:8.3f} ms  '
+                'p99 {p99:8.3f} ms'.format(name=name, **results[name]))
+            for line in results[name]['plan']:
+                self.stdout.write('    ' + line)
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(results, output, indent=2, sort_keys=True)
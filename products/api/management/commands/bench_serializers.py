@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""Benchmark the product and company rendering paths."""
+
+from __future__ import division
+
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+
+from rest_framework.test import APIRequestFactory
+
+from api.management.bench import summarize
+from api.views.company import CompanyViewSet
+from api.views.product import ProductViewSet
+
+
+class Command(BaseCommand):
+    help = ('Serve pages of the product and company lists rendered with '
+            'their serializers and from values() rows, check both give the '
+            'same data and report rows per second for each. Seed a catalog '
+            'with bench_lookups --seed first.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=200,
+                            help='Rows rendered per page, up to '
+                                 'API_MAX_PAGE_SIZE.')
+        parser.add_argument('--repeat', type=int, default=20,
+                            help='Pages rendered per path.')
+        parser.add_argument('--json', dest='output',
+                            help='Write the results to this JSON file.')
+
+    def get_cases(self):
+        # The list views as served, paginated, without throttling nor
+        # response cache.
+        return [
+            ('products', ProductViewSet.as_view(
+                {'get': 'list'}, throttle_classes=())),
+            ('companies', CompanyViewSet.as_view({'get': 'list'})),
+        ]
+
+    def measure(self, render, repeat):
+        timings, data = [], None
+        for _ in range(repeat):
+            start = time.time()
+            data = render()
+            timings.append(time.time() - start)
+        result = summarize(timings)
+        result['rows_per_second'] = len(data) * repeat / sum(timings)
+        return result, data
+
+    def handle(self, *args, **options):
+        results = {}
+        factory = APIRequestFactory()
+        for name, view in self.get_cases():
+            outputs = []
+            for path, row_rendering in (('serializer', False),
+                                        ('rows', True)):
+
+                def render():
+                    request = factory.get('/', {'page_size': options['rows']})
+                    return view(request).data['results']
+
+                key = '%s-%s' % (name, path)
+                with override_settings(API_ROW_RENDERING=row_rendering,
+                                       API_RESPONSE_CACHE=False):
+                    results[key], data = self.measure(render,
+                                                      options['repeat'])
+                outputs.append(json.dumps(data))
+                self.stdout.write(
+                    '{key:<20} {rows_per_second:10.1f} rows/s  p50 '
+                    '{p50:8.2f} ms  p95 {p95:8.2f} ms'.format(
+                        key=key, **results[key]))
+            if outputs[0] != outputs[1]:
+                raise CommandError('The %s paths rendered different data.' %
+                                   name)
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(results, output, indent=2, sort_keys=True)
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""Benchmark user registration."""
+
+from __future__ import division
+
+import json
+import time
+import uuid
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.six.moves import range
+
+from api.management.bench import summarize
+from api.serializers.user import UserProfileSerializer
+
+
+class Command(BaseCommand):
+    help = ('Register users through the user profile serializer and report '
+            'the signup throughput and latency. The password hashing cost '
+            'is set by API_PASSWORD_ITERATIONS.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--signups', type=int, default=50,
+                            help='Users to register.')
+        parser.add_argument('--target', type=float,
+                            help='Fail below this many signups per second.')
+        parser.add_argument('--json', dest='output',
+                            help='Write the results to this JSON file.')
+
+    def handle(self, *args, **options):
+        prefix = 'bench-signup-%s' % uuid.uuid4().hex[:8]
+        timings = []
+        try:
+            for index in range(options['signups']):
+                data = {'first_name': 'Bench', 'last_name': 'Signup',
+                        'email': '%s-%d@example.com' % (prefix, index),
+                        'password': 'secret-password',
+                        'password_confirmation': 'secret-password',
+                        'phone': '55010203', 'role': 'bench'}
+                start = time.time()
+                serializer = UserProfileSerializer(data=data)
+                if not serializer.is_valid():
+                    raise CommandError(serializer.errors)
+                serializer.save()
+                timings.append(time.time() - start)
+        finally:
+            User.objects.filter(username__startswith=prefix).delete()
+        result = summarize(timings)
+        result['signups_per_second'] = len(timings) / sum(timings)
+        self.stdout.write(
+            '{signups_per_second:8.1f} signups/s  p50 {p50:8.2f} ms  p95 '
+            '{p95:8.2f} ms  p99 {p99:8.2f} ms'.format(**result))
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(result, output, indent=2, sort_keys=True)
+        target = options['target']
+        if target and result['signups_per_second'] < target:
+            raise CommandError('%.1f signups/s is below the %.1f target.' % (
+                result['signups_per_second'], target))
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""Benchmark concurrent database writes."""
+
+from __future__ import division
+
+import json
+import threading
+import time
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connection, transaction
+from django.utils.six.moves import range
+
+from api.management.bench import summarize
+from api.models import Keyword
+
+
+class Command(BaseCommand):
+    help = ('Write from concurrent threads, each with its own database '
+            'connection, and report throughput, latency and failed writes. '
+            'Run it with --settings=products.settings.default and '
+            '--settings=products.settings.production to compare the '
+            'connection settings.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8,
+                            help='Concurrent writers.')
+        parser.add_argument('--writes', type=int, default=200,
+                            help='Transactions per writer.')
+        parser.add_argument('--json', dest='output',
+                            help='Write the results to this JSON file.')
+
+    def writer(self, prefix, writes, timings, errors, lock):
+        try:
+            for index in range(writes):
+                start = time.time()
+                try:
+                    with transaction.atomic():
+                        keyword = Keyword.objects.create(
+                            name='%s-%s' % (prefix, uuid.uuid4().hex))
+                        Keyword.objects.filter(pk=keyword.pk).update(
+                            name=keyword.name + '-')
+                except DatabaseError as error:
+                    with lock:
+                        errors.append(error)
+                    continue
+                elapsed = time.time() - start
+                with lock:
+                    timings.append(elapsed)
+        finally:
+            connection.close()
+
+    def handle(self, *args, **options):
+        prefix = 'bench-writes-%s' % uuid.uuid4().hex[:8]
+        timings, errors = [], []
+        lock = threading.Lock()
+        writers = [threading.Thread(target=self.writer, args=(
+            prefix, options['writes'], timings, errors, lock))
+            for _ in range(options['threads'])]
+        start = time.time()
+        for thread in writers:
+            thread.start()
+        for thread in writers:
+            thread.join()
+        elapsed = time.time() - start
+        Keyword.objects.filter(name__startswith=prefix).delete()
+        if not timings:
+            raise CommandError('Every write failed: %s' % errors[0])
+        result = summarize(timings)
+        result.update(errors=len(errors), tps=len(timings) / elapsed)
+        self.stdout.write(
+            '{tps:8.1f} transactions/s  p50 {p50:8.2f} ms  p95 {p95:8.2f} '
+            'ms  p99 {p99:8.2f} ms  {errors} errors'.format(**result))
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(result, output, indent=2, sort_keys=True)
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""Import a product catalog from NDJSON or CSV."""
+
+from __future__ import division
+
+import csv
+import io
+import json
+import os
+import time
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import router, transaction
+from django.utils import six
+
+from api.models import ImportCheckpoint, Product
+from api.models.product import VocabularyCache
+from api.serializers.product import ProductSerializer, to_ingest_item
+
+
+def read_ndjson(path):
+    with io.open(path, encoding='utf-8') as source:
+        for line in source:
+            if line.strip():
+                yield json.loads(line)
+
+
+def read_csv_rows(path):
+    if six.PY2:
+        with open(path, 'rb') as source:
+            for row in csv.DictReader(source):
+                yield dict((key.decode('utf-8'), (value or '').decode(
+                    'utf-8')) for key, value in row.items())
+    else:
+        with io.open(path, encoding='utf-8', newline='') as source:
+            for row in csv.DictReader(source):
+                yield row
+
+
+def read_csv(path):
+    """
+    Read products from a CSV file with a column per product field.
+    ``keywords`` holds names and ``attributes`` ``name:value`` pairs, both
+    separated by ``|``. ``extras`` and ``logistics`` hold JSON lists.
+    """
+    for row in read_csv_rows(path):
+        product = dict((key, value) for key, value in row.items()
+                       if key not in ('keywords', 'attributes', 'extras',
+                                      'logistics'))
+        product['keywords'] = [
+            {'name': name} for name in row.get('keywords', '').split('|')
+            if name]
+        product['attributes'] = [
+            dict(zip(('name', 'value'), pair.split(':', 1)))
+            for pair in row.get('attributes', '').split('|') if pair]
+        for relation in ('extras', 'logistics'):
+            if row.get(relation):
+                product[relation] = json.loads(row[relation])
+        yield product
+
+
+class Command(BaseCommand):
+    help = ('Import products with their keywords, attributes, extras and '
+            'logistics from an NDJSON or CSV file, in batches, resuming '
+            'from a checkpoint after a failure.')
+
+    readers = {'ndjson': read_ndjson, 'csv': read_csv}
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='NDJSON or CSV file to import.')
+        parser.add_argument('--format', choices=sorted(self.readers),
+                            help='Input format, by default the file '
+                                 'extension.')
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Products validated and written per '
+                                 'transaction.')
+        parser.add_argument('--checkpoint',
+                            help='Name of the checkpoint recording the '
+                                 'imported rows in the database, the import '
+                                 'resumes after them when it exists.')
+
+    def get_reader(self, path, name):
+        if name is None:
+            name = os.path.splitext(path)[1].lstrip('.').lower()
+            name = 'ndjson' if name in ('json', 'jsonl') else name
+        if name not in self.readers:
+            raise CommandError('Unknown format %s, use --format.' % name)
+        return self.readers[name]
+
+    def read_checkpoint(self, using, checkpoint, path):
+        if not checkpoint:
+            return 0
+        state = ImportCheckpoint.objects.using(using).filter(
+            name=checkpoint).first()
+        if state is None:
+            return 0
+        if state.source != os.path.abspath(path):
+            raise CommandError('The checkpoint %s belongs to %s.' %
+                               (checkpoint, state.source))
+        return state.rows
+
+    def import_batch(self, using, batch, first_row, vocabulary, checkpoint,
+                     path):
+        serializer = ProductSerializer(data=batch, many=True)
+        if not serializer.is_valid():
+            for offset, errors in enumerate(serializer.errors):
+                if errors:
+                    raise CommandError('Row %d is invalid: %s' % (
+                        first_row + offset + 1, json.dumps(errors)))
+        # The products are plain inserts, the checkpoint commits with them
+        # so a batch is never imported twice.
+        with transaction.atomic(using=using):
+            Product.objects.db_manager(using).bulk_ingest(
+                (to_ingest_item(item) for item in serializer.validated_data),
+                vocabulary=vocabulary)
+            if checkpoint:
+                ImportCheckpoint.objects.using(using).update_or_create(
+                    name=checkpoint, defaults={
+                        'source': os.path.abspath(path),
+                        'rows': first_row + len(batch)})
+
+    def handle(self, *args, **options):
+        path, checkpoint = options['path'], options['checkpoint']
+        reader = self.get_reader(path, options['format'])
+        using = router.db_for_write(Product)
+        done = skipped = self.read_checkpoint(using, checkpoint, path)
+        if skipped:
+            self.stdout.write('Resuming after row %d.' % skipped)
+        rows = islice(reader(path), skipped, None)
+        vocabulary = VocabularyCache(using)
+        start = time.time()
+        while True:
+            batch = list(islice(rows, options['batch_size']))
+            if not batch:
+                break
+            self.import_batch(using, batch, done, vocabulary, checkpoint,
+                              path)
+            done += len(batch)
+            elapsed = time.time() - start
+            self.stdout.write('Imported %d products, %.1f products/s.' % (
+                done, (done - skipped) / elapsed if elapsed else 0))
+        if checkpoint:
+            ImportCheckpoint.objects.using(using).filter(
+                name=checkpoint).delete()
+        self.stdout.write('Import of %d products done in %.2f s.' % (
+            done - skipped, time.time() - start))
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""Load test the product endpoints through the Django test client."""
+
+from __future__ import division
+
+import json
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+
+from api.management.bench import summarize
+from api.models import Product
+
+
+class Command(BaseCommand):
+    help = ('Request the product list and detail endpoints repeatedly and '
+            'report p50/p95/p99 latency and queries per request.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200,
+                            help='Requests per endpoint.')
+        parser.add_argument('--warmup', type=int, default=10,
+                            help='Unmeasured requests per endpoint.')
+        parser.add_argument('--path', action='append', default=[],
+                            help='Extra path to measure, can be repeated.')
+        parser.add_argument('--json', dest='output',
+                            help='Write the results to this JSON file.')
+
+    def get_endpoints(self, paths):
+        product = Product.objects.order_by('pk').first()
+        if product is None:
+            raise CommandError('There are no products to request, load a '
+                               'catalog first.')
+        endpoints = [
+            ('product-list', reverse('api:product-list')),
+            ('product-detail', reverse('api:product-detail',
+                                       kwargs={'pk': product.pk})),
+        ]
+        return endpoints + [(path, path) for path in paths]
+
+    def measure(self, client, path, requests, warmup):
+        for _ in range(warmup):
+            client.get(path)
+        timings, queries = [], 0
+        for _ in range(requests):
+            with CaptureQueriesContext(connection) as context:
+                start = time.time()
+                response = client.get(path)
+                timings.append(time.time() - start)
+            if response.status_code != 200:
+                raise CommandError('GET %s returned %d.' %
+                                   (path, response.status_code))
+            queries += len(context)
+        result = summarize(timings)
+        result['queries'] = queries / requests
+        return result
+
+    def handle(self, *args, **options):
+        # Throttling would reject the benchmark itself, disable every rate.
+        rest_framework = dict(getattr(settings, 'REST_FRAMEWORK', {}),
+                              DEFAULT_THROTTLE_RATES={})
+        results = {}
+        with override_settings(ALLOWED_HOSTS=['testserver'],
+                               REST_FRAMEWORK=rest_framework):
+            client = Client()
+            for name, path in self.get_endpoints(options['path']):
+                results[name] = self.measure(client, path,
+                                             options['requests'],
+                                             options['warmup'])
+                self.stdout.write(
+                    '{name:<24} p50 {p50:8.2f} ms  p95 {p95:8.2f} ms  '
+                    'p99 {p99:8.2f} ms  {queries:6.1f} queries/request'
+                    .format(name=name, **results[name]))
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(results, output, indent=2, sort_keys=True)
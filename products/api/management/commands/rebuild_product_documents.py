@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+"""Rebuild the product documents."""
+
+from django.core.management.base import BaseCommand
+
+from api.documents import build_documents
+from api.models import Product, ProductDocument
+from api.models.product import chunked
+
+
+class Command(BaseCommand):
+    help = ('Build the stored document of every product, run it after '
+            'enabling API_PRODUCT_DOCUMENTS.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000,
+                            help='Products built per query.')
+
+    def handle(self, *args, **options):
+        # Documents of products deleted while the setting was off.
+        ProductDocument.objects.exclude(
+            product__in=Product.objects.all()).delete()
+        count = 0
+        for chunk in chunked(Product.objects.only('pk'),
+                             options['chunk_size']):
+            build_documents([product.pk for product in chunk])
+            count += len(chunk)
+        self.stdout.write('Built %d product documents.' % count)
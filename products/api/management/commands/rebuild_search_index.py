@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+"""Rebuild the product search index."""
+
+from django.core.management.base import BaseCommand
+from django.db import router
+
+from api.models import Product
+from api.search import get_backend
+
+
+class Command(BaseCommand):
+    help = 'Index every product with the configured search backend.'
+
+    def handle(self, *args, **options):
+        backend = get_backend()
+        backend.setup(router.db_for_write(Product))
+        pks = list(Product.objects.values_list('pk', flat=True))
+        backend.update(pks)
+        self.stdout.write('Indexed %d products.' % len(pks))
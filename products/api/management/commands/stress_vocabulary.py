@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+"""Stress the vocabulary interning from concurrent processes."""
+
+from __future__ import division
+
+import json
+import multiprocessing
+import random
+import time
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connections, transaction
+from django.db.models import Count
+from django.utils.six.moves import range
+
+from api.models import Attribute, Keyword, ProductAttribute
+from api.models.product import VocabularyCache
+
+
+def intern_terms(using, keywords, attributes, rounds, size, seed, results):
+    """
+    Resolve ``rounds`` random samples of ``size`` of the ``keywords`` and
+    the ``attributes`` pairs, each in its own transaction, and put the
+    resolved primary keys, retries and errors in ``results``.
+    """
+    generator = random.Random(seed)
+    resolved, retries, errors = {}, 0, []
+    start = time.time()
+    try:
+        for _ in range(rounds):
+            names = generator.sample(keywords, min(size, len(keywords)))
+            pairs = generator.sample(attributes, min(size, len(attributes)))
+            while True:
+                try:
+                    with transaction.atomic(using=using):
+                        vocabulary = VocabularyCache(using)
+                        found = vocabulary.resolve_keywords(names)
+                        resolved.update((('keyword', name), found[name].pk)
+                                        for name in names)
+                        found = vocabulary.resolve_attributes(pairs)
+                        resolved.update((('attribute',) + pair,
+                                         found[pair].pk) for pair in pairs)
+                    break
+                except OperationalError:
+                    # SQLite refuses to upgrade the read lock of a writer
+                    # waiting on another one, the transaction is retried.
+                    retries += 1
+                except Exception as error:
+                    errors.append('%s: %s' % (type(error).__name__, error))
+                    break
+    finally:
+        connections[using].close()
+        results.put({'resolved': resolved, 'retries': retries,
+                     'errors': errors, 'elapsed': time.time() - start})
+
+
+class Command(BaseCommand):
+    help = ('Resolve overlapping keywords and attribute values from '
+            'concurrent processes, each with its own database connection, '
+            'and check every term was inserted once and resolved to the '
+            'same row everywhere. The database must be one the processes '
+            'can share, not an in-memory SQLite one.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=4,
+                            help='Concurrent writers.')
+        parser.add_argument('--rounds', type=int, default=50,
+                            help='Transactions per writer.')
+        parser.add_argument('--terms', type=int, default=100,
+                            help='Distinct keywords and attribute values.')
+        parser.add_argument('--size', type=int, default=10,
+                            help='Terms resolved per transaction.')
+        parser.add_argument('--database', default='default',
+                            help='Database alias to write to.')
+        parser.add_argument('--json', dest='output',
+                            help='Write the results to this JSON file.')
+
+    def check_database(self, using):
+        connection = connections[using]
+        if (connection.vendor == 'sqlite' and connection.is_in_memory_db(
+                connection.settings_dict['NAME'])):
+            raise CommandError('The processes can not share an in-memory '
+                               'database.')
+        # Each process opens its own connection.
+        connection.close()
+
+    def count_duplicates(self, using, prefix):
+        keywords = Keyword.objects.using(using).filter(
+            name__startswith=prefix)
+        attributes = Attribute.objects.using(using).filter(
+            name__startswith=prefix)
+        values = ProductAttribute.objects.using(using).filter(
+            attribute__name__startswith=prefix)
+        return sum(queryset.values(*fields).annotate(
+            count=Count('pk')).filter(count__gt=1).count()
+            for queryset, fields in ((keywords, ('name',)),
+                                     (attributes, ('name',)),
+                                     (values, ('attribute', 'value'))))
+
+    def count_conflicts(self, using, prefix, resolved):
+        """
+        Count the terms resolved to other rows than the ones they are
+        stored in.
+        """
+        stored = dict((('keyword', name), pk) for pk, name in
+                      Keyword.objects.using(using).filter(
+                          name__startswith=prefix).values_list('pk', 'name'))
+        stored.update((('attribute', name, value), pk)
+                      for pk, name, value in
+                      ProductAttribute.objects.using(using).filter(
+                          attribute__name__startswith=prefix).values_list(
+                              'pk', 'attribute__name', 'value'))
+        return sum(1 for term, pks in resolved.items()
+                   if pks != {stored.get(term)})
+
+    def cleanup(self, using, prefix):
+        ProductAttribute.objects.using(using).filter(
+            attribute__name__startswith=prefix).delete()
+        Attribute.objects.using(using).filter(name__startswith=prefix).delete()
+        Keyword.objects.using(using).filter(name__startswith=prefix).delete()
+
+    def handle(self, *args, **options):
+        using = options['database']
+        self.check_database(using)
+        prefix = 'stress-%s-' % uuid.uuid4().hex[:8]
+        terms = options['terms']
+        keywords = ['%s%d' % (prefix, index) for index in range(terms)]
+        # Few attributes with many values, so they are shared the most.
+        attributes = [('%s%d' % (prefix, index % 10), 'value-%d' % index)
+                      for index in range(terms)]
+        results = multiprocessing.Queue()
+        workers = [multiprocessing.Process(target=intern_terms, args=(
+            using, keywords, attributes, options['rounds'], options['size'],
+            seed, results)) for seed in range(options['processes'])]
+        start = time.time()
+        for worker in workers:
+            worker.start()
+        # Drain the queue before joining, a full pipe blocks the writers.
+        outcomes = [results.get() for _ in workers]
+        for worker in workers:
+            worker.join()
+        elapsed = time.time() - start
+
+        resolved, errors = {}, []
+        for outcome in outcomes:
+            for term, pk in outcome['resolved'].items():
+                resolved.setdefault(term, set()).add(pk)
+            errors.extend(outcome['errors'])
+        try:
+            result = {
+                'terms': len(resolved),
+                'transactions': (options['processes'] * options['rounds'] -
+                                 len(errors)),
+                'retries': sum(outcome['retries'] for outcome in outcomes),
+                'errors': len(errors),
+                'duplicates': self.count_duplicates(using, prefix),
+                'conflicts': self.count_conflicts(using, prefix, resolved),
+            }
+        finally:
+            self.cleanup(using, prefix)
+        result['tps'] = result['transactions'] / elapsed
+        self.stdout.write(
+            '{tps:8.1f} transactions/s  {terms} terms  {retries} retries  '
+            '{errors} errors  {duplicates} duplicates  '
+            '{conflicts} conflicts'.format(**result))
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(result, output, indent=2, sort_keys=True)
+        if errors:
+            raise CommandError('Interning failed: %s' % errors[0])
+        if result['duplicates'] or result['conflicts']:
+            raise CommandError('Terms were duplicated or resolved to other '
+                               'rows.')
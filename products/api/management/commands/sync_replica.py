@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+"""Copy the primary SQLite database to a replica."""
+
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from api.db import get_replicas
+
+
+class Command(BaseCommand):
+    help = ('Replace the SQLite replicas with a consistent copy of the '
+            'primary database, standing in for replication in local '
+            'setups.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('aliases', nargs='*', metavar='alias',
+                            help='Replicas to sync, by default all of '
+                                 'API_DATABASE_REPLICAS.')
+
+    def handle(self, *args, **options):
+        primary = connections['default']
+        for alias in options['aliases'] or get_replicas():
+            replica = connections[alias]
+            if primary.vendor != 'sqlite' or replica.vendor != 'sqlite':
+                raise CommandError('Only SQLite databases can be synced.')
+            path = replica.settings_dict['NAME']
+            temporary = path + '.sync'
+            if os.path.exists(temporary):
+                os.remove(temporary)
+            replica.close()
+            with primary.cursor() as cursor:
+                cursor.execute('VACUUM INTO %s', [temporary])
+            os.rename(temporary, path)
+            self.stdout.write('Synced %s.' % alias)
@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+"""Request metrics."""
+
+from __future__ import division
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from django.db import connections
+from django.db.backends.utils import CursorWrapper
+
+from api.management.bench import summarize
+
+_current = threading.local()
+
+
+class MeasuredCursorWrapper(CursorWrapper):
+    """Cursor reporting its queries to the current request metrics."""
+
+    def _measure(self, method, sql, *args):
+        metrics = get_current()
+        if metrics is None:
+            return method(sql, *args)
+        start = time.time()
+        try:
+            return method(sql, *args)
+        finally:
+            metrics.queries.append({'sql': sql,
+                                    'time': time.time() - start})
+
+    def execute(self, sql, params=None):
+        execute = super(MeasuredCursorWrapper, self).execute
+        return self._measure(execute, sql, params)
+
+    def executemany(self, sql, param_list):
+        executemany = super(MeasuredCursorWrapper, self).executemany
+        return self._measure(executemany, sql, param_list)
+
+
+def measure_queries(connection):
+    """Wrap the cursors of ``connection`` with ``MeasuredCursorWrapper``."""
+    if getattr(connection, 'queries_measured', False):
+        return
+    make_cursor = connection.make_cursor
+    make_debug_cursor = connection.make_debug_cursor
+    connection.make_cursor = lambda cursor: MeasuredCursorWrapper(
+        make_cursor(cursor), connection)
+    connection.make_debug_cursor = lambda cursor: MeasuredCursorWrapper(
+        make_debug_cursor(cursor), connection)
+    connection.queries_measured = True
+
+
+class RequestMetrics(object):
+    """
+    Metrics of a single request: the SQL queries it ran, and the time spent
+    in SQL, serialization, rendering and overall, in seconds.
+    """
+
+    def __init__(self):
+        self.queries = []
+        self.timings = {}
+        self.start = time.time()
+        self.total = None
+
+    @property
+    def sql(self):
+        return sum(float(query['time']) for query in self.queries)
+
+    def add(self, name, seconds):
+        self.timings[name] = self.timings.get(name, 0) + seconds
+
+    @contextmanager
+    def capture(self):
+        """
+        Record the queries run on every database inside the block, from
+        this thread, and make this the metrics ``timer`` reports to.
+        """
+        for connection in connections.all():
+            measure_queries(connection)
+        previous = get_current()
+        _current.metrics = self
+        try:
+            yield self
+        finally:
+            _current.metrics = previous
+            self.total = time.time() - self.start
+
+    def stream(self, content, finished):
+        """
+        Capture the metrics while ``content`` is iterated, from whichever
+        thread does it, and call ``finished`` with them at the end.
+        """
+        iterator = iter(content)
+        try:
+            while True:
+                with self.capture():
+                    try:
+                        chunk = next(iterator)
+                    except StopIteration:
+                        return
+                yield chunk
+        finally:
+            finished(self)
+
+    def server_timing(self):
+        """Format the metrics as a ``Server-Timing`` header value."""
+        entries = ['db;dur=%.2f;desc="%d queries"' % (
+            self.sql * 1000, len(self.queries))]
+        for name in sorted(self.timings):
+            entries.append('%s;dur=%.2f' % (name, self.timings[name] * 1000))
+        entries.append('total;dur=%.2f' % (self.total * 1000))
+        return ', '.join(entries)
+
+
+def get_current():
+    """Return the metrics of the request running in this thread, if any."""
+    return getattr(_current, 'metrics', None)
+
+
+@contextmanager
+def timer(name):
+    """Add the time spent in the block to the current request metrics."""
+    metrics = get_current()
+    if metrics is None:
+        yield
+        return
+    start = time.time()
+    try:
+        yield
+    finally:
+        metrics.add(name, time.time() - start)
+
+
+class MetricsRegistry(object):
+    """
+    Per endpoint aggregates of the request metrics, kept in process memory.
+    Only the last ``window`` durations of an endpoint are kept for the
+    percentiles.
+    """
+    window = 1000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+
+    def record(self, endpoint, metrics):
+        with self._lock:
+            entry = self._endpoints.get(endpoint)
+            if entry is None:
+                entry = self._endpoints[endpoint] = {
+                    'requests': 0, 'queries': 0, 'max_queries': 0, 'sql': 0,
+                    'timings': {}, 'totals': deque(maxlen=self.window)}
+            entry['requests'] += 1
+            entry['queries'] += len(metrics.queries)
+            entry['max_queries'] = max(entry['max_queries'],
+                                       len(metrics.queries))
+            entry['sql'] += metrics.sql
+            for name, seconds in metrics.timings.items():
+                entry['timings'][name] = (entry['timings'].get(name, 0) +
+                                          seconds)
+            entry['totals'].append(metrics.total)
+
+    def snapshot(self):
+        """Return the aggregates per endpoint, times in milliseconds."""
+        with self._lock:
+            snapshot = {}
+            for endpoint, entry in self._endpoints.items():
+                requests = entry['requests']
+                snapshot[endpoint] = dict(
+                    summarize(list(entry['totals'])),
+                    requests=requests,
+                    queries=entry['queries'] / requests,
+                    max_queries=entry['max_queries'],
+                    sql=entry['sql'] * 1000 / requests,
+                    **dict((name, seconds * 1000 / requests)
+                           for name, seconds in entry['timings'].items()))
+            return snapshot
+
+    def clear(self):
+        with self._lock:
+            self._endpoints.clear()
+
+
+registry = MetricsRegistry()
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""API middleware."""
+
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from rest_framework.permissions import SAFE_METHODS
+
+from api import db
+from api.metrics import RequestMetrics, get_current, registry
+
+
+class MetricsMiddleware(object):
+    """
+    Measure the queries, SQL time, serialization time, rendering time and
+    total time of every request.
+
+    The metrics are sent in the ``Server-Timing`` header, attached to the
+    response as ``metrics`` and aggregated per endpoint in
+    ``api.metrics.registry``, for streamed responses once the content is
+    consumed. Enabled by the ``API_METRICS`` setting.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'API_METRICS', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics = RequestMetrics()
+        with metrics.capture():
+            response = self.get_response(request)
+        response['Server-Timing'] = metrics.server_timing()
+        response.metrics = metrics
+        if response.streaming:
+            # Streamed content is produced after this returns.
+            response.streaming_content = metrics.stream(
+                response.streaming_content,
+                lambda metrics: self.record(request, metrics))
+        else:
+            self.record(request, metrics)
+        return response
+
+    def record(self, request, metrics):
+        match = request.resolver_match
+        if match is not None:
+            registry.record('%s %s' % (request.method, match.view_name),
+                            metrics)
+
+    def process_template_response(self, request, response):
+        # REST framework responses are rendered after the view returns.
+        start = time.time()
+
+        def rendered(response):
+            metrics = get_current()
+            if metrics is not None:
+                metrics.add('render', time.time() - start)
+
+        response.add_post_render_callback(rendered)
+        return response
+
+
+class ReplicaPinningMiddleware(object):
+    """
+    Read from the primary database during unsafe requests and, for
+    ``API_REPLICA_LAG`` seconds after a request wrote, during the requests
+    of the same client, marked by a cookie. Clients then read their own
+    writes even when the replicas lag behind.
+    """
+    cookie_name = 'api_primary'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not db.get_replicas():
+            return self.get_response(request)
+        db.reset_routing(pinned=request.method not in SAFE_METHODS or
+                         self.cookie_name in request.COOKIES)
+        try:
+            response = self.get_response(request)
+            written = db.has_written()
+        finally:
+            db.reset_routing()
+        if written:
+            response.set_cookie(self.cookie_name, '1', httponly=True,
+                                max_age=getattr(settings, 'API_REPLICA_LAG',
+                                                5))
+        return response
@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10.2 on 2026-10-18 09:39
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('auth', '0008_alter_user_username_max_length'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Attribute',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=64)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Category',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=30)),
+                ('status', models.BooleanField(default=False)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Company',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('business_name', models.CharField(max_length=64, unique=True)),
+                ('website', models.URLField(blank=True, max_length=32)),
+                ('street', models.CharField(max_length=100)),
+                ('num_ext', models.CharField(max_length=10)),
+                ('zip_code', models.CharField(max_length=8)),
+                ('phone_number', models.CharField(max_length=10)),
+                ('phone_name', models.CharField(max_length=50)),
+                ('phone_extension', models.CharField(max_length=5)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Country',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('phone_code', models.CharField(max_length=5, null=True)),
+                ('code', models.CharField(max_length=2)),
+                ('name', models.CharField(max_length=32)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Industry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=32)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Keyword',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=128)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Product',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=64)),
+                ('model', models.CharField(blank=True, max_length=64)),
+                ('brand', models.CharField(max_length=64)),
+                ('price', models.PositiveIntegerField()),
+                ('last_modification', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ProductAttribute',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('value', models.CharField(max_length=128)),
+                ('attribute', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='api.Attribute')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ProductExtraInfo',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=128)),
+                ('description', models.TextField()),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='extras', to='api.Product')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ProductLogistic',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.IntegerField()),
+                ('period', models.CharField(choices=[(b'D', b'Day'), (b'M', b'Month'), (b'Y', b'Year'), (b'W', b'Week')], default=b'W', max_length=10)),
+                ('origin', models.ForeignKey(default=1, on_delete=django.db.models.deletion.CASCADE, to='api.Country')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='logistics', to='api.Product')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='State',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=32)),
+                ('code', models.CharField(max_length=2)),
+                ('country', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='api.Country')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='UserProfile',
+            fields=[
+                ('role', models.CharField(max_length=32)),
+                ('phone', models.CharField(max_length=10)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='profile', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('phone_country', models.ForeignKey(default=1, on_delete=django.db.models.deletion.CASCADE, to='api.Country')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='UserType',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=30)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='user_type',
+            field=models.ForeignKey(default=1, on_delete=django.db.models.deletion.CASCADE, to='api.UserType'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='attributes',
+            field=models.ManyToManyField(to='api.ProductAttribute'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='category',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='api.Category'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='keywords',
+            field=models.ManyToManyField(to='api.Keyword'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='made_in',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='api.Country'),
+        ),
+        migrations.AddField(
+            model_name='company',
+            name='country',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='api.Country'),
+        ),
+        migrations.AddField(
+            model_name='company',
+            name='industry',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='api.Industry'),
+        ),
+        migrations.AddField(
+            model_name='company',
+            name='phone_country',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='api.Country'),
+        ),
+        migrations.AddField(
+            model_name='company',
+            name='product_categories',
+            field=models.ManyToManyField(to='api.Category'),
+        ),
+        migrations.AddField(
+            model_name='company',
+            name='state',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='api.State'),
+        ),
+    ]
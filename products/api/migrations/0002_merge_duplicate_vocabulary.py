@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+from django.db.models import Count, Min
+
+
+def merge_rows(model, fields, references, using):
+    """
+    Keep the first of the ``model`` rows sharing the values of ``fields``,
+    point the ``(model, field, owner)`` ``references`` to it and delete the
+    other rows. References with an ``owner`` are many to many through rows,
+    those which would then be duplicated are deleted instead.
+    """
+    groups = model.objects.using(using).values(*fields).annotate(
+        count=Count('pk'), keep=Min('pk')).filter(count__gt=1)
+    for group in groups:
+        keep = group.pop('keep')
+        group.pop('count')
+        others = list(model.objects.using(using).filter(**group).exclude(
+            pk=keep).values_list('pk', flat=True))
+        for related, field, owner in references:
+            rows = related.objects.using(using)
+            for other in others:
+                if owner is not None:
+                    rows.filter(**{
+                        field: other,
+                        '%s__in' % owner: list(rows.filter(**{
+                            field: keep}).values_list(owner, flat=True)),
+                    }).delete()
+                rows.filter(**{field: other}).update(**{field: keep})
+        model.objects.using(using).filter(pk__in=others).delete()
+
+
+def merge_duplicate_vocabulary(apps, schema_editor):
+    """
+    Merge the keywords, attributes and attribute values stored more than
+    once, before they are made unique.
+    """
+    using = schema_editor.connection.alias
+    Product = apps.get_model('api', 'Product')
+    ProductAttribute = apps.get_model('api', 'ProductAttribute')
+    merge_rows(apps.get_model('api', 'Keyword'), ('name',),
+               [(Product.keywords.through, 'keyword', 'product')], using)
+    merge_rows(apps.get_model('api', 'Attribute'), ('name',),
+               [(ProductAttribute, 'attribute', None)], using)
+    merge_rows(ProductAttribute, ('attribute', 'value'),
+               [(Product.attributes.through, 'productattribute', 'product')],
+               using)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_vocabulary,
+                             migrations.RunPython.noop),
+    ]
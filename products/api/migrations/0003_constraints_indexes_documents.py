@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10.2 on 2026-10-18 09:40
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_merge_duplicate_vocabulary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductDocument',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='document', serialize=False, to='api.Product')),
+                ('data', models.TextField()),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='attribute',
+            name='name',
+            field=models.CharField(max_length=64, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='company',
+            name='phone_country',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='phone_companies', to='api.Country'),
+        ),
+        migrations.AlterField(
+            model_name='keyword',
+            name='name',
+            field=models.CharField(max_length=128, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='brand',
+            field=models.CharField(db_index=True, max_length=64),
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='last_modification',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AlterUniqueTogether(
+            name='productattribute',
+            unique_together=set([('attribute', 'value')]),
+        ),
+        migrations.AlterIndexTogether(
+            name='product',
+            index_together=set([('last_modification', 'id')]),
+        ),
+    ]
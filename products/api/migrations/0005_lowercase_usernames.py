@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+from django.db.models import F
+from django.db.models.functions import Lower
+
+
+def lowercase_usernames(apps, schema_editor):
+    """
+    Lowercase the usernames of the users registered with their email as
+    typed, so the email uniqueness check is an exact lookup on the username
+    index. A username whose lowercase form is taken is left as it is, the
+    lookup then finds the user holding it.
+    """
+    using = schema_editor.connection.alias
+    User = apps.get_model('auth', 'User')
+    users = User.objects.using(using)
+    mixed_case = users.annotate(lower=Lower('username')).filter(
+        username=F('email')).exclude(username=F('lower')).order_by('pk')
+    for pk, username in mixed_case.values_list('pk', 'username'):
+        if not users.filter(username=username.lower()).exists():
+            users.filter(pk=pk).update(username=username.lower())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_import_checkpoint'),
+        ('auth', '0008_alter_user_username_max_length'),
+    ]
+
+    operations = [
+        migrations.RunPython(lowercase_usernames, migrations.RunPython.noop),
+    ]
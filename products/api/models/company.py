@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
 """Company models."""
 
-from django.db import models
+from django.db import models, router
 
 from api.models import Country, Industry, Category, State
 
@@ -20,7 +20,35 @@ class Company(models.Model):
     phone_number = models.CharField(max_length=10)
     phone_name = models.CharField(max_length=50)
     phone_extension = models.CharField(max_length=5)
-    phone_country = models.ForeignKey(Country, on_delete=models.CASCADE)
+    # Named, its default reverse accessor, company_set, clashes with the
+    # one of ``country`` and fails the system checks.
+    phone_country = models.ForeignKey(Country, on_delete=models.CASCADE,
+                                      related_name='phone_companies')
 
     industry = models.ForeignKey(Industry, on_delete=models.CASCADE)
     product_categories = models.ManyToManyField(Category)
+
+    def set_product_categories(self, categories, created=False):
+        """
+        Set the product categories with a single through table insert,
+        deleting the dropped ones. The current categories are taken from
+        the prefetched ones when there are, and not read at all for a just
+        ``created`` company, which has none.
+        """
+        using = router.db_for_write(Company)
+        through = Company.product_categories.through
+        rows = through.objects.using(using).filter(company_id=self.pk)
+        pks = set(category.pk for category in categories)
+        prefetched = getattr(self, '_prefetched_objects_cache', {}).pop(
+            'product_categories', None)
+        if created:
+            current = set()
+        elif prefetched is not None:
+            current = set(category.pk for category in prefetched)
+        else:
+            current = set(rows.values_list('category_id', flat=True))
+        if current - pks:
+            rows.filter(category_id__in=current - pks).delete()
+        through.objects.using(using).bulk_create([
+            through(company_id=self.pk, category_id=pk)
+            for pk in sorted(pks - current)])
@@ -1,19 +1,240 @@
 # -*- coding: utf-8 -*-
 """Product models."""
 
-from django.db import models
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import (IntegrityError, connection, connections, models,
+                       router, transaction)
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Lower
+from django.dispatch import receiver
 
 from api.models import Country, Category
+from api.signals import batch_product_changes, notify_products_changed
+
+# Keep ``IN (...)`` lookups under SQLite's limit of 999 query parameters.
+LOOKUP_BATCH_SIZE = 400
+
+# Times the vocabulary terms are inserted and looked up again before giving
+# up, when concurrent deletes keep removing them in between.
+RESOLVE_ATTEMPTS = 3
+
+# How each vendor skips the rows conflicting with a unique constraint, as
+# ``INSERT {prefix} INTO ... VALUES ... {suffix}``. PostgreSQL needs 9.5.
+INSERT_IGNORING = {
+    'sqlite': ('OR IGNORE', ''),
+    'postgresql': ('', 'ON CONFLICT DO NOTHING'),
+    'mysql': ('IGNORE', ''),
+}
+
+
+def batches(items, size=LOOKUP_BATCH_SIZE):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def chunked(queryset, size):
+    """
+    Iterate over ``queryset`` in lists of at most ``size`` instances ordered
+    by primary key, one keyset query per list, so the prefetches run per
+    chunk and memory does not grow with the table.
+    """
+    queryset = queryset.order_by('pk')
+    last = None
+    while True:
+        page = queryset if last is None else queryset.filter(pk__gt=last)
+        chunk = list(page[:size])
+        if not chunk:
+            return
+        yield chunk
+        last = chunk[-1].pk
+
+
+def bulk_update(objs, fields, using=None):
+    """
+    Save ``fields`` of ``objs``, instances of a single model, with one
+    ``UPDATE ... CASE WHEN`` per batch.
+    """
+    objs = list(objs)
+    if not objs:
+        return
+    model = type(objs[0])
+    fields = [model._meta.get_field(name) for name in fields]
+    # Two parameters per object and field, plus the primary key lookup.
+    size = max(LOOKUP_BATCH_SIZE * 2 // (2 * len(fields) + 1), 1)
+    for batch in batches(objs, size):
+        values = dict((field.name, models.Case(*[
+            models.When(pk=obj.pk, then=models.Value(
+                getattr(obj, field.attname)))
+            for obj in batch], output_field=field)) for field in fields)
+        model._default_manager.using(using).filter(
+            pk__in=[obj.pk for obj in batch]).update(**values)
+
+
+def insert_ignoring(model, fields, rows, using):
+    """
+    Insert ``rows``, tuples of values of the ``fields`` of ``model``,
+    skipping the rows conflicting with a unique constraint, such as the ones
+    a concurrent transaction inserted since they were looked up. Neither
+    ``save`` nor the model signals are involved.
+    """
+    rows = list(rows)
+    if not rows:
+        return
+    connection = connections[using]
+    fields = [model._meta.get_field(name) for name in fields]
+    if connection.vendor not in INSERT_IGNORING:
+        # One savepoint per row, slow but portable.
+        for row in rows:
+            try:
+                with transaction.atomic(using=using):
+                    model._default_manager.using(using).create(**dict(
+                        (field.name, value)
+                        for field, value in zip(fields, row)))
+            except IntegrityError:
+                pass
+        return
+    prefix, suffix = INSERT_IGNORING[connection.vendor]
+    qn = connection.ops.quote_name
+    placeholder = '(%s)' % ', '.join(['%s'] * len(fields))
+    with connection.cursor() as cursor:
+        for batch in batches(rows, LOOKUP_BATCH_SIZE * 2 // len(fields)):
+            cursor.execute('INSERT %s INTO %s (%s) VALUES %s %s' % (
+                prefix, qn(model._meta.db_table),
+                ', '.join(qn(field.column) for field in fields),
+                ', '.join([placeholder] * len(batch)), suffix), [
+                    field.get_db_prep_save(value, connection)
+                    for row in batch for field, value in zip(fields, row)])
+
+
+def _sync_rows(current, wanted, fields, create, using):
+    """
+    Make the ``current`` rows hold the ``wanted`` field dicts: rows with the
+    same values are kept, the other rows are reused for the remaining values
+    with ``bulk_update``, then the leftovers are deleted or created in bulk.
+    """
+    def row_key(values):
+        return tuple(getattr(value, 'pk', value) for value in values)
+
+    unmatched = {}
+    for values in wanted:
+        key = row_key(values[name] for name in fields)
+        unmatched[key] = unmatched.get(key, 0) + 1
+    stale = []
+    for row in current:
+        key = row_key(getattr(row, row._meta.get_field(name).attname)
+                      for name in fields)
+        if unmatched.get(key):
+            unmatched[key] -= 1
+        else:
+            stale.append(row)
+    remaining = []
+    for values in reversed(wanted):
+        key = row_key(values[name] for name in fields)
+        if unmatched.get(key):
+            unmatched[key] -= 1
+            remaining.append(values)
+    remaining.reverse()
+    reused = stale[:len(remaining)]
+    for row, values in zip(reused, remaining):
+        for name in fields:
+            setattr(row, name, values[name])
+    bulk_update(reused, fields, using)
+    stale = stale[len(reused):]
+    if stale:
+        type(stale[0])._default_manager.using(using).filter(
+            pk__in=[row.pk for row in stale]).delete()
+    create(remaining[len(reused):])
+
+
+class NamedQuerySet(models.QuerySet):
+    """Queryset for vocabulary models identified by their ``name``."""
+
+    def _lookup(self, names, found):
+        for batch in batches(names):
+            for instance in self.filter(name__in=batch):
+                found.setdefault(instance.name, instance)
+
+    def resolve(self, names):
+        """
+        Return a ``{name: instance}`` dict for ``names``, inserting the
+        missing ones in bulk. Names inserted concurrently are reused, not
+        duplicated.
+        """
+        names = set(names)
+        found = {}
+        self._lookup(names, found)
+        for _ in range(RESOLVE_ATTEMPTS):
+            missing = names.difference(found)
+            if not missing:
+                break
+            insert_ignoring(self.model, ('name',),
+                            [(name,) for name in missing], self.db)
+            self._lookup(missing, found)
+        else:
+            if len(found) < len(names):
+                raise IntegrityError('%s names could not be resolved.' %
+                                     self.model._meta.object_name)
+        return found
 
 
 class Keyword(models.Model):
     """Keyword model."""
-    name = models.CharField(max_length=128)
+    name = models.CharField(max_length=128, unique=True)
+
+    objects = NamedQuerySet.as_manager()
 
 
 class Attribute(models.Model):
     """Attribute model."""
-    name = models.CharField(max_length=64)
+    name = models.CharField(max_length=64, unique=True)
+
+    objects = NamedQuerySet.as_manager()
+
+
+class ProductAttributeQuerySet(models.QuerySet):
+    """Product attribute queryset."""
+
+    def _lookup(self, pairs, attributes, found):
+        names = {attribute.pk: name for name, attribute in attributes.items()}
+        for batch in batches(pairs):
+            wanted = set(batch)
+            queryset = self.filter(
+                attribute__in={attributes[name].pk for name, _ in batch},
+                value__in={value for _, value in batch})
+            for instance in queryset:
+                name = names[instance.attribute_id]
+                if (name, instance.value) in wanted:
+                    instance.attribute = attributes[name]
+                    found.setdefault((name, instance.value), instance)
+
+    def resolve(self, pairs):
+        """
+        Return a ``{(name, value): instance}`` dict for the attribute
+        ``pairs``, inserting the missing attributes and values in bulk.
+        Pairs inserted concurrently are reused, not duplicated.
+        """
+        pairs = set(pairs)
+        attributes = Attribute.objects.using(self.db).resolve(
+            name for name, _ in pairs)
+        found = {}
+        self._lookup(pairs, attributes, found)
+        for _ in range(RESOLVE_ATTEMPTS):
+            missing = pairs.difference(found)
+            if not missing:
+                break
+            insert_ignoring(self.model, ('attribute', 'value'), [
+                (attributes[name].pk, value) for name, value in missing
+            ], self.db)
+            self._lookup(missing, attributes, found)
+        else:
+            if len(found) < len(pairs):
+                raise IntegrityError('Attribute values could not be '
+                                     'resolved.')
+        return found
 
 
 class ProductAttribute(models.Model):
@@ -21,19 +242,353 @@ class ProductAttribute(models.Model):
     value = models.CharField(max_length=128)
     attribute = models.ForeignKey(Attribute, on_delete=models.CASCADE)
 
+    objects = ProductAttributeQuerySet.as_manager()
+
+    class Meta:
+        unique_together = ('attribute', 'value')
+
+
+def _related_exists(model):
+    """``EXISTS`` subquery over the ``model`` rows related to a product."""
+    qn = connection.ops.quote_name
+    sql = 'EXISTS (SELECT 1 FROM {table} WHERE {table}.{fk} = {product}.{pk})'
+    return RawSQL(sql.format(
+        table=qn(model._meta.db_table),
+        fk=qn(model._meta.get_field('product').column),
+        product=qn(Product._meta.db_table),
+        pk=qn(Product._meta.pk.column),
+    ), (), output_field=models.BooleanField())
+
+
+class InternTable(object):
+    """
+    Process local LRU of the vocabulary terms of ``model``, keyed by
+    database alias and term, holding the column values needed to rebuild
+    the instances, up to ``API_VOCABULARY_CACHE_SIZE`` terms.
+
+    The terms are tagged with the version of ``model`` in ``api.cache``,
+    bumped whenever a term is renamed or deleted, in any process, and the
+    table is dropped when it changes. Other processes only see the bumps
+    through ``API_SHARED_CACHE``, without one the table is not used. Only
+    committed terms are added, and the table is cleared when a database is
+    flushed.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self._lock = threading.Lock()
+        self._terms = OrderedDict()
+        self._version = None
+
+    def get_version(self):
+        """
+        Return the current version of the terms, ``None`` when the processes
+        do not share versions and the table can not be used.
+        """
+        # api.cache imports the models.
+        from api.cache import get_shared_cache, versions
+        if get_shared_cache() is None:
+            return None
+        return versions.get(self.model._meta.label_lower)
+
+    def get_many(self, using, terms, version):
+        """
+        Return a ``{term: values}`` dict of the known ``terms``, as of
+        ``version``.
+        """
+        found = {}
+        if version is None:
+            return found
+        with self._lock:
+            if version != self._version:
+                self._terms.clear()
+                self._version = version
+            for term in terms:
+                values = self._terms.pop((using, term), None)
+                if values is not None:
+                    self._terms[(using, term)] = values
+                    found[term] = values
+        return found
+
+    def set_many(self, using, items, version):
+        """Add the ``(term, values)`` ``items`` read as of ``version``."""
+        size = getattr(settings, 'API_VOCABULARY_CACHE_SIZE', 10000)
+        with self._lock:
+            if version is None or version != self._version:
+                return
+            for term, values in items:
+                self._terms.pop((using, term), None)
+                self._terms[(using, term)] = values
+            while len(self._terms) > size:
+                self._terms.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._terms.clear()
+
+
+interned_keywords = InternTable(Keyword)
+interned_attributes = InternTable(ProductAttribute)
+
+
+def clear_interned_vocabulary(**kwargs):
+    interned_keywords.clear()
+    interned_attributes.clear()
+
+
+class VocabularyCache(object):
+    """
+    Keywords and attribute values resolved so far, so names seen before
+    cost no query. Only share a cache across transactions that committed,
+    the instances it holds may otherwise have been rolled back.
+
+    Terms of the process wide ``InternTable`` cost no query either, when
+    there is a shared cache, they are rebuilt from their columns, without
+    the related ``Attribute``.
+    """
+
+    def __init__(self, using=None):
+        self.using = using or router.db_for_write(Keyword)
+        self.keywords = {}
+        self.attributes = {}
+
+    def _intern(self, table, queryset, terms, build, values):
+        version = table.get_version()
+        known = table.get_many(self.using, terms, version)
+        found = dict((term, build(term, known[term])) for term in known)
+        missing = set(terms).difference(known)
+        if missing:
+            resolved = queryset.using(self.using).resolve(missing)
+            found.update(resolved)
+            items = [(term, values(instance))
+                     for term, instance in resolved.items()]
+            transaction.on_commit(
+                lambda: table.set_many(self.using, items, version),
+                using=self.using)
+        return found
+
+    def resolve_keywords(self, names):
+        missing = set(names).difference(self.keywords)
+        if missing:
+            self.keywords.update(self._intern(
+                interned_keywords, Keyword.objects, missing,
+                lambda name, pk: Keyword(pk=pk, name=name),
+                lambda keyword: keyword.pk))
+        return self.keywords
+
+    def resolve_attributes(self, pairs):
+        missing = set(pairs).difference(self.attributes)
+        if missing:
+            self.attributes.update(self._intern(
+                interned_attributes, ProductAttribute.objects, missing,
+                lambda pair, values: ProductAttribute(
+                    pk=values[0], attribute_id=values[1], value=pair[1]),
+                lambda instance: (instance.pk, instance.attribute_id)))
+        return self.attributes
+
+
+class ProductQuerySet(models.QuerySet):
+    """Product queryset."""
+
+    def with_related(self, fields=None):
+        """
+        Load everything ``ProductSerializer`` renders in a fixed number of
+        queries, regardless of how many products are fetched. When given,
+        only the relations among ``fields`` are loaded.
+        """
+        # The origin country and the category are rendered from their keys,
+        # or from the reference cache when expanded, and need no join.
+        def wanted(name):
+            return fields is None or name in fields
+
+        return self.prefetch_related(*[lookup for lookup in (
+            'keywords',
+            models.Prefetch(
+                'attributes',
+                queryset=ProductAttribute.objects.select_related('attribute')),
+            'extras',
+            'logistics',
+        ) if wanted(getattr(lookup, 'prefetch_through', lookup))])
+
+    def with_flags(self):
+        """
+        Annotate ``has_extras`` and ``has_logistics`` so the completeness
+        flags can be rendered and filtered on without per-row queries.
+        """
+        return self.annotate(has_extras=_related_exists(ProductExtraInfo),
+                             has_logistics=_related_exists(ProductLogistic))
+
+    def facets(self):
+        """
+        Count the products per attribute value and per category, with one
+        ``GROUP BY`` each.
+        """
+        through = self.model.attributes.through.objects.filter(
+            product__in=self)
+        return {
+            # Values are lowercased on write, older rows may not be.
+            'attributes': [{
+                'name': row['productattribute__attribute__name'],
+                'value': row['facet_value'],
+                'count': row['count'],
+            } for row in through.annotate(
+                facet_value=Lower('productattribute__value')).values(
+                    'productattribute__attribute__name',
+                    'facet_value').annotate(
+                        count=models.Count('product', distinct=True)).order_by(
+                            'productattribute__attribute__name',
+                            'facet_value')],
+            'categories': [{
+                'id': row['category'],
+                'count': row['count'],
+            } for row in self.order_by().values('category').annotate(
+                count=models.Count('pk')).order_by('category')],
+        }
+
+    def bulk_ingest(self, items, vocabulary=None):
+        """
+        Create many products in a single transaction.
+
+        Each item holds the product field values plus ``keywords`` (names),
+        ``attributes`` (``(name, value)`` pairs), ``extras`` and
+        ``logistics`` (field dicts). Keywords and attributes are resolved
+        with a few set-based queries, through ``vocabulary`` when a
+        ``VocabularyCache`` is given, and every relation is written with
+        ``bulk_create``.
+        """
+        if vocabulary is None:
+            vocabulary = VocabularyCache(self.db)
+        items = [dict(item) for item in items]
+        relations = [{
+            'keywords': item.pop('keywords', ()),
+            'attributes': item.pop('attributes', ()),
+            'extras': item.pop('extras', ()),
+            'logistics': item.pop('logistics', ()),
+        } for item in items]
+        with transaction.atomic(using=self.db), batch_product_changes():
+            keywords = vocabulary.resolve_keywords(
+                name for relation in relations
+                for name in relation['keywords'])
+            attributes = vocabulary.resolve_attributes(
+                pair for relation in relations
+                for pair in relation['attributes'])
+
+            products = [self.model(**item) for item in items]
+            if connections[self.db].features.can_return_ids_from_bulk_insert:
+                products = self.bulk_create(products)
+            else:
+                # Without RETURNING the primary keys of bulk inserted rows
+                # are unknown, so fall back to one INSERT per product.
+                for product in products:
+                    product.save(force_insert=True, using=self.db)
+
+            product_keywords, product_attributes = [], []
+            extras, logistics = [], []
+            for product, relation in zip(products, relations):
+                product_keywords.extend(
+                    self.model.keywords.through(
+                        product_id=product.pk, keyword_id=keyword_id)
+                    for keyword_id in {keywords[name].pk
+                                       for name in relation['keywords']})
+                product_attributes.extend(
+                    self.model.attributes.through(
+                        product_id=product.pk, productattribute_id=pa_id)
+                    for pa_id in {attributes[pair].pk
+                                  for pair in relation['attributes']})
+                extras.extend(ProductExtraInfo(product=product, **extra)
+                              for extra in relation['extras'])
+                logistics.extend(ProductLogistic(product=product, **logistic)
+                                 for logistic in relation['logistics'])
+            self.model.keywords.through.objects.using(self.db).bulk_create(
+                product_keywords)
+            self.model.attributes.through.objects.using(self.db).bulk_create(
+                product_attributes)
+            ProductExtraInfo.objects.using(self.db).bulk_create(extras)
+            ProductLogistic.objects.using(self.db).bulk_create(logistics)
+            notify_products_changed(product.pk for product in products)
+        return products
+
 
 class Product(models.Model):
     """Product model."""
     name = models.CharField(max_length=64)
     model = models.CharField(max_length=64, blank=True)
-    brand = models.CharField(max_length=64)
+    brand = models.CharField(max_length=64, db_index=True)
     price = models.PositiveIntegerField()
     made_in = models.ForeignKey(Country, on_delete=models.CASCADE)
-    last_modification = models.DateTimeField(auto_now_add=True)
+    last_modification = models.DateTimeField(auto_now=True)
     category = models.ForeignKey(Category, on_delete=models.CASCADE)
     keywords = models.ManyToManyField(Keyword)
     attributes = models.ManyToManyField(ProductAttribute)
 
+    objects = ProductQuerySet.as_manager()
+
+    class Meta:
+        # Backs the keyset pagination of the product list.
+        index_together = ('last_modification', 'id')
+
+    def apply_update(self, values, keywords=None, attributes=None,
+                     extras=None, logistics=None, merge=False):
+        """
+        Apply an edit in a single transaction.
+
+        ``values`` are saved on the product, bumping ``last_modification``.
+        ``keywords`` (names) and ``attributes`` (``(name, value)`` pairs)
+        replace the current sets, only the difference is written to the
+        relation tables. ``extras`` and ``logistics`` (field dicts) are
+        appended when ``merge`` is set and replace the current rows
+        otherwise. Relations left to ``None`` are not changed.
+        """
+        using = router.db_for_write(Product, instance=self)
+        with transaction.atomic(using=using), batch_product_changes():
+            for name, value in values.items():
+                setattr(self, name, value)
+            self.save(using=using)
+            vocabulary = VocabularyCache(using)
+            if keywords is not None:
+                keywords = set(keywords)
+                resolved = vocabulary.resolve_keywords(keywords)
+                self._set_related('keywords', 'keyword_id', {
+                    resolved[name].pk for name in keywords}, using)
+            if attributes is not None:
+                attributes = set(attributes)
+                resolved = vocabulary.resolve_attributes(attributes)
+                self._set_related('attributes', 'productattribute_id', {
+                    resolved[pair].pk for pair in attributes}, using)
+            if extras is not None:
+                self._write_rows(ProductExtraInfo, 'extras', extras,
+                                 ('title', 'description'), merge, using)
+            if logistics is not None:
+                self._write_rows(ProductLogistic, 'logistics', logistics,
+                                 ('origin', 'quantity', 'period'), merge,
+                                 using)
+
+    def _set_related(self, relation, column, pks, using):
+        through = getattr(Product, relation).through
+        rows = through.objects.using(using).filter(product_id=self.pk)
+        current = set(rows.values_list(column, flat=True))
+        if current - pks:
+            rows.filter(**{'%s__in' % column: current - pks}).delete()
+        through.objects.using(using).bulk_create([
+            through(**{'product_id': self.pk, column: pk})
+            for pk in pks - current])
+
+    def _write_rows(self, model, relation, wanted, fields, merge, using):
+        def create(rows):
+            model.objects.using(using).bulk_create(
+                [model(product=self, **values) for values in rows])
+
+        # Keep the completeness flag of the ``with_flags`` annotation right.
+        flag = 'has_%s' % relation
+        if merge:
+            create(wanted)
+            if wanted:
+                setattr(self, flag, True)
+        else:
+            _sync_rows(getattr(self, relation).using(using), wanted, fields,
+                       create, using)
+            setattr(self, flag, bool(wanted))
+
 
 class ProductExtraInfo(models.Model):
     """Product extra information model"""
@@ -57,3 +612,82 @@ class ProductLogistic(models.Model):
                               max_length=10)
     product = models.ForeignKey(Product, on_delete=models.CASCADE,
                                 related_name='logistics')
+
+
+class ProductDocument(models.Model):
+    """
+    Product as rendered by the API, stored as JSON and maintained by
+    ``api.documents``.
+    """
+    product = models.OneToOneField(Product, on_delete=models.CASCADE,
+                                   primary_key=True, related_name='document')
+    data = models.TextField()
+
+
+class ImportCheckpoint(models.Model):
+    """
+    Rows of a catalog file imported by the ``import_catalog`` command, saved
+    in the transaction of each batch.
+    """
+    name = models.CharField(max_length=255, unique=True)
+    source = models.CharField(max_length=1024)
+    rows = models.PositiveIntegerField(default=0)
+
+
+@receiver(models.signals.post_save, sender=Product)
+@receiver(models.signals.post_delete, sender=Product)
+def product_saved(sender, instance, **kwargs):
+    notify_products_changed([instance.pk])
+
+
+@receiver(models.signals.m2m_changed, sender=Product.keywords.through)
+@receiver(models.signals.m2m_changed, sender=Product.attributes.through)
+def product_vocabulary_changed(sender, instance, action, reverse, pk_set,
+                               **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        notify_products_changed([instance.pk])
+    elif pk_set:
+        notify_products_changed(pk_set)
+
+
+@receiver(models.signals.post_save, sender=Keyword)
+@receiver(models.signals.post_save, sender=ProductAttribute)
+def vocabulary_saved(sender, instance, created, raw, **kwargs):
+    # A new term has no products yet, unless it is loaded from a fixture
+    # after the products pointing to it.
+    if created and not raw:
+        return
+    notify_products_changed(
+        instance.product_set.values_list('pk', flat=True))
+
+
+@receiver(models.signals.pre_delete, sender=Keyword)
+@receiver(models.signals.pre_delete, sender=ProductAttribute)
+def vocabulary_deleting(sender, instance, **kwargs):
+    # The through rows are deleted along with the term, without m2m_changed.
+    instance._product_pks = list(
+        instance.product_set.values_list('pk', flat=True))
+
+
+@receiver(models.signals.post_delete, sender=Keyword)
+@receiver(models.signals.post_delete, sender=ProductAttribute)
+def vocabulary_deleted(sender, instance, **kwargs):
+    notify_products_changed(getattr(instance, '_product_pks', ()))
+
+
+@receiver(models.signals.post_save, sender=Attribute)
+def attribute_saved(sender, instance, created, raw, **kwargs):
+    if created and not raw:
+        return
+    notify_products_changed(Product.objects.filter(
+        attributes__attribute=instance).values_list('pk', flat=True))
+
+
+@receiver(models.signals.post_save, sender=ProductExtraInfo)
+@receiver(models.signals.post_delete, sender=ProductExtraInfo)
+@receiver(models.signals.post_save, sender=ProductLogistic)
+@receiver(models.signals.post_delete, sender=ProductLogistic)
+def product_detail_saved(sender, instance, **kwargs):
+    notify_products_changed([instance.product_id])
@@ -3,7 +3,7 @@
 
 from django.conf import settings
 from django.contrib.auth.models import User
-from django.db import models
+from django.db import models, transaction
 from django.dispatch import receiver
 
 from api.models import Country
@@ -27,7 +27,33 @@ class UserProfile(models.Model):
                                 on_delete=models.CASCADE)
 
 
+def get_username(email):
+    """
+    Return the username of the user registered with ``email``, its
+    lowercase form. Usernames are unique, so an exact lookup doubles as the
+    email uniqueness check. The usernames stored before were lowercased by
+    the ``0005_lowercase_usernames`` migration.
+    """
+    return email.lower()
+
+
+def register_user(email, password, profile=None, **fields):
+    """
+    Register a user and its ``profile``, an unsaved ``UserProfile``, in a
+    single transaction of two inserts: the password is hashed before the
+    user is inserted, and the profile inserted with its final values.
+    """
+    user = User(username=get_username(email), email=email, **fields)
+    user.set_password(password)
+    user.new_profile = profile
+    with transaction.atomic():
+        user.save(force_insert=True)
+    return user
+
+
 @receiver(models.signals.post_save, sender=User)
 def save_profile(sender, instance, update_fields, created, **kwargs):
     if created:
-        UserProfile.objects.create(user=instance)
+        profile = getattr(instance, 'new_profile', None) or UserProfile()
+        profile.user = instance
+        profile.save(force_insert=True)
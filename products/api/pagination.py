@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""API pagination."""
+
+from collections import Mapping
+
+from django.conf import settings
+from django.utils import six
+
+from rest_framework import pagination
+
+
+def get_max_page_size():
+    """The biggest page a client can ask for, ``API_MAX_PAGE_SIZE``."""
+    return getattr(settings, 'API_MAX_PAGE_SIZE', 200)
+
+
+class CursorPagination(pagination.CursorPagination):
+    """
+    Keyset pagination ordered by ``id``, every page costs the same no matter
+    how deep it is. The client can ask for a smaller or bigger page with
+    ``page_size``, up to ``API_MAX_PAGE_SIZE``. Pages of ``values()`` rows
+    are paginated like pages of instances, when the rows hold the ordering
+    fields.
+    """
+    ordering = 'id'
+    page_size_query_param = 'page_size'
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, get_max_page_size())
+
+    def _get_position_from_instance(self, instance, ordering):
+        if not isinstance(instance, Mapping):
+            return super(CursorPagination, self)._get_position_from_instance(
+                instance, ordering)
+        return six.text_type(instance[ordering[0].lstrip('-')])
+
+
+class ProductPagination(CursorPagination):
+    """Product pagination, the most recently modified products first."""
+    ordering = ('-last_modification', '-id')
+
+
+class UserProfilePagination(CursorPagination):
+    """User profile pagination, profiles are keyed by their user."""
+    ordering = 'pk'
+
+
+class SearchPagination(pagination.PageNumberPagination):
+    """Page number pagination for ranked search results."""
+    page_size_query_param = CursorPagination.page_size_query_param
+
+    @property
+    def max_page_size(self):
+        return get_max_page_size()
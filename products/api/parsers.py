@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+"""API parsers."""
+
+import codecs
+
+from django.conf import settings
+from django.utils import six
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+
+from api.encoders import get_backend
+from api.renderers import FastJSONRenderer
+
+
+class FastJSONParser(JSONParser):
+    """
+    JSON parser decoding with the first installed backend of
+    ``API_JSON_BACKENDS``, straight from the request bytes when they are
+    UTF-8.
+    """
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        try:
+            content = stream.read()
+            if codecs.lookup(encoding).name != 'utf-8':
+                content = content.decode(encoding)
+            return get_backend().loads(content)
+        except ValueError as exc:
+            raise ParseError('JSON parse error - %s' % six.text_type(exc))
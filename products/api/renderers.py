@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""API renderers."""
+
+from rest_framework.renderers import JSONRenderer
+
+from api.encoders import get_backend
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSON renderer encoding with the first installed backend of
+    ``API_JSON_BACKENDS``, straight to bytes. Indented and ASCII only
+    output, as for the browsable API, is left to REST framework.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return bytes()
+        if (self.ensure_ascii or not self.compact or self.get_indent(
+                accepted_media_type, renderer_context or {}) is not None):
+            return super(FastJSONRenderer, self).render(
+                data, accepted_media_type, renderer_context)
+        return get_backend().dumps(data)
+
+
+class StreamingJSONRenderer(FastJSONRenderer):
+    """
+    JSON renderer which can also encode an iterable of rows lazily, as the
+    items of a JSON array.
+    """
+
+    def render_row(self, row):
+        return FastJSONRenderer.render(self, row)
+
+    def stream(self, rows):
+        """Yield ``rows`` encoded as a JSON array, a row at a time."""
+        separator = b'['
+        for row in rows:
+            yield separator + self.render_row(row)
+            separator = b','
+        yield b']' if separator == b',' else b'[]'
+
+
+class NDJSONRenderer(StreamingJSONRenderer):
+    """Newline delimited JSON, one row per line."""
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, list):
+            return b''.join(self.stream(data))
+        return self.render_row(data) + b'\n'
+
+    def stream(self, rows):
+        for row in rows:
+            yield self.render_row(row) + b'\n'
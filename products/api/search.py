@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+"""Product search."""
+
+import re
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import Q
+from django.utils.functional import cached_property
+from django.utils.module_loading import import_string
+
+from api.models import Product
+from api.models.product import batches
+from api.signals import products_changed
+
+
+class SearchBackend(object):
+    """
+    Product search backend.
+
+    A backend indexes the name, brand and model of the products, their
+    keywords and their extras, and returns the primary keys of the products
+    matching a query, best matches first. ``vendors`` lists the databases
+    the backend works with, ``None`` standing for any of them.
+    """
+    vendors = None
+
+    def setup(self, using):
+        """Create the index structures in the ``using`` database."""
+
+    def update(self, pks):
+        """Index the products ``pks``, dropping the deleted ones."""
+
+    def search(self, query, offset, limit):
+        """Return the primary keys of a page of results for ``query``."""
+        raise NotImplementedError
+
+    def count(self, query):
+        """Return the number of results for ``query``."""
+        raise NotImplementedError
+
+
+class DatabaseSearchBackend(SearchBackend):
+    """
+    Search backend without an index, it filters the product table and
+    works with any database. Results are ordered by last modification.
+    """
+
+    def get_queryset(self, query):
+        queryset = Product.objects.all()
+        for term in query.split():
+            queryset = queryset.filter(
+                Q(name__icontains=term) | Q(brand__icontains=term) |
+                Q(model__icontains=term) | Q(keywords__name__icontains=term) |
+                Q(extras__title__icontains=term) |
+                Q(extras__description__icontains=term))
+        return queryset.distinct()
+
+    def search(self, query, offset, limit):
+        return list(self.get_queryset(query).order_by(
+            '-last_modification', '-id').values_list(
+                'pk', flat=True)[offset:offset + limit])
+
+    def count(self, query):
+        return self.get_queryset(query).count()
+
+
+class SQLiteFTS5Backend(SearchBackend):
+    """
+    Search backend on an SQLite FTS5 table with one row per product, rowid
+    being the product primary key. Results are ordered by rank.
+    """
+    vendors = ('sqlite',)
+    table = 'api_product_search'
+    columns = ('name', 'brand', 'model', 'keywords', 'extras')
+
+    def setup(self, using):
+        connection = connections[using]
+        if connection.vendor != 'sqlite':
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'CREATE VIRTUAL TABLE IF NOT EXISTS %s USING fts5(%s)' % (
+                    self.table, ', '.join(self.columns)))
+
+    def get_document(self, product):
+        return (
+            product.pk, product.name, product.brand, product.model,
+            ' '.join(keyword.name for keyword in product.keywords.all()),
+            ' '.join('%s %s' % (extra.title, extra.description)
+                     for extra in product.extras.all()),
+        )
+
+    def update(self, pks):
+        using = router.db_for_write(Product)
+        delete = 'DELETE FROM {0} WHERE rowid IN ({1})'
+        insert = 'INSERT INTO {0} (rowid, {1}) VALUES ({2})'.format(
+            self.table, ', '.join(self.columns),
+            ', '.join(['%s'] * (len(self.columns) + 1)))
+        for batch in batches(pks):
+            products = Product.objects.using(using).filter(
+                pk__in=batch).prefetch_related('keywords', 'extras')
+            documents = [self.get_document(product) for product in products]
+            with connections[using].cursor() as cursor:
+                cursor.execute(delete.format(
+                    self.table, ', '.join(['%s'] * len(batch))), batch)
+                cursor.executemany(insert, documents)
+
+    def get_match(self, query):
+        """
+        Turn the user ``query`` into an FTS5 expression matching every term
+        as a prefix, so the FTS5 query syntax never reaches the index.
+        """
+        terms = re.findall(r'\w+', query, re.UNICODE)
+        return ' '.join('"%s"*' % term for term in terms)
+
+    def search(self, query, offset, limit):
+        match = self.get_match(query)
+        if not match:
+            return []
+        with connections[router.db_for_read(Product)].cursor() as cursor:
+            cursor.execute(
+                'SELECT rowid FROM {0} WHERE {0} MATCH %s ORDER BY rank '
+                'LIMIT %s OFFSET %s'.format(self.table),
+                [match, limit, offset])
+            return [row[0] for row in cursor.fetchall()]
+
+    def count(self, query):
+        match = self.get_match(query)
+        if not match:
+            return 0
+        with connections[router.db_for_read(Product)].cursor() as cursor:
+            cursor.execute(
+                'SELECT COUNT(*) FROM {0} WHERE {0} MATCH %s'.format(
+                    self.table), [match])
+            return cursor.fetchone()[0]
+
+
+def get_backend():
+    """
+    Return the search backend configured by ``API_SEARCH_BACKEND``, or the
+    ``DatabaseSearchBackend`` when it does not work with the database the
+    products are written to.
+    """
+    backend = import_string(getattr(settings, 'API_SEARCH_BACKEND',
+                                    'api.search.DatabaseSearchBackend'))
+    vendor = connections[router.db_for_write(Product)].vendor
+    if backend.vendors is not None and vendor not in backend.vendors:
+        backend = DatabaseSearchBackend
+    return backend()
+
+
+class SearchResults(object):
+    """
+    Ranked results for a query, loaded page by page so they can be handed
+    to a paginator.
+
+    When ``filtered`` is set, the results are restricted to ``queryset``:
+    every match is read, ``scan_size`` at a time, and intersected with it.
+    """
+    scan_size = 1000
+
+    def __init__(self, query, queryset, backend=None, filtered=False):
+        self.query = query
+        self.queryset = queryset
+        self.backend = backend or get_backend()
+        self.filtered = filtered
+
+    @cached_property
+    def filtered_pks(self):
+        pks = []
+        offset = 0
+        while True:
+            ranked = self.backend.search(self.query, offset, self.scan_size)
+            allowed = set()
+            for batch in batches(ranked):
+                allowed.update(self.queryset.filter(
+                    pk__in=batch).values_list('pk', flat=True))
+            pks.extend(pk for pk in ranked if pk in allowed)
+            if len(ranked) < self.scan_size:
+                return pks
+            offset += self.scan_size
+
+    def count(self):
+        if self.filtered:
+            return len(self.filtered_pks)
+        return self.backend.count(self.query)
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start = index.start or 0
+        if self.filtered:
+            pks = self.filtered_pks[start:index.stop]
+        else:
+            pks = self.backend.search(self.query, start, index.stop - start)
+        products = self.queryset.in_bulk(pks)
+        return [products[pk] for pk in pks if pk in products]
+
+
+def setup_search_index(sender, using, **kwargs):
+    get_backend().setup(using)
+
+
+def update_search_index(sender, pks, **kwargs):
+    # Index once the changes are committed, the transaction writing them
+    # does not wait for the index.
+    transaction.on_commit(lambda: get_backend().update(pks),
+                          using=router.db_for_write(Product))
+
+
+products_changed.connect(update_search_index)
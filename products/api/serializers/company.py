@@ -1,14 +1,21 @@
 # -*- coding: utf-8 -*-
 """Company serializers."""
 
+from django.db import transaction
+
 from rest_framework import serializers
 
 from api.models.static import Country
 from api.models.company import Company
+from api.serializers.fields import CachedPrimaryKeyRelatedField
+from api.serializers.mixins import SparseFieldsMixin
+from api.serializers.rows import RowSerializer
+from api.serializers.static import CategorySerializer, IndustrySerializer
 
 
 class AddressSerializer(serializers.ModelSerializer):
     """Address serializer."""
+    serializer_related_field = CachedPrimaryKeyRelatedField
 
     class Meta:
         model = Company
@@ -20,24 +27,49 @@ class MainPhoneSerializer(serializers.Serializer):
     number = serializers.CharField(source='phone_number')
     name = serializers.CharField(source='phone_name')
     extension = serializers.CharField(source='phone_extension')
-    country = serializers.PrimaryKeyRelatedField(
+    country = CachedPrimaryKeyRelatedField(
         queryset=Country.objects.all(), source='phone_country')
 
 
-class CompanySerializer(serializers.ModelSerializer):
-    """Company serializer."""
+class CompanySerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """
+    Company serializer.
+
+    Companies are represented straight from their columns by the
+    ``RowSerializer`` compiled once per serializer, the one list rows are
+    rendered with, so the nested ``source='*'`` serializers cost no
+    lookups. ``product_categories`` should be prefetched.
+    """
     address = AddressSerializer(source='*')
     main_phone = MainPhoneSerializer(source='*')
+    serializer_related_field = CachedPrimaryKeyRelatedField
+    expandable = {'industry': IndustrySerializer,
+                  'product_categories': CategorySerializer}
 
     class Meta:
         model = Company
         fields = ('id', 'business_name', 'website', 'industry',
                   'product_categories', 'address', 'main_phone',)
 
+    def to_representation(self, instance):
+        rows = getattr(self, '_rows', None)
+        if rows is None:
+            rows = self._rows = RowSerializer(self)
+        return rows.represent_instance(instance)
+
     def create(self, validated_data):
         categories = validated_data.pop('product_categories')
-        company = Company.objects.create(**validated_data)
-        for category in categories:
-            company.product_categories.add(category)
-        company.save()
+        with transaction.atomic():
+            company = Company.objects.create(**validated_data)
+            company.set_product_categories(categories, created=True)
         return company
+
+    def update(self, instance, validated_data):
+        categories = validated_data.pop('product_categories', None)
+        with transaction.atomic():
+            for attr, value in validated_data.items():
+                setattr(instance, attr, value)
+            instance.save()
+            if categories is not None:
+                instance.set_product_categories(categories)
+        return instance
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""Serializer fields."""
+
+from django.core.exceptions import ObjectDoesNotExist, ValidationError
+
+from rest_framework import serializers
+
+from api.cache import reference_cache
+
+
+class CachedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    Primary key related field that validates reference data against the
+    reference cache instead of querying the database.
+    """
+
+    def to_internal_value(self, data):
+        model = self.get_queryset().model
+        if not reference_cache.is_cached(model):
+            return super(CachedPrimaryKeyRelatedField,
+                         self).to_internal_value(data)
+        if self.pk_field is not None:
+            data = self.pk_field.to_internal_value(data)
+        try:
+            return reference_cache.get(model, data)
+        except ObjectDoesNotExist:
+            self.fail('does_not_exist', pk_value=data)
+        except (TypeError, ValueError, ValidationError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+
+class ExpandedReferenceField(serializers.Field):
+    """
+    Read only field rendering the reference data object a foreign key points
+    to with ``serializer_class``. The object comes from the reference cache,
+    so the related row needs no join nor query.
+    """
+
+    def __init__(self, serializer_class, **kwargs):
+        kwargs['read_only'] = True
+        super(ExpandedReferenceField, self).__init__(**kwargs)
+        self.serializer_class = serializer_class
+
+    def get_attribute(self, instance):
+        field = instance._meta.get_field(self.source)
+        pk = getattr(instance, field.attname)
+        if pk is None:
+            return None
+        return reference_cache.get(field.related_model, pk)
+
+    def to_representation(self, value):
+        return self.serializer_class(context=self.context).to_representation(
+            value)
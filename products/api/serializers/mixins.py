@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""Serializer mixins."""
+
+from rest_framework import serializers
+
+from api.serializers.fields import ExpandedReferenceField
+
+
+class SparseFieldsMixin(object):
+    """
+    Render only the fields listed in the ``fields`` context entry, all of
+    them when it is missing, and the references listed in ``expand`` as
+    objects instead of primary keys. The other fields, nested serializers
+    included, are not even built.
+
+    ``extra_fields`` are the names ``to_representation`` renders besides
+    the serializer fields, check them with ``is_requested``.
+    ``expandable`` maps the expandable fields to the serializer of the
+    reference objects.
+    """
+    extra_fields = ()
+    expandable = {}
+
+    def is_requested(self, name):
+        requested = self.context.get('fields')
+        return requested is None or name in requested
+
+    def get_fields(self):
+        fields = super(SparseFieldsMixin, self).get_fields()
+        requested = self.context.get('fields')
+        expand = self.context.get('expand', ())
+        if requested is not None:
+            self.check_names('fields', requested,
+                             set(fields).union(self.extra_fields))
+            for name in list(fields):
+                if name not in requested:
+                    del fields[name]
+        self.check_names('expand', expand, self.expandable)
+        for name in expand:
+            if name in fields:
+                fields[name] = self.expand_field(
+                    fields[name], self.expandable[name])
+        return fields
+
+    def check_requested_fields(self):
+        """
+        Raise the validation error of unknown ``fields`` or ``expand``
+        names now rather than when the first instance is rendered.
+        """
+        self.get_fields()
+
+    def check_names(self, param, names, allowed):
+        unknown = set(names).difference(allowed)
+        if unknown:
+            raise serializers.ValidationError({param: 'Unknown fields: %s.' % (
+                ', '.join(sorted(unknown)))})
+
+    def expand_field(self, field, serializer_class):
+        if isinstance(field, serializers.ManyRelatedField):
+            return serializer_class(many=True, read_only=True)
+        return ExpandedReferenceField(serializer_class)
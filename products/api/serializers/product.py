@@ -5,6 +5,10 @@ from rest_framework import serializers
 
 from api.models import (ProductAttribute, Attribute, ProductExtraInfo,
                         Keyword, Product, ProductLogistic)
+from api.models.product import VocabularyCache
+from api.serializers.fields import CachedPrimaryKeyRelatedField
+from api.serializers.mixins import SparseFieldsMixin
+from api.serializers.static import CategorySerializer, CountrySerializer
 
 
 class KeywordSerializer(serializers.ModelSerializer):
@@ -12,22 +16,32 @@ class KeywordSerializer(serializers.ModelSerializer):
     class Meta:
         model = Keyword
         fields = ('name',)
+        # Existing keywords are reused, not rejected.
+        extra_kwargs = {'name': {'validators': []}}
+
+    row_fields = ('name',)
 
     def create(self, validated_data):
-        return Keyword.objects.get_or_create(name=validated_data['name'])[0]
+        name = validated_data['name']
+        return VocabularyCache().resolve_keywords([name])[name]
 
     def to_representation(self, instance):
         return instance.name
 
+    def represent_row(self, name):
+        return name
+
 
 class AttributeSerializer(serializers.ModelSerializer):
     """Attribute serializer."""
     class Meta:
         model = Attribute
         fields = ('name',)
+        extra_kwargs = {'name': {'validators': []}}
 
     def create(self, validated_data):
-        return Attribute.objects.get_or_create(name=validated_data['name'])[0]
+        name = validated_data['name']
+        return Attribute.objects.resolve([name])[name]
 
 
 class ProductAttributeSerializer(serializers.ModelSerializer):
@@ -41,15 +55,18 @@ class ProductAttributeSerializer(serializers.ModelSerializer):
         fields = ('name', 'value',)
 
     def create(self, validated_data):
-        value = validated_data.pop('value').lower()
-        attribute = AttributeSerializer().create(validated_data)
-        return ProductAttribute.objects.get_or_create(
-            attribute=attribute, value=value)[0]
+        pair = (validated_data['name'], validated_data['value'].lower())
+        return ProductAttribute.objects.resolve([pair])[pair]
+
+    row_fields = ('attribute__name', 'value')
 
     def to_representation(self, instance):
+        return self.represent_row(instance.attribute.name, instance.value)
+
+    def represent_row(self, name, value):
         return {
-            'name': instance.attribute.name,
-            'value': instance.value
+            'name': name,
+            'value': value
         }
 
 
@@ -62,6 +79,8 @@ class ProductExtraInfoSerializer(serializers.ModelSerializer):
 
 class ProductLogisticSerializer(serializers.ModelSerializer):
     """Product logistic serializer."""
+    serializer_related_field = CachedPrimaryKeyRelatedField
+
     class Meta:
         model = ProductLogistic
         fields = ('origin', 'quantity', 'period',)
@@ -70,48 +89,93 @@ class ProductLogisticSerializer(serializers.ModelSerializer):
         }
 
 
-class ProductSerializer(serializers.ModelSerializer):
+def to_ingest_item(validated_data):
+    """Convert validated product data to a ``Product.bulk_ingest`` item."""
+    item = dict(validated_data)
+    item['keywords'] = [keyword['name']
+                        for keyword in item.get('keywords', ())]
+    item['attributes'] = [(attribute['name'], attribute['value'].lower())
+                          for attribute in item.get('attributes', ())]
+    return item
+
+
+class ProductListSerializer(serializers.ListSerializer):
+    """Product list serializer, creates all the products in bulk."""
+
+    def create(self, validated_data):
+        return Product.objects.bulk_ingest(
+            to_ingest_item(item) for item in validated_data)
+
+
+class ProductSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Product serializer."""
     keywords = KeywordSerializer(many=True)
     attributes = ProductAttributeSerializer(many=True)
     extras = ProductExtraInfoSerializer(many=True, required=False)
     logistics = ProductLogisticSerializer(many=True, required=False)
+    serializer_related_field = CachedPrimaryKeyRelatedField
+    extra_fields = ('flags',)
+    expandable = {'made_in': CountrySerializer, 'category': CategorySerializer}
 
     class Meta:
         model = Product
         fields = ('id', 'name', 'model', 'brand', 'price', 'made_in',
                   'category', 'keywords', 'attributes', 'extras', 'logistics')
+        list_serializer_class = ProductListSerializer
 
     def create(self, validated_data):
-        keywords = validated_data.pop('keywords')
-        attributes = validated_data.pop('attributes')
-        product = Product.objects.create(**validated_data)
-        for keyword in keywords:
-            keyword = KeywordSerializer().create(keyword)
-            product.keywords.add(keyword)
-        for attribute in attributes:
-            attribute = ProductAttributeSerializer().create(attribute)
-            product.attributes.add(attribute)
-        return product
+        return Product.objects.bulk_ingest(
+            [to_ingest_item(validated_data)])[0]
 
     def update(self, instance, validated_data):
-        if validated_data.get('extras'):
-            extras = validated_data.pop('extras')
-            for extra in extras:
-                ProductExtraInfo.objects.create(product=instance, **extra)
-        if validated_data.get('logistics'):
-            logistics = validated_data.pop('logistics')
-            for logistic in logistics:
-                ProductLogistic.objects.create(product=instance, **logistic)
+        """
+        Save the product and its relations in one transaction. Keywords and
+        attributes are replaced, extras and logistics are appended on a
+        partial update and replaced otherwise.
+        """
+        relations = {}
+        if 'keywords' in validated_data:
+            relations['keywords'] = [
+                keyword['name'] for keyword in validated_data.pop('keywords')]
+        if 'attributes' in validated_data:
+            relations['attributes'] = [
+                (attribute['name'], attribute['value'].lower())
+                for attribute in validated_data.pop('attributes')]
+        for relation in ('extras', 'logistics'):
+            if relation in validated_data:
+                relations[relation] = validated_data.pop(relation)
+        instance.apply_update(validated_data, merge=self.partial,
+                              **relations)
         return instance
 
     def to_representation(self, instance):
         data = super(ProductSerializer, self).to_representation(instance)
-        extras = instance.extras.count() != 0
-        logistics = instance.logistics.count() != 0
+        if self.is_requested('flags'):
+            self.annotate_row(data, self._get_flag(instance, 'extras'),
+                              self._get_flag(instance, 'logistics'))
+        return data
+
+    @property
+    def row_annotations(self):
+        if self.is_requested('flags'):
+            return ('has_extras', 'has_logistics')
+        return ()
+
+    def annotate_row(self, data, extras, logistics):
+        """Add the completeness flags to the representation ``data``."""
+        extras, logistics = bool(extras), bool(logistics)
         data.update({'flags': {
             'complete': extras and logistics,
             'extras': extras,
             'logistics': logistics
         }})
-        return data
+
+    def _get_flag(self, instance, relation):
+        """
+        Read a completeness flag from the ``with_flags`` annotation, falling
+        back to a query for instances that were not annotated.
+        """
+        flag = getattr(instance, 'has_%s' % relation, None)
+        if flag is None:
+            return getattr(instance, relation).exists()
+        return bool(flag)
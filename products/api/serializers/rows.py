@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+"""Read only rendering compiled from the serializer fields."""
+
+from collections import OrderedDict
+
+from django.db import router
+
+from rest_framework import serializers
+
+from api.cache import reference_cache
+from api.models.product import batches
+from api.serializers.fields import ExpandedReferenceField
+
+
+class RowSerializer(object):
+    """
+    Read only rendering of a queryset from ``values()`` rows, compiled from
+    the fields of ``serializer``, sparse fields included, with the same
+    output but without model instances nor per field dispatch. Single
+    instances are rendered with the same compiled fields by
+    ``represent_instance``.
+
+    Serializers fine tune the compilation with:
+
+    - ``row_fields`` and ``represent_row(*values)``, for nested list
+      serializers with their own ``to_representation``: the values read
+      for each related row and how they are rendered.
+    - ``row_annotations`` and ``annotate_row(data, *values)``, for the top
+      level serializer: the values ``to_representation`` adds besides the
+      fields, such as ``with_flags`` annotations, and how they are added.
+
+    Each many relation costs one query per page of rows.
+    """
+
+    def __init__(self, serializer):
+        self.serializer = serializer
+        self.model = serializer.Meta.model
+        self.columns = ['pk']
+        self.relations = []
+        self.related_fields = []
+        self.getters = self.compile(serializer)
+        self.annotations = tuple(getattr(serializer, 'row_annotations', ()))
+        self.columns.extend(self.annotations)
+
+    def compile(self, serializer):
+        getters = []
+        for field in serializer._readable_fields:
+            name = field.field_name
+            if field.source == '*' and isinstance(field,
+                                                  serializers.Serializer):
+                getters.append((name, self.compile_nested(field)))
+            elif isinstance(field, (serializers.ListSerializer,
+                                    serializers.ManyRelatedField)):
+                self.relations.append(self.compile_relation(field))
+                self.related_fields.append(field)
+                getters.append((name, self.related_getter(field.field_name)))
+            elif isinstance(field, ExpandedReferenceField):
+                getters.append((name, self.reference_getter(field)))
+            elif isinstance(field, serializers.PrimaryKeyRelatedField):
+                getters.append((name, self.pk_getter(field)))
+            else:
+                getters.append((name, self.column_getter(field)))
+        return getters
+
+    def add_column(self, source):
+        model_field = self.model._meta.get_field(source)
+        if not model_field.concrete or model_field.many_to_many:
+            raise TypeError('%s can not be read from rows.' % source)
+        column = model_field.attname
+        if column not in self.columns:
+            self.columns.append(column)
+        return column, model_field
+
+    def compile_nested(self, serializer):
+        getters = self.compile(serializer)
+
+        def nested(row, related):
+            return OrderedDict((name, getter(row, related))
+                               for name, getter in getters)
+        return nested
+
+    def column_getter(self, field):
+        column = self.add_column(field.source)[0]
+        to_representation = field.to_representation
+
+        def value(row, related):
+            value = row[column]
+            return None if value is None else to_representation(value)
+        return value
+
+    def pk_getter(self, field):
+        column = self.add_column(field.source)[0]
+        pk_field = field.pk_field
+
+        def value(row, related):
+            value = row[column]
+            if value is None or pk_field is None:
+                return value
+            return pk_field.to_representation(value)
+        return value
+
+    def reference_getter(self, field):
+        column, model_field = self.add_column(field.source)
+        model = model_field.related_model
+
+        def value(row, related):
+            pk = row[column]
+            if pk is None:
+                return None
+            return field.to_representation(reference_cache.get(model, pk))
+        return value
+
+    def related_getter(self, name):
+        def value(row, related):
+            return related[name].get(row['pk'], [])
+        return value
+
+    def compile_relation(self, field):
+        """
+        Return a ``(name, load)`` pair, ``load`` reading the related rows of
+        a list of primary keys and returning their representations by key.
+        """
+        model_field = self.model._meta.get_field(field.source)
+        related_model = model_field.related_model
+        if model_field.auto_created:
+            lookup = model_field.field.name
+        else:
+            lookup = model_field.related_query_name()
+        if isinstance(field, serializers.ManyRelatedField):
+            paths, represent = ('pk',), self.represent_pk(field)
+        else:
+            paths, represent = self.compile_child(field.child, related_model)
+
+        def load(pks):
+            queryset = related_model._default_manager.using(
+                router.db_for_read(related_model))
+            loaded = {}
+            for batch in batches(pks):
+                for row in queryset.filter(**{
+                        '%s__in' % lookup: batch}).values_list(lookup, *paths):
+                    loaded.setdefault(row[0], []).append(represent(*row[1:]))
+            return loaded
+        return field.field_name, load
+
+    def represent_pk(self, field):
+        pk_field = field.child_relation.pk_field
+        if pk_field is None:
+            return lambda pk: pk
+        return pk_field.to_representation
+
+    def compile_child(self, child, model):
+        if hasattr(child, 'represent_row'):
+            return tuple(child.row_fields), child.represent_row
+        paths, getters = [], []
+        for field in child._readable_fields:
+            if isinstance(field, serializers.PrimaryKeyRelatedField):
+                paths.append(model._meta.get_field(field.source).attname)
+                getters.append((field.field_name, None))
+            else:
+                paths.append(field.source)
+                getters.append((field.field_name, field.to_representation))
+
+        def represent(*values):
+            return OrderedDict(
+                (name, value if value is None or to_representation is None
+                 else to_representation(value))
+                for (name, to_representation), value in zip(getters, values))
+        return tuple(paths), represent
+
+    def values(self, queryset, *fields):
+        """
+        Return ``queryset`` as ``values()`` rows of the compiled columns and
+        ``fields``, such as the ordering fields of the cursor pagination.
+        """
+        return queryset.prefetch_related(None).values(*self.columns + [
+            field for field in fields if field not in self.columns])
+
+    def represent_instance(self, instance):
+        """
+        Render a model ``instance`` from its attributes, many relations from
+        their prefetched rows when there are. ``row_annotations`` are left
+        to the serializer.
+        """
+        row = dict((column, getattr(instance, column))
+                   for column in self.columns
+                   if column not in self.annotations)
+        related = dict((field.field_name, {row['pk']: field.to_representation(
+            field.get_attribute(instance))}) for field in self.related_fields)
+        return OrderedDict((name, getter(row, related))
+                           for name, getter in self.getters)
+
+    def to_representation(self, rows):
+        rows = list(rows)
+        pks = [row['pk'] for row in rows]
+        related = dict((name, load(pks) if pks else {})
+                       for name, load in self.relations)
+        data = []
+        for row in rows:
+            item = OrderedDict((name, getter(row, related))
+                               for name, getter in self.getters)
+            if self.annotations:
+                self.serializer.annotate_row(
+                    item, *[row[name] for name in self.annotations])
+            data.append(item)
+        return data
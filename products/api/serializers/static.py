@@ -4,6 +4,7 @@
 from rest_framework import serializers
 
 from api.models import Country, Category, Industry, State
+from api.serializers.fields import CachedPrimaryKeyRelatedField
 
 
 class IndustrySerializer(serializers.ModelSerializer):
@@ -22,6 +23,8 @@ class CountrySerializer(serializers.ModelSerializer):
 
 class StateSerializer(serializers.ModelSerializer):
     """State serializer."""
+    serializer_related_field = CachedPrimaryKeyRelatedField
+
     class Meta:
         model = State
         fields = '__all__'
@@ -2,10 +2,11 @@
 """User serializers."""
 
 from django.contrib.auth.models import User
+from django.db import IntegrityError
 
 from rest_framework import serializers
 
-from api.models.user import UserProfile
+from api.models.user import UserProfile, get_username, register_user
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -23,8 +24,7 @@ class UserSerializer(serializers.ModelSerializer):
                   'password_confirmation',)
 
     def validate_email(self, attrs):
-        email = User.objects.filter(email=attrs)
-        if email:
+        if User.objects.filter(username=get_username(attrs)).exists():
             raise serializers.ValidationError('Email address already exists.')
         return attrs
 
@@ -36,13 +36,19 @@ class UserSerializer(serializers.ModelSerializer):
                 {'password': 'Password confirmation must match Password'})
         return attrs
 
-    def create(self, validated_data):
-        validated_data['username'] = validated_data['email']
+    def register(self, validated_data, profile=None):
         validated_data.pop('password_confirmation')
-        user = User.objects.create(**validated_data)
-        user.set_password(validated_data['password'])
-        user.save(update_fields=['password'])
-        return user
+        try:
+            return register_user(validated_data.pop('email'),
+                                 validated_data.pop('password'),
+                                 profile=profile, **validated_data)
+        except IntegrityError:
+            # The same email registered concurrently.
+            raise serializers.ValidationError(
+                {'email': ['Email address already exists.']})
+
+    def create(self, validated_data):
+        return self.register(validated_data)
 
 
 class UserProfileSerializer(UserSerializer):
@@ -59,14 +65,10 @@ class UserProfileSerializer(UserSerializer):
         fields = UserSerializer.Meta.fields + ('phone', 'role',)
 
     def create(self, validated_data):
-        profile_data = {}
-        profile_data['phone'] = validated_data.pop('phone')
-        profile_data['role'] = validated_data.pop('role')
-        user = super(UserProfileSerializer, self).create(validated_data)
-        user.profile.role = profile_data['role']
-        user.profile.phone = profile_data['phone']
-        user.profile.save(update_fields=['role', 'phone'])
-        return user.profile
+        profile = UserProfile(phone=validated_data.pop('phone'),
+                              role=validated_data.pop('role'))
+        self.register(validated_data, profile=profile)
+        return profile
 
     def to_representation(self, instance):
         return {
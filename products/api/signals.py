@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""API signals."""
+
+import threading
+from contextlib import contextmanager
+
+from django.dispatch import Signal
+
+# Sent with the primary keys of the products whose catalog data (the
+# product, its vocabulary, extras or logistics) changed. The products may
+# have been deleted in the meantime.
+products_changed = Signal(providing_args=['pks'])
+
+_batch = threading.local()
+
+
+def notify_products_changed(pks):
+    """
+    Send ``products_changed`` for ``pks``, or collect them when a
+    ``batch_product_changes`` block is running in this thread.
+    """
+    pks = set(pks)
+    if not pks:
+        return
+    pending = getattr(_batch, 'pks', None)
+    if pending is not None:
+        pending.update(pks)
+    else:
+        products_changed.send(sender=None, pks=pks)
+
+
+@contextmanager
+def batch_product_changes():
+    """
+    Collect the product changes notified inside the block and send them as
+    a single ``products_changed`` when it exits, so a bulk write updates
+    the derived data once instead of once per row.
+    """
+    if getattr(_batch, 'pks', None) is not None:
+        yield
+        return
+    _batch.pks = set()
+    try:
+        yield
+        pks = _batch.pks
+    finally:
+        _batch.pks = None
+    notify_products_changed(pks)
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""ASGI entry point tests."""
+
+import json
+import threading
+from unittest import skipIf
+
+from django.test import TransactionTestCase
+from django.urls import reverse
+from django.utils import six
+
+
+@skipIf(six.PY2, 'The ASGI entry point requires Python 3.')
+class TestASGI(TransactionTestCase):
+    """ASGI entry point tests, run by the asgi tox environment."""
+    fixtures = ['category']
+
+    def setUp(self):
+        import asyncio
+        from products.asgi import application
+
+        self.application = application
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+
+    # Plain functions returning resolved futures, this module is still
+    # imported by the Python 2 test runs.
+    def done(self, result=None):
+        future = self.loop.create_future()
+        future.set_result(result)
+        return future
+
+    def serve(self):
+        """
+        Start the application like a server, with the lifespan startup
+        event, and return a function sending the shutdown one.
+        """
+        import asyncio
+
+        events, sent = asyncio.Queue(loop=self.loop), []
+        started = self.loop.create_future()
+
+        def send(message):
+            sent.append(message['type'])
+            if message['type'] == 'lifespan.startup.complete':
+                started.set_result(None)
+            return self.done()
+
+        lifespan = self.loop.create_task(self.application(
+            {'type': 'lifespan'}, events.get, send))
+        events.put_nowait({'type': 'lifespan.startup'})
+        self.loop.run_until_complete(started)
+
+        def shutdown():
+            events.put_nowait({'type': 'lifespan.shutdown'})
+            self.loop.run_until_complete(lifespan)
+            return sent
+        return shutdown
+
+    def request(self, path):
+        messages = []
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'},
+            'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+            'path': path, 'raw_path': path.encode(), 'query_string': b'',
+            'root_path': '', 'headers': [(b'host', b'testserver')],
+            'client': ('127.0.0.1', 50000), 'server': ('testserver', 80),
+        }
+
+        def receive():
+            return self.done({'type': 'http.request', 'body': b'',
+                              'more_body': False})
+
+        def send(message):
+            messages.append(message)
+            return self.done()
+
+        self.loop.run_until_complete(self.application(scope, receive, send))
+        body = b''.join(message.get('body', b'') for message in messages
+                        if message['type'] == 'http.response.body')
+        return messages[0]['status'], body
+
+    def test_request(self):
+        """
+        Ensure the ASGI application serves the API on the thread pool it
+        installs at startup.
+        """
+        shutdown = self.serve()
+        thread = self.loop.run_until_complete(self.loop.run_in_executor(
+            None, lambda: threading.current_thread().name))
+        self.assertTrue(thread.startswith('asgi'))
+        status, body = self.request(reverse('api:category-list'))
+        self.assertEqual(status, 200)
+        self.assertEqual(len(json.loads(body.decode())), 5)
+        self.assertEqual(shutdown(), ['lifespan.startup.complete',
+                                      'lifespan.shutdown.complete'])
+        self.assertIsNone(self.application.executor)
+
+    def test_request_without_startup(self):
+        """Ensure requests are refused until the thread pool is installed."""
+        with self.assertRaises(RuntimeError):
+            self.request(reverse('api:category-list'))
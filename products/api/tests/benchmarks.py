@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+"""Benchmark command tests."""
+
+from django.core.management import CommandError, call_command
+from django.test import LiveServerTestCase
+from django.urls import reverse
+from django.utils.six import StringIO
+
+from rest_framework.test import APITestCase
+
+
+class TestHTTPBenchmark(LiveServerTestCase):
+    """HTTP benchmark tests, against a live server."""
+    fixtures = ['category']
+
+    def test_bench_http_command(self):
+        """Ensure the HTTP benchmark reports throughput per URL."""
+        url = self.live_server_url + reverse('api:category-list')
+        out = StringIO()
+        call_command('bench_http', url, concurrency=2, requests=4,
+                     warmup=1, stdout=out)
+        self.assertIn(url, out.getvalue())
+        self.assertIn('requests/s', out.getvalue())
+        self.assertIn('0 errors', out.getvalue())
+
+    def test_bench_http_comparison(self):
+        """Ensure the HTTP benchmark compares two servers per path."""
+        path = reverse('api:category-list')
+        out = StringIO()
+        call_command('bench_http', path, wsgi=self.live_server_url,
+                     asgi=self.live_server_url + '/', concurrency=2,
+                     requests=4, warmup=1, stdout=out)
+        self.assertEqual(out.getvalue().count(path), 2)
+        self.assertIn('asgi/wsgi', out.getvalue())
+        with self.assertRaises(CommandError):
+            call_command('bench_http', path, wsgi=self.live_server_url,
+                         stdout=out)
+
+
+class TestLookupBenchmark(APITestCase):
+    """Lookup benchmark tests."""
+    fixtures = ['category', 'country', 'industry', 'state']
+
+    def test_bench_lookups_command(self):
+        """Ensure the lookup benchmark seeds a catalog and times lookups."""
+        out = StringIO()
+        call_command('bench_lookups', seed=20, repeat=2, stdout=out)
+        for name in ('keyword-name', 'attribute-value', 'product-page',
+                     'product-brand', 'company-industry'):
+            self.assertIn(name, out.getvalue())
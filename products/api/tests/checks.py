@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+"""System check tests."""
+
+from django.test import SimpleTestCase, override_settings
+
+from api.checks import check_response_cache, check_shared_cache
+
+
+class TestChecks(SimpleTestCase):
+    """API system check tests."""
+
+    @override_settings(DEBUG=False, API_SHARED_CACHE=None)
+    def test_shared_cache_required(self):
+        """Ensure serving without a shared cache is reported."""
+        self.assertEqual([error.id for error in check_shared_cache(None)],
+                         ['api.E001'])
+
+    @override_settings(DEBUG=False, API_SHARED_CACHE='default')
+    def test_shared_cache_set(self):
+        """Ensure a shared cache passes the checks."""
+        self.assertEqual(check_shared_cache(None), [])
+
+    @override_settings(DEBUG=True, API_SHARED_CACHE=None)
+    def test_shared_cache_debug(self):
+        """Ensure the single development process needs no shared cache."""
+        self.assertEqual(check_shared_cache(None), [])
+
+    @override_settings(API_RESPONSE_CACHE=True, API_SHARED_CACHE=None)
+    def test_response_cache_requires_shared_cache(self):
+        """Ensure the response cache without a shared cache is reported."""
+        self.assertEqual([error.id for error in check_response_cache(None)],
+                         ['api.E002'])
+
+    @override_settings(API_RESPONSE_CACHE=True, API_SHARED_CACHE='default')
+    def test_response_cache_shared(self):
+        """Ensure the response cache with a shared cache passes the checks."""
+        self.assertEqual(check_response_cache(None), [])
@@ -1,11 +1,18 @@
 # -*- coding: utf-8 -*-
 """Company tests."""
 
+from django.core import checks
+from django.core.cache import cache
+from django.test import override_settings
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
 
+from api.cache import reference_cache, response_cache
+from api.models import Industry
 from api.models.company import Company
+from api.serializers.company import CompanySerializer
+from api.tests.mixins import QueryBudgetMixin
 
 website = 'https://github.com/lnphi'
 state = 1
@@ -14,10 +21,26 @@ industry = 1
 categories = [1, 2, 4]
 
 
-class TestCompany(APITestCase):
+@override_settings(API_METRICS=True)
+class TestCompany(QueryBudgetMixin, APITestCase):
     """Company tests."""
     fixtures = ['category', 'country', 'industry', 'state',
                 'api/tests/fixtures/company']
+    query_budgets = {
+        'GET api:company-list': 2,
+        'GET api:company-detail': 2,
+        'POST api:company-list': 6,
+        'PATCH api:company-detail': 8,
+    }
+
+    def get_company_data(self, business_name, categories):
+        return {'business_name': business_name, 'website': website,
+                'address': {'street': 'Chihuahua', 'num_ext': '1',
+                            'zip_code': '1', 'state': state,
+                            'country': country},
+                'main_phone': {'number': '55010203', 'name': 'Main',
+                               'extension': '01', 'country': country},
+                'industry': industry, 'product_categories': categories}
 
     def test_get_companies(self):
         """Ensure we can retrieve all company objects."""
@@ -25,6 +48,114 @@ class TestCompany(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(Company.objects.count(), 3)
 
+    def test_company_endpoints_within_query_budgets(self):
+        """Ensure the company reads stay within their query budgets."""
+        self.assertQueryBudget(self.client.get(reverse('api:company-list')))
+        self.assertQueryBudget(self.client.get(
+            reverse('api:company-detail', kwargs={'pk': 1})))
+
+    def test_create_company_within_query_budget(self):
+        """Ensure creating a company costs the same for any categories."""
+        url = reverse('api:company-list')
+        counts = []
+        for name, pks in (('One', [1]), ('Five', [1, 2, 3, 4, 5])):
+            response = self.client.post(
+                url, self.get_company_data(name, pks), format='json')
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            self.assertQueryBudget(response)
+            self.assertEqual(response.data['product_categories'], pks)
+            counts.append(len(response.metrics.queries))
+        self.assertEqual(counts[0], counts[1])
+        self.assertEqual(sorted(Company.objects.get(
+            business_name='Five').product_categories.values_list(
+                'pk', flat=True)), [1, 2, 3, 4, 5])
+
+    def test_update_company_categories(self):
+        """Ensure the categories are replaced on update."""
+        Company.objects.get(pk=1).product_categories.set([1, 2])
+        url = reverse('api:company-detail', kwargs={'pk': 1})
+        response = self.client.patch(
+            url, {'product_categories': [2, 5]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertQueryBudget(response)
+        self.assertEqual(sorted(response.data['product_categories']), [2, 5])
+        self.assertEqual(sorted(Company.objects.get(
+            pk=1).product_categories.values_list('pk', flat=True)), [2, 5])
+
+    def test_company_representation(self):
+        """Ensure the compiled representation matches the fields."""
+        company = Company.objects.get(pk=1)
+        company.product_categories.set([1, 4])
+        serializer = CompanySerializer(company)
+        self.assertEqual(serializer.data, super(
+            CompanySerializer, serializer).to_representation(company))
+
+    def test_get_companies_with_sparse_fields(self):
+        """Ensure only the requested company fields are rendered."""
+        Company.objects.get(pk=1).product_categories.set([1, 4])
+        # Expanded references come from the warm reference cache.
+        reference_cache.all(Industry)
+        url = reverse('api:company-list')
+        response = self.client.get(url, {'fields': 'id,business_name'})
+        self.assertEqual(sorted(response.data['results'][0]),
+                         ['business_name', 'id'])
+        self.assertQueryBudget(response, 1)
+        response = self.client.get(
+            reverse('api:company-detail', kwargs={'pk': 1}),
+            {'fields': 'address', 'expand': 'industry,product_categories'})
+        self.assertEqual(sorted(response.data), [
+            'address', 'industry', 'product_categories'])
+        self.assertEqual(response.data['industry']['id'], 2)
+        self.assertEqual([category['id'] for category in
+                          response.data['product_categories']], [1, 4])
+        self.assertQueryBudget(response)
+
+    def test_render_companies_from_rows(self):
+        """
+        Ensure the company list renders the same bytes from values() rows
+        as from the serializer.
+        """
+        Company.objects.get(pk=1).product_categories.set([1, 4])
+        Company.objects.get(pk=3).product_categories.set([2])
+        url = reverse('api:company-list')
+        for params in ({}, {'page_size': 2}, {'fields': 'id,address'},
+                       {'expand': 'industry,product_categories'}):
+            with self.settings(API_ROW_RENDERING=False):
+                expected = self.client.get(url, params)
+            with self.settings(API_ROW_RENDERING=True):
+                response = self.client.get(url, params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.content, expected.content)
+            self.assertQueryBudget(response)
+
+    @override_settings(API_RESPONSE_CACHE=True, API_SHARED_CACHE='default')
+    def test_cache_company_responses(self):
+        """
+        Ensure company responses are served from the response cache until a
+        company changes.
+        """
+        cache.clear()
+        response_cache.clear()
+        url = reverse('api:company-detail', kwargs={'pk': 1})
+        response = self.client.get(url)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url).content, response.content)
+        self.client.patch(url, {'business_name': 'Ln(phi)'}, format='json')
+        response = self.client.get(url)
+        self.assertEqual(response.data['business_name'], 'Ln(phi)')
+
+    def test_get_companies_paginated(self):
+        """Ensure the companies are paginated with a cursor ordered by id."""
+        url = reverse('api:company-list')
+        response = self.client.get(url, {'page_size': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([company['id'] for company in
+                          response.data['results']], [1, 2])
+        response = self.client.get(response.data['next'])
+        self.assertEqual([company['id'] for company in
+                          response.data['results']], [3])
+        self.assertIsNone(response.data['next'])
+
     def test_create_company(self):
         """Ensure we can create a new company object."""
         url = reverse('api:company-list')
@@ -176,6 +307,11 @@ class TestCompany(APITestCase):
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
 
+    def test_company_model_checks(self):
+        """Ensure the company country relations have distinct accessors."""
+        self.assertEqual(Company.check(), [])
+        self.assertEqual(checks.run_checks(tags=[checks.Tags.models]), [])
+
     def test_update_company(self):
         """Ensure we can update a company object."""
         business_name = 'Ln(phi)'
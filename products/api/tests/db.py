@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""Database setup and routing tests."""
+
+from django.db import connection, router
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api import db
+from api.db import apply_sqlite_pragmas
+from api.middleware import ReplicaPinningMiddleware
+from api.models import Product
+
+
+class TestSQLite(APITestCase):
+    """SQLite connection setup tests."""
+
+    @override_settings(API_SQLITE_PRAGMAS=[('cache_size', -1234)])
+    def test_sqlite_pragmas(self):
+        """Ensure the configured pragmas are set on new connections."""
+        apply_sqlite_pragmas(None, connection)
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA cache_size')
+            self.assertEqual(cursor.fetchone()[0], -1234)
+
+
+@override_settings(API_DATABASE_REPLICAS=['replica'])
+class TestRouting(APITestCase):
+    """Database setup and routing tests."""
+    fixtures = ['category', 'country', 'industry', 'state',
+                'api/tests/fixtures/company']
+
+    def setUp(self):
+        self.addCleanup(db.reset_routing)
+        db.reset_routing()
+
+    def test_replica_routing(self):
+        """Ensure reads go to the replicas until the thread is pinned."""
+        self.assertEqual(router.db_for_read(Product), 'replica')
+        self.assertEqual(router.db_for_write(Product), 'default')
+        self.assertEqual(router.db_for_read(Product), 'replica')
+        db.pin_primary()
+        self.assertEqual(router.db_for_read(Product), 'default')
+        self.assertTrue(db.has_written())
+
+    @override_settings(API_DATABASE_REPLICAS=['replica', 'replica2',
+                                              'replica3'])
+    def test_replica_chosen_once(self):
+        """Ensure the reads of a request all go to the same replica."""
+        replica = router.db_for_read(Product)
+        self.assertEqual(set(router.db_for_read(Product) for _ in range(20)),
+                         {replica})
+
+    def test_replica_pinning_middleware(self):
+        """Ensure a client reads from the primary after it wrote."""
+        databases = []
+
+        def view(request):
+            databases.append(router.db_for_read(Product))
+            if request.method == 'POST':
+                db.pin_primary()
+            return HttpResponse()
+
+        middleware = ReplicaPinningMiddleware(view)
+        factory = RequestFactory()
+        response = middleware(factory.get('/'))
+        self.assertNotIn(middleware.cookie_name, response.cookies)
+        response = middleware(factory.post('/'))
+        self.assertIn(middleware.cookie_name, response.cookies)
+        request = factory.get('/')
+        request.COOKIES[middleware.cookie_name] = '1'
+        middleware(request)
+        self.assertEqual(databases, ['replica', 'default', 'default'])
+        self.assertEqual(router.db_for_read(Product), 'replica')
+
+    def test_write_views_pin(self):
+        """Ensure the views pin the client to the primary when they write."""
+        url = reverse('api:company-detail', kwargs={'pk': 1})
+        response = self.client.patch(url, {'business_name': 'Pinned'},
+                                     format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn(ReplicaPinningMiddleware.cookie_name, response.cookies)
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""Migration tests."""
+
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TransactionTestCase
+
+
+class TestMigrations(TransactionTestCase):
+    """Data migration tests."""
+
+    def migrate(self, target):
+        """Migrate the api app to ``target`` and return its models."""
+        executor = MigrationExecutor(connection)
+        executor.migrate([('api', target)])
+        return executor.loader.project_state(('api', target)).apps
+
+    def test_merge_duplicate_vocabulary(self):
+        """
+        Ensure the duplicated keywords, attributes and attribute values are
+        merged into their first row before they are made unique.
+        """
+        self.addCleanup(lambda: MigrationExecutor(connection).migrate(
+            MigrationExecutor(connection).loader.graph.leaf_nodes()))
+        apps = self.migrate('0001_initial')
+        Keyword = apps.get_model('api', 'Keyword')
+        Attribute = apps.get_model('api', 'Attribute')
+        ProductAttribute = apps.get_model('api', 'ProductAttribute')
+        Product = apps.get_model('api', 'Product')
+        country = apps.get_model('api', 'Country').objects.create(
+            name='Mexico', code='MX')
+        category = apps.get_model('api', 'Category').objects.create(
+            name='Juegos')
+        keywords = [Keyword.objects.create(name=name)
+                    for name in ('aventura', 'aventura', 'accion')]
+        attributes = [Attribute.objects.create(name='color')
+                      for _ in range(2)]
+        values = [ProductAttribute.objects.create(attribute=attribute,
+                                                  value='rojo')
+                  for attribute in attributes]
+        product = Product.objects.create(
+            name='Sportflix', brand='Ln(Phi)', price=100, made_in=country,
+            category=category)
+        product.keywords.set(keywords)
+        product.attributes.set(values)
+        other = Product.objects.create(
+            name='Onic', brand='Ln(Phi)', price=100, made_in=country,
+            category=category)
+        other.keywords.set(keywords[1:2])
+        other.attributes.set(values[1:])
+
+        apps = self.migrate('0002_merge_duplicate_vocabulary')
+        Product = apps.get_model('api', 'Product')
+        self.assertEqual(
+            sorted(apps.get_model('api', 'Keyword').objects.values_list(
+                'pk', 'name')),
+            [(keywords[0].pk, 'aventura'), (keywords[2].pk, 'accion')])
+        self.assertEqual(list(apps.get_model(
+            'api', 'Attribute').objects.values_list('pk', flat=True)),
+            [attributes[0].pk])
+        self.assertEqual(list(apps.get_model(
+            'api', 'ProductAttribute').objects.values_list(
+                'pk', 'attribute', 'value')),
+            [(values[0].pk, attributes[0].pk, 'rojo')])
+        product = Product.objects.get(pk=product.pk)
+        self.assertEqual(sorted(product.keywords.values_list('pk', flat=True)),
+                         sorted([keywords[0].pk, keywords[2].pk]))
+        self.assertEqual(list(product.attributes.values_list('pk', flat=True)),
+                         [values[0].pk])
+        other = Product.objects.get(pk=other.pk)
+        self.assertEqual(list(other.keywords.values_list('pk', flat=True)),
+                         [keywords[0].pk])
+        self.assertEqual(list(other.attributes.values_list('pk', flat=True)),
+                         [values[0].pk])
+
+    def test_lowercase_usernames(self):
+        """
+        Ensure the usernames of the users registered with their email as
+        typed are lowercased, unless the lowercase form is taken.
+        """
+        self.addCleanup(lambda: MigrationExecutor(connection).migrate(
+            MigrationExecutor(connection).loader.graph.leaf_nodes()))
+        apps = self.migrate('0004_import_checkpoint')
+        User = apps.get_model('auth', 'User')
+        for username, email in (('Ada@Example.com', 'Ada@Example.com'),
+                                ('Bob@Example.com', 'Bob@Example.com'),
+                                ('bob@example.com', 'bob@example.com'),
+                                ('Cy@Example.com', 'Cy@Example.com'),
+                                ('CY@example.com', 'CY@example.com'),
+                                ('Admin', 'admin@example.com')):
+            User.objects.create(username=username, email=email)
+
+        apps = self.migrate('0005_lowercase_usernames')
+        self.assertEqual(
+            list(apps.get_model('auth', 'User').objects.order_by(
+                'pk').values_list('username', flat=True)),
+            ['ada@example.com', 'Bob@Example.com', 'bob@example.com',
+             'cy@example.com', 'CY@example.com', 'Admin'])
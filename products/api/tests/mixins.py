@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+"""Test case mixins."""
+
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+def run_commit_hooks(using=DEFAULT_DB_ALIAS):
+    """
+    Run the ``transaction.on_commit`` callbacks pending on ``using``, which
+    a ``TestCase`` never commits. They stay pending, the ones of the class
+    fixtures run again in every test.
+    """
+    for sids, func in list(connections[using].run_on_commit):
+        func()
+
+
+class QueryBudgetMixin(object):
+    """
+    Check the number of queries of API responses against per endpoint
+    budgets, so a change adding queries per row fails the tests.
+
+    ``query_budgets`` maps ``'<method> <view name>'``, for instance
+    ``'GET api:product-list'``, to the most queries the endpoint may run.
+    The counts come from ``api.middleware.MetricsMiddleware``, decorate the
+    test case with ``override_settings(API_METRICS=True)``.
+    """
+    query_budgets = {}
+
+    def assertQueryBudget(self, response, budget=None):
+        metrics = getattr(response, 'metrics', None)
+        if metrics is None:
+            self.fail('The response has no metrics, enable API_METRICS.')
+        endpoint = '%s %s' % (response.request['REQUEST_METHOD'],
+                              response.resolver_match.view_name)
+        if budget is None:
+            if endpoint not in self.query_budgets:
+                self.fail('No query budget for %s.' % endpoint)
+            budget = self.query_budgets[endpoint]
+        queries = metrics.queries
+        self.assertLessEqual(
+            len(queries), budget,
+            '%s ran %d queries, its budget is %d:\n%s' % (
+                endpoint, len(queries), budget,
+                '\n'.join(query['sql'] for query in queries)))
@@ -1,20 +1,52 @@
 # -*- encoding: utf-8 -*-
 """Product tests."""
 
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, transaction
+from django.test import override_settings
 from django.urls import reverse
+from django.utils import six
+from django.utils.six import StringIO
 
 from rest_framework import status
 from rest_framework.test import APITestCase
 
-from api.models import Product
+from api.cache import reference_cache, response_cache, versions
+from api.metrics import registry
+from api.models import (Attribute, Category, Country, ImportCheckpoint,
+                        Keyword, Product, ProductAttribute, ProductDocument,
+                        ProductExtraInfo)
+from api.models.product import (VocabularyCache, chunked, insert_ignoring,
+                                interned_keywords)
+from api.search import (DatabaseSearchBackend, SearchResults,
+                        SQLiteFTS5Backend, get_backend)
+from api.serializers.product import ProductSerializer
+from api.tests.mixins import QueryBudgetMixin, run_commit_hooks
 
 
-class TestProduct(APITestCase):
+@override_settings(API_METRICS=True)
+class TestProduct(QueryBudgetMixin, APITestCase):
     """Product tests."""
     fixtures = ['category', 'country', 'api/tests/fixtures/product',
                 'api/tests/fixtures/attribute', 'api/tests/fixtures/keyword',
                 'api/tests/fixtures/productattribute',
                 'api/tests/fixtures/productextrainfo']
+    query_budgets = {
+        'GET api:product-list': 6,
+        'GET api:product-detail': 6,
+        'GET api:product-facets': 3,
+        'PATCH api:product-detail': 10,
+        'PUT api:product-detail': 23,
+    }
 
     def test_retrieve_all_products(self):
         """Return all the products created."""
@@ -22,6 +54,186 @@ class TestProduct(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(Product.objects.count(), 3)
 
+    def test_retrieve_products_paginated(self):
+        """
+        Ensure the product list is paginated with a cursor, the most recently
+        modified products first.
+        """
+        response = self.client.get(reverse('api:product-list'),
+                                   {'page_size': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([product['id'] for product in
+                          response.data['results']], [3, 2])
+        self.assertIsNone(response.data['previous'])
+        response = self.client.get(response.data['next'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([product['id'] for product in
+                          response.data['results']], [1])
+        self.assertIsNone(response.data['next'])
+
+    @override_settings(API_MAX_PAGE_SIZE=1)
+    def test_retrieve_products_page_size_capped(self):
+        """Ensure clients can not ask for pages over API_MAX_PAGE_SIZE."""
+        response = self.client.get(reverse('api:product-list'),
+                                   {'page_size': 2})
+        self.assertEqual(len(response.data['results']), 1)
+
+    @override_settings(REST_FRAMEWORK={
+        'DEFAULT_THROTTLE_RATES': {'products': '2/minute'}})
+    def test_retrieve_products_throttled(self):
+        """
+        Ensure the product endpoints are throttled,
+        :return: 429 too many requests.
+        """
+        cache.clear()
+        url = reverse('api:product-list')
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.get(url).status_code,
+                         status.HTTP_429_TOO_MANY_REQUESTS)
+        cache.clear()
+
+    def test_load_test_command(self):
+        """Ensure the load test reports latency and queries per endpoint."""
+        out = StringIO()
+        call_command('loadtest', requests=2, warmup=0, stdout=out)
+        self.assertIn('product-list', out.getvalue())
+        self.assertIn('product-detail', out.getvalue())
+        self.assertIn('queries/request', out.getvalue())
+
+    def test_search_products(self):
+        """Ensure the products can be searched by name, keyword and extras."""
+        run_commit_hooks()
+        url = reverse('api:product-list')
+        response = self.client.get(url, {'q': 'sportf'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 1)
+        self.assertEqual(response.data['results'][0]['id'], 1)
+        response = self.client.get(url, {'q': 'descripcion'})
+        self.assertEqual([product['id'] for product in
+                          response.data['results']], [3])
+        response = self.client.get(url, {'q': 'ln phi', 'page_size': 2})
+        self.assertEqual(response.data['count'], 3)
+        self.assertEqual(len(response.data['results']), 2)
+        response = self.client.get(url, {'q': '"*'})
+        self.assertEqual(response.data['count'], 0)
+
+    def test_search_backend_follows_database_vendor(self):
+        """
+        Ensure a backend made for another database is replaced by the
+        database backend, so product writes never reach a missing index.
+        """
+        self.addCleanup(setattr, SQLiteFTS5Backend, 'vendors',
+                        SQLiteFTS5Backend.vendors)
+        SQLiteFTS5Backend.vendors = ('postgresql',)
+        self.assertIsInstance(get_backend(), DatabaseSearchBackend)
+        self.client.patch(reverse('api:product-detail', kwargs={'pk': 1}),
+                          {'name': 'Sportflix 2'}, format='json')
+        response = self.client.get(reverse('api:product-list'),
+                                   {'q': 'sportflix'})
+        self.assertEqual(response.data['results'][0]['name'], 'Sportflix 2')
+
+    def test_search_index_follows_changes(self):
+        """Ensure the search index is kept in sync with the products."""
+        url = reverse('api:product-list')
+        data = {
+            "name": "PaySensei",
+            "brand": "Ln(Phi)",
+            "price": 200,
+            "category": 1,
+            "made_in": 1,
+            "keywords": [{"name": "aventura"}],
+            "attributes": []
+        }
+        self.client.post(url, data, format='json')
+        # The index is updated once the changes are committed.
+        response = self.client.get(url, {'q': 'aventura'})
+        self.assertEqual(response.data['count'], 0)
+        run_commit_hooks()
+        response = self.client.get(url, {'q': 'aventura'})
+        self.assertEqual(response.data['results'][0]['name'], 'PaySensei')
+        keyword = Keyword.objects.get(name='a')
+        keyword.name = 'renamed'
+        keyword.save()
+        run_commit_hooks()
+        response = self.client.get(url, {'q': 'renamed'})
+        self.assertEqual(response.data['count'], 3)
+        Product.objects.get(pk=1).delete()
+        run_commit_hooks()
+        response = self.client.get(url, {'q': 'renamed'})
+        self.assertEqual(response.data['count'], 2)
+
+    def test_filter_products(self):
+        """Ensure the products can be filtered by attributes and keywords."""
+        Product.objects.bulk_ingest([{
+            'name': 'PaySensei', 'brand': 'Ln(Phi)', 'price': 500,
+            'made_in_id': 1, 'category_id': 2, 'keywords': ['a', 'c'],
+            'attributes': [('material', 'acero'), ('color', 'rojo')],
+        }])
+        run_commit_hooks()
+        url = reverse('api:product-list')
+
+        def ids(params):
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            return sorted(product['id'] for product in
+                          response.data['results'])
+
+        self.assertEqual(ids({'attribute': 'material:acero'}), [1, 2, 3, 4])
+        self.assertEqual(ids({'attribute': ['material:acero', 'color:rojo']}),
+                         [4])
+        self.assertEqual(ids({'attribute': 'color:azul'}), [])
+        self.assertEqual(ids({'keyword': ['a', 'b']}), [1, 2, 3])
+        self.assertEqual(ids({'keyword': 'c', 'category': 2}), [4])
+        self.assertEqual(ids({'price_min': 300}), [4])
+        self.assertEqual(ids({'price_max': 300, 'made_in': 1}), [1, 2, 3])
+        self.assertEqual(ids({'q': 'paysensei', 'keyword': 'a'}), [4])
+        self.assertEqual(ids({'q': 'paysensei', 'keyword': 'b'}), [])
+        # Every match is intersected with the filters, not only the first
+        # scanned ones.
+        self.addCleanup(setattr, SearchResults, 'scan_size',
+                        SearchResults.scan_size)
+        SearchResults.scan_size = 1
+        self.assertEqual(ids({'q': 'ln phi', 'category': 2}), [4])
+        self.assertEqual(ids({'q': 'ln phi', 'keyword': 'a'}), [1, 2, 3, 4])
+        # The filters only apply to the list.
+        response = self.client.get(reverse(
+            'api:product-detail', kwargs={'pk': 1}), {'category': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_filter_products_with_invalid_data(self):
+        """
+        Ensure we can not filter products providing invalid data,
+        :return: 400 bad request.
+        """
+        url = reverse('api:product-list')
+        response = self.client.get(url, {'price_min': 'cheap'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(url, {'attribute': 'material'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_retrieve_product_facets(self):
+        """Ensure the facet counts follow the catalog changes."""
+        url = reverse('api:product-facets')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['categories'], [{'id': 1, 'count': 3}])
+        self.assertIn({'name': 'material', 'value': 'acero', 'count': 3},
+                      response.data['attributes'])
+        with self.assertNumQueries(0):
+            self.client.get(url)
+        Product.objects.bulk_ingest([{
+            'name': 'PaySensei', 'brand': 'Ln(Phi)', 'price': 500,
+            'made_in_id': 1, 'category_id': 2,
+            'attributes': [('material', 'acero')],
+        }])
+        response = self.client.get(url)
+        self.assertEqual(response.data['categories'],
+                         [{'id': 1, 'count': 3}, {'id': 2, 'count': 1}])
+        # Values differing by case only are counted together.
+        self.assertIn({'name': 'material', 'value': 'acero', 'count': 4},
+                      response.data['attributes'])
+
     def test_retrieve_one_product(self):
         """Return a specific product."""
         url = reverse('api:product-detail', kwargs={'pk': 1})
@@ -31,6 +243,75 @@ class TestProduct(APITestCase):
         self.assertEqual(response.data['brand'], 'Ln(Phi)')
         self.assertEqual(response.data['price'], 200)
 
+    def test_retrieve_one_product_not_modified(self):
+        """
+        Ensure a product is not serialized again when the client has the
+        current version,
+        :return: 304 not modified.
+        """
+        url = reverse('api:product-detail', kwargs={'pk': 1})
+        response = self.client.get(url)
+        etag = response['ETag']
+        self.assertNotIn('Last-Modified', response)
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.client.patch(url, {'extras': [{'title': 'titulo',
+                                            'description': 'descripcion'}]},
+                          format='json')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        etag = response['ETag']
+        # Renaming a keyword leaves last_modification as it is.
+        keyword = Product.objects.get(pk=1).keywords.all()[0]
+        keyword.name = 'renombrada'
+        keyword.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('renombrada', response.data['keywords'])
+
+    def test_retrieve_all_products_not_modified(self):
+        """
+        Ensure the product list is not serialized again when the client has
+        the current version,
+        :return: 304 not modified.
+        """
+        url = reverse('api:product-list')
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        Product.objects.get(pk=2).delete()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response['ETag']
+        # Renaming a keyword changes the rendered products only.
+        keyword = Keyword.objects.filter(product__isnull=False)[0]
+        keyword.name = 'renombrada'
+        keyword.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_expanded_category_not_modified(self):
+        """
+        Ensure renaming a category changes the ETag of the products that
+        expand it,
+        :return: 200 ok.
+        """
+        category = Category.objects.get(pk=1)
+        for name, url in (
+                ('Renombrada', reverse('api:product-list')),
+                ('Otra', reverse('api:product-detail', kwargs={'pk': 1}))):
+            url += '?expand=category'
+            etag = self.client.get(url)['ETag']
+            category.name = name
+            category.save()
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotEqual(response['ETag'], etag)
+            self.assertIn(name, response.content.decode('utf-8'))
+
     def test_retrieve_one_product_with_invalid_data(self):
         """
         Ensure we can not retrieve a product providing invalid data,
@@ -75,6 +356,28 @@ class TestProduct(APITestCase):
                                     format='json')
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
 
+    def test_create_product_with_existing_vocabulary(self):
+        """Ensure existing keywords and attributes are reused, not copied."""
+        data = {
+            "name": "PaySensei",
+            "model": "Primero",
+            "brand": "Ln(Phi)",
+            "price": 200,
+            "category": 1,
+            "made_in": 1,
+            "keywords": [{"name": "a"}],
+            "attributes": [{"name": "color", "value": "azul"}]
+        }
+        keywords, attributes = (Keyword.objects.count(),
+                                Attribute.objects.count())
+        response = self.client.post(reverse('api:product-list'), data,
+                                    format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Keyword.objects.count(), keywords)
+        self.assertEqual(Attribute.objects.count(), attributes)
+        with transaction.atomic(), self.assertRaises(IntegrityError):
+            Keyword.objects.create(name='a')
+
     def test_create_product_with_invalid_data(self):
         """
         Ensure we can not create new products providing invalid data
@@ -184,6 +487,87 @@ class TestProduct(APITestCase):
         self.assertTrue(response.data.get('flags').get('extras'))
         self.assertTrue(response.data.get('flags').get('logistics'))
 
+    def test_update_product_fields_and_vocabulary(self):
+        """
+        Ensure a partial update saves the scalar fields and replaces the
+        keywords and attributes.
+        """
+        product = Product.objects.get(pk=1)
+        data = {
+            "name": "Renombrado",
+            "price": 350,
+            "keywords": [{"name": "a"}, {"name": "nueva"}],
+            "attributes": [{"name": "color", "value": "Negro"}]
+        }
+        response = self.client.patch(reverse('api:product-detail',
+                                             kwargs={'pk': 1}),
+                                     data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['name'], 'Renombrado')
+        self.assertEqual(sorted(response.data['keywords']), ['a', 'nueva'])
+        self.assertEqual(response.data['attributes'],
+                         [{'name': 'color', 'value': 'negro'}])
+        updated = Product.objects.get(pk=1)
+        self.assertEqual((updated.name, updated.price), ('Renombrado', 350))
+        self.assertGreater(updated.last_modification,
+                           product.last_modification)
+
+    def test_update_product_with_many_extras(self):
+        """
+        Ensure replacing and appending many extras takes a fixed number of
+        queries, keeping the rows which did not change.
+        """
+        # The reference data of the validation comes from the warm cache.
+        reference_cache.all(Category)
+        reference_cache.all(Country)
+        url = reverse('api:product-detail', kwargs={'pk': 3})
+        kept = Product.objects.get(pk=3).extras.get()
+        extras = [{"title": kept.title, "description": kept.description}]
+        extras += [{"title": "titulo %d" % index, "description": "texto"}
+                   for index in range(49)]
+        data = {
+            "name": "Completo",
+            "brand": "Ln(Phi)",
+            "price": 10,
+            "category": 1,
+            "made_in": 1,
+            "keywords": [{"name": "a"}],
+            "attributes": [{"name": "color", "value": "azul"}],
+            "extras": extras
+        }
+        response = self.client.put(url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertQueryBudget(response)
+        self.assertEqual(len(response.data['extras']), 50)
+        self.assertTrue(ProductExtraInfo.objects.filter(pk=kept.pk).exists())
+        data['extras'] = extras[:10]
+        response = self.client.put(url, data, format='json')
+        self.assertQueryBudget(response)
+        self.assertEqual(
+            sorted(extra['title'] for extra in response.data['extras']),
+            sorted(extra['title'] for extra in extras[:10]))
+        self.assertEqual(ProductExtraInfo.objects.filter(
+            product=3).count(), 10)
+        pks = set(ProductExtraInfo.objects.filter(
+            product=3).values_list('pk', flat=True))
+        data['extras'] = extras[:9] + [{"title": "cambiado",
+                                        "description": "texto"}]
+        response = self.client.put(url, data, format='json')
+        self.assertIn({'title': 'cambiado', 'description': 'texto'},
+                      response.data['extras'])
+        self.assertEqual(set(ProductExtraInfo.objects.filter(
+            product=3).values_list('pk', flat=True)), pks)
+        response = self.client.patch(url, {"extras": extras[10:]},
+                                     format='json')
+        self.assertQueryBudget(response)
+        self.assertEqual(ProductExtraInfo.objects.filter(
+            product=3).count(), 50)
+        response = self.client.patch(url, {"extras": []}, format='json')
+        self.assertTrue(response.data['flags']['extras'])
+        response = self.client.put(url, dict(data, extras=[]),
+                                   format='json')
+        self.assertFalse(response.data['flags']['extras'])
+
     def test_delete_one_product(self):
         """
         Ensure we can delete a product.
@@ -203,3 +587,523 @@ class TestProduct(APITestCase):
                                               kwargs={'pk': 5}))
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
         self.assertEqual(Product.objects.count(), 3)
+
+    def test_product_endpoints_within_query_budgets(self):
+        """Ensure the product reads do not issue queries per product."""
+        list_url = reverse('api:product-list')
+        self.assertQueryBudget(self.client.get(list_url))
+        self.assertQueryBudget(self.client.get(
+            reverse('api:product-detail', kwargs={'pk': 3})))
+        self.assertQueryBudget(self.client.get(
+            reverse('api:product-facets')))
+        serializer = ProductSerializer(data=[{
+            "name": "Product %d" % index,
+            "brand": "Ln(Phi)",
+            "price": 100 + index,
+            "category": 1,
+            "made_in": 1,
+            "keywords": [{"name": "k%d" % index}],
+            "attributes": [{"name": "color", "value": "tono %d" % index}],
+            "extras": [{"title": "titulo", "description": "descripcion"}]
+        } for index in range(10)], many=True)
+        self.assertTrue(serializer.is_valid())
+        serializer.save()
+        response = self.client.get(list_url)
+        self.assertEqual(len(response.data['results']), 13)
+        self.assertQueryBudget(response)
+
+    def test_retrieve_products_with_sparse_fields(self):
+        """
+        Ensure only the requested fields are rendered and loaded, and the
+        expanded references are rendered as objects.
+        """
+        # Expanded references come from the warm reference cache.
+        reference_cache.all(Category)
+        reference_cache.all(Country)
+        url = reverse('api:product-list')
+        response = self.client.get(url, {'fields': 'id,name,price'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        for product in response.data['results']:
+            self.assertEqual(sorted(product), ['id', 'name', 'price'])
+        self.assertQueryBudget(response, 2)
+        response = self.client.get(
+            url, {'fields': 'id,flags', 'expand': 'category'})
+        product = response.data['results'][0]
+        self.assertEqual(sorted(product), ['category', 'flags', 'id'])
+        self.assertEqual(product['category'], {
+            'id': 1, 'name': '1', 'status': False})
+        self.assertQueryBudget(response, 2)
+        response = self.client.get(
+            reverse('api:product-detail', kwargs={'pk': 3}),
+            {'expand': 'made_in'})
+        self.assertEqual(response.data['made_in']['id'], 1)
+        self.assertIn('keywords', response.data)
+        self.assertQueryBudget(response)
+
+    def test_retrieve_products_with_unknown_fields(self):
+        """Ensure unknown sparse fields are rejected."""
+        url = reverse('api:product-list')
+        for params in ({'fields': 'id,secret'}, {'expand': 'keywords'}):
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code,
+                             status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(reverse('api:product-export'),
+                                   {'fields': 'secret'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_export_products(self):
+        """Ensure the catalog can be streamed as JSON and as NDJSON."""
+        url = reverse('api:product-export')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        products = json.loads(b''.join(response.streaming_content).decode())
+        self.assertEqual([product['id'] for product in products], [1, 2, 3])
+        self.assertEqual(products[2]['flags']['extras'], True)
+        response = self.client.get(url, {'format': 'ndjson', 'keyword': 'a'})
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(response.streaming_content).splitlines()
+        self.assertEqual(
+            [json.loads(line.decode())['id'] for line in lines],
+            list(Product.objects.filter(keywords__name='a').order_by(
+                'pk').values_list('pk', flat=True)))
+
+    def test_export_products_in_chunks(self):
+        """Ensure the export queries the catalog chunk by chunk."""
+        queryset = Product.objects.with_related().with_flags()
+        # One keyset query and four prefetches per chunk, plus the final
+        # empty chunk.
+        with self.assertNumQueries(5 * 2 + 1):
+            chunks = list(chunked(queryset, 2))
+        self.assertEqual([[product.pk for product in chunk]
+                          for chunk in chunks], [[1, 2], [3]])
+
+    def write_catalog_file(self, name, content):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, name)
+        with io.open(path, 'w', encoding='utf-8') as output:
+            output.write(content)
+        return path
+
+    def test_import_catalog_ndjson(self):
+        """Ensure products are imported from NDJSON in batches."""
+        path = self.write_catalog_file('catalog.ndjson', u'\n'.join(
+            json.dumps({
+                "name": "Importado %d" % index,
+                "brand": "Ln(Phi)",
+                "price": 10 + index,
+                "category": 1,
+                "made_in": 1,
+                "keywords": [{"name": "a"}, {"name": "importado"}],
+                "attributes": [{"name": "color", "value": "Verde"}],
+                "extras": [{"title": "titulo", "description": "texto"}],
+                "logistics": [{"origin": 1, "quantity": 2,
+                               "period": "W"}]
+            }) for index in range(5)))
+        out = StringIO()
+        call_command('import_catalog', path, batch_size=2, stdout=out)
+        self.assertIn('Import of 5 products done', out.getvalue())
+        products = Product.objects.filter(name__startswith='Importado')
+        self.assertEqual(products.count(), 5)
+        self.assertEqual(Keyword.objects.filter(name='importado').count(), 1)
+        self.assertEqual(
+            ProductAttribute.objects.filter(value='verde').count(), 1)
+        product = products.with_flags().get(name='Importado 4')
+        self.assertEqual(product.keywords.count(), 2)
+        self.assertTrue(product.has_extras and product.has_logistics)
+
+    def test_import_catalog_csv_resumes_from_checkpoint(self):
+        """
+        Ensure a failed CSV import keeps its committed batches and resumes
+        after them from the checkpoint.
+        """
+        header = u'name,brand,price,category,made_in,keywords,attributes\n'
+        rows = [u'Fila %d,Marca,%d,1,1,a|fila,color:azul\n' % (index, index)
+                for index in range(4)]
+        path = self.write_catalog_file(
+            'catalog.csv',
+            header + u''.join(rows[:3]) + u'Mala,Marca,x,1,1,,\n')
+        checkpoint = 'catalog'
+        with six.assertRaisesRegex(self, CommandError, 'Row 4 is invalid'):
+            call_command('import_catalog', path, batch_size=2,
+                         checkpoint=checkpoint, stdout=StringIO())
+        products = Product.objects.filter(name__startswith='Fila')
+        self.assertEqual(products.count(), 2)
+        # The checkpoint is committed along with the products.
+        self.assertEqual(ImportCheckpoint.objects.get(name=checkpoint).rows,
+                         2)
+        with six.assertRaisesRegex(self, CommandError, 'belongs to'):
+            call_command('import_catalog', path + '.other', format='csv',
+                         checkpoint=checkpoint, stdout=StringIO())
+        with io.open(path, 'w', encoding='utf-8') as output:
+            output.write(header + u''.join(rows))
+        out = StringIO()
+        call_command('import_catalog', path, batch_size=2,
+                     checkpoint=checkpoint, stdout=out)
+        self.assertIn('Resuming after row 2.', out.getvalue())
+        self.assertEqual(sorted(products.values_list('name', flat=True)),
+                         ['Fila 0', 'Fila 1', 'Fila 2', 'Fila 3'])
+        self.assertEqual(
+            sorted(products.get(name='Fila 3').keywords.values_list(
+                'name', flat=True)), ['a', 'fila'])
+        self.assertFalse(ImportCheckpoint.objects.exists())
+
+    @override_settings(API_PRODUCT_DOCUMENTS=True)
+    def test_retrieve_products_from_documents(self):
+        """
+        Ensure the product reads are served from the stored documents, which
+        follow the product changes.
+        """
+        list_url = reverse('api:product-list')
+        detail_url = reverse('api:product-detail', kwargs={'pk': 3})
+        expected = ProductSerializer(
+            Product.objects.with_related().with_flags().get(pk=3)).data
+        out = StringIO()
+        call_command('rebuild_product_documents', stdout=out)
+        self.assertIn('Built 3 product documents.', out.getvalue())
+        response = self.client.get(detail_url)
+        self.assertEqual(response.data, expected)
+        # The conditional request validators, the product and its document.
+        self.assertQueryBudget(response, 3)
+        response = self.client.get(list_url)
+        self.assertEqual(response.data['results'][0], expected)
+        self.assertQueryBudget(response, 3)
+        response = self.client.patch(detail_url, {'name': 'Documentado'},
+                                     format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.get(detail_url).data['name'],
+                         'Documentado')
+        self.client.delete(detail_url)
+        self.assertFalse(ProductDocument.objects.filter(pk=3).exists())
+        self.assertEqual(self.client.get(detail_url).status_code,
+                         status.HTTP_404_NOT_FOUND)
+        # Products without a document are rendered from the tables, reads
+        # do not write.
+        ProductDocument.objects.filter(pk=1).delete()
+        response = self.client.get(list_url)
+        self.assertEqual([product['id'] for product in
+                          response.data['results']], [2, 1])
+        self.assertEqual(response.data['results'][1], ProductSerializer(
+            Product.objects.with_related().with_flags().get(pk=1)).data)
+        self.assertEqual(ProductDocument.objects.count(), 1)
+
+    def test_request_metrics(self):
+        """
+        Ensure the request metrics are sent in Server-Timing and can be read
+        from the metrics endpoint.
+        """
+        registry.clear()
+        response = self.client.get(reverse('api:product-list'))
+        self.assertIn('db;dur=', response['Server-Timing'])
+        self.assertIn('serialize;dur=', response['Server-Timing'])
+        self.assertIn('total;dur=', response['Server-Timing'])
+        metrics = self.client.get(reverse('api:metrics')).json()
+        self.assertEqual(metrics['GET api:product-list']['requests'], 1)
+        self.assertEqual(metrics['GET api:product-list']['queries'],
+                         len(response.metrics.queries))
+        response = self.client.get(reverse('api:metrics'),
+                                   REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_request_metrics_of_streamed_responses(self):
+        """
+        Ensure the queries run while a response is streamed are counted,
+        and the request recorded once the content is consumed.
+        """
+        registry.clear()
+        response = self.client.get(reverse('api:product-export'))
+        self.assertNotIn('GET api:product-export', registry.snapshot())
+        b''.join(response.streaming_content)
+        self.assertGreater(len(response.metrics.queries), 0)
+        self.assertEqual(
+            registry.snapshot()['GET api:product-export']['queries'],
+            len(response.metrics.queries))
+
+    def test_serialize_products_in_fixed_number_of_queries(self):
+        """
+        Ensure serializing the optimized product queryset does not issue
+        queries per product.
+        """
+        products = Product.objects.with_related().with_flags()
+        with self.assertNumQueries(5):
+            data = ProductSerializer(products, many=True).data
+        self.assertEqual(len(data), 3)
+        self.assertEqual(data[0]['attributes'][0]['name'], 'material')
+        self.assertEqual([item['flags']['extras'] for item in data],
+                         [False, False, True])
+
+    def test_render_products_from_rows(self):
+        """
+        Ensure the product list renders the same bytes from values() rows
+        as from the serializer.
+        """
+        serializer = ProductSerializer(data=[{
+            "name": "Product %d" % index,
+            "model": "M%d" % index,
+            "brand": "Ln(Phi)",
+            "price": 100 + index,
+            "category": 2,
+            "made_in": 1,
+            "keywords": [{"name": "k%d" % index}, {"name": "a"}],
+            "attributes": [{"name": "color", "value": "tono %d" % index}],
+            "extras": [{"title": u"t\xedtulo", "description": "descripcion"}],
+            "logistics": [{"origin": 1, "quantity": index, "period": "D"}]
+        } for index in range(4)], many=True)
+        self.assertTrue(serializer.is_valid())
+        serializer.save()
+        url = reverse('api:product-list')
+        for params in ({}, {'page_size': 2}, {'keyword': 'a'},
+                       {'fields': 'id,name,keywords,flags'},
+                       {'expand': 'made_in,category'}):
+            with self.settings(API_ROW_RENDERING=False):
+                expected = self.client.get(url, params)
+            with self.settings(API_ROW_RENDERING=True):
+                response = self.client.get(url, params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.content, expected.content)
+            self.assertQueryBudget(response)
+
+    def test_bench_serializers_command(self):
+        """Ensure the rendering benchmark reports both paths."""
+        out = StringIO()
+        call_command('bench_serializers', rows=3, repeat=2, stdout=out)
+        for name in ('products-serializer', 'products-rows',
+                     'companies-serializer', 'companies-rows'):
+            self.assertIn(name, out.getvalue())
+
+    def test_filter_products_by_flags(self):
+        """Ensure the completeness flags can be filtered in the database."""
+        products = Product.objects.with_flags()
+        self.assertEqual(
+            list(products.filter(has_extras=True).values_list('id',
+                                                              flat=True)),
+            [3])
+        self.assertEqual(products.filter(has_logistics=True).count(), 0)
+
+    def test_create_products_in_bulk(self):
+        """
+        Ensure a list of products is created with set-based queries, reusing
+        the existing keywords and attributes.
+        """
+        data = [{
+            "name": "Product %d" % index,
+            "brand": "Ln(Phi)",
+            "price": 100 + index,
+            "category": 1,
+            "made_in": 1,
+            "keywords": [{"name": "a"}, {"name": "nuevo"}, {"name": "nuevo"}],
+            "attributes": [{"name": "color", "value": "Rojo"},
+                           {"name": "textura", "value": "lisa"}],
+            "extras": [{"title": "titulo", "description": "descripcion"}]
+        } for index in range(20)]
+        serializer = ProductSerializer(data=data, many=True)
+        self.assertTrue(serializer.is_valid())
+        # SQLite can not return bulk inserted ids, so each product costs one
+        # INSERT on top of the set-based vocabulary and relation writes. The
+        # search index is updated after the commit.
+        with self.assertNumQueries(14 + len(data)):
+            products = serializer.save()
+        self.assertEqual(len(products), 20)
+        self.assertEqual(Product.objects.count(), 23)
+        self.assertEqual(Keyword.objects.filter(name='nuevo').count(), 1)
+        self.assertEqual(Attribute.objects.filter(name='textura').count(), 1)
+        self.assertEqual(
+            ProductAttribute.objects.filter(value='rojo').count(), 1)
+        product = Product.objects.get(pk=products[-1].pk)
+        self.assertEqual(sorted(product.keywords.values_list('name',
+                                                             flat=True)),
+                         ['a', 'nuevo'])
+        self.assertEqual(product.attributes.count(), 2)
+        self.assertEqual(product.extras.count(), 1)
+
+    def test_resolve_vocabulary_inserted_concurrently(self):
+        """
+        Ensure terms inserted by another transaction after they were looked
+        up are reused instead of duplicated.
+        """
+        keyword = Keyword.objects.create(name='concurrente')
+        insert_ignoring(Keyword, ('name',), [('concurrente',), ('nueva',)],
+                        'default')
+        self.assertEqual(Keyword.objects.filter(
+            name__in=['concurrente', 'nueva']).count(), 2)
+        resolved = Keyword.objects.resolve(['concurrente', 'nueva'])
+        self.assertEqual(resolved['concurrente'].pk, keyword.pk)
+        attribute = Attribute.objects.get(name='color')
+        insert_ignoring(ProductAttribute, ('attribute', 'value'),
+                        [(attribute.pk, 'rojo'), (attribute.pk, 'verde')],
+                        'default')
+        self.assertEqual(ProductAttribute.objects.filter(
+            attribute=attribute, value='rojo').count(), 1)
+
+    @override_settings(API_VOCABULARY_CACHE_SIZE=1,
+                       API_SHARED_CACHE='default')
+    def test_interned_keywords_cost_no_query(self):
+        """
+        Ensure committed keywords are resolved without queries, the least
+        recently used first evicted, and forgotten once renamed, by this
+        process or by another one.
+        """
+        cache.clear()
+        interned_keywords.clear()
+        self.addCleanup(interned_keywords.clear)
+        keywords = Keyword.objects.in_bulk()
+        names = [term.name for term in keywords.values()]
+        version = interned_keywords.get_version()
+        interned_keywords.get_many('default', names, version)
+        interned_keywords.set_many('default', [
+            (term.name, term.pk) for term in keywords.values()], version)
+        keyword = keywords[max(keywords)]
+        with self.assertNumQueries(0):
+            resolved = VocabularyCache().resolve_keywords([keyword.name])
+        self.assertEqual(resolved[keyword.name].pk, keyword.pk)
+        self.assertEqual(interned_keywords.get_many('default', names, version),
+                         {keyword.name: keyword.pk})
+        # Another process renames it, only the shared version changes.
+        versions.bump(Keyword._meta.label_lower)
+        self.assertEqual(interned_keywords.get_many(
+            'default', [keyword.name], interned_keywords.get_version()), {})
+        version = interned_keywords.get_version()
+        interned_keywords.set_many('default', [(keyword.name, keyword.pk)],
+                                   version)
+        self.assertEqual(interned_keywords.get_many(
+            'default', [keyword.name], version), {keyword.name: keyword.pk})
+        keyword.name = 'renombrada'
+        keyword.save()
+        self.assertEqual(interned_keywords.get_many(
+            'default', [keyword.name], interned_keywords.get_version()), {})
+        # Terms read before a bump are not added after it.
+        interned_keywords.set_many('default', [('renombrada', keyword.pk)],
+                                   version)
+        self.assertEqual(interned_keywords.get_many(
+            'default', ['renombrada'], interned_keywords.get_version()), {})
+
+    @override_settings(API_SHARED_CACHE=None)
+    def test_interned_keywords_need_shared_cache(self):
+        """
+        Ensure the keywords are not interned across transactions when other
+        processes could rename them unnoticed.
+        """
+        keyword = Keyword.objects.first()
+        VocabularyCache().resolve_keywords([keyword.name])
+        with self.assertNumQueries(1):
+            VocabularyCache().resolve_keywords([keyword.name])
+
+    def test_create_products_in_bulk_endpoint(self):
+        """
+        Ensure a list of products can be created in one request,
+        :return: 201 created.
+        """
+        data = [{
+            "name": "PaySensei",
+            "brand": "Ln(Phi)",
+            "price": 200,
+            "category": 1,
+            "made_in": 1,
+            "keywords": [{"name": "aventura"}],
+            "attributes": [{"name": "color", "value": "rojo"}]
+        }, {
+            "name": "Onic Pro",
+            "brand": "Ln(Phi)",
+            "price": 300,
+            "category": 2,
+            "made_in": 1,
+            "keywords": [{"name": "aventura"}],
+            "attributes": []
+        }]
+        response = self.client.post(reverse('api:product-bulk'), data,
+                                    format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual(Product.objects.count(), 5)
+
+    @override_settings(API_RESPONSE_CACHE=True, API_SHARED_CACHE='default')
+    def test_cache_product_responses(self):
+        """
+        Ensure product responses are served from the response cache until
+        the catalog changes, whatever the order of the query parameters.
+        """
+        cache.clear()
+        response_cache.clear()
+        url = reverse('api:product-list')
+        response = self.client.get(url, {'page_size': 2, 'ordering': 'pk'})
+        with self.assertNumQueries(0):
+            cached = self.client.get(url + '?ordering=pk&page_size=2')
+        self.assertEqual(cached.status_code, status.HTTP_200_OK)
+        self.assertEqual(cached.content, response.content)
+        self.assertEqual(cached['ETag'], response['ETag'])
+        with self.assertNumQueries(0):
+            cached = self.client.get(url + '?ordering=pk&page_size=2',
+                                     HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.client.patch(reverse('api:product-detail', kwargs={'pk': 1}),
+                          {'name': 'Sportflix 2'}, format='json')
+        response = self.client.get(url, {'page_size': 2, 'ordering': 'pk'})
+        self.assertEqual(response.data['results'][0]['name'], 'Sportflix 2')
+        stats = response_cache.stats()['api:product-list']
+        self.assertEqual((stats['hits'], stats['misses']), (2, 2))
+
+    @override_settings(API_RESPONSE_CACHE=True, API_SHARED_CACHE='default',
+                       API_RESPONSE_CACHE_SIZE=1)
+    def test_response_cache_evicts_least_recently_used(self):
+        """
+        Ensure the response cache keeps at most API_RESPONSE_CACHE_SIZE
+        responses per process, the evicted ones still in the shared cache,
+        and no error responses.
+        """
+        cache.clear()
+        response_cache.clear()
+        for pk in (1, 2, 1, 10, 10):
+            self.client.get(reverse('api:product-detail', kwargs={'pk': pk}))
+        stats = response_cache.stats()['api:product-detail']
+        self.assertEqual((stats['hits'], stats['shared_hits'],
+                          stats['misses'], stats['evictions']), (0, 1, 4, 2))
+
+    @override_settings(API_SHARED_CACHE='default')
+    def test_response_cache_local_entries_expire(self):
+        """
+        Ensure local responses are kept API_RESPONSE_CACHE_LOCAL_TTL
+        seconds, then read again from the shared cache.
+        """
+        cache.clear()
+        response_cache.clear()
+        response_cache.get_or_set('test', 'key', lambda: 'value')
+        response_cache.get_or_set('test', 'key', lambda: 'value')
+        with self.settings(API_RESPONSE_CACHE_LOCAL_TTL=-1):
+            response_cache.get_or_set('test', 'other', lambda: 'value')
+            response_cache.get_or_set('test', 'other', lambda: 'value')
+        stats = response_cache.stats()['test']
+        self.assertEqual((stats['hits'], stats['shared_hits'],
+                          stats['misses']), (1, 1, 2))
+
+    @override_settings(API_RESPONSE_CACHE=True, API_SHARED_CACHE=None)
+    def test_response_cache_requires_shared_cache(self):
+        """Ensure the response cache is not used with process local caches."""
+        response_cache.clear()
+        self.assertFalse(response_cache.is_enabled())
+        response = self.client.get(reverse('api:product-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response_cache.stats(), {})
+
+    def test_response_cache_computes_concurrent_misses_once(self):
+        """Ensure concurrent misses on a key wait for a single computation."""
+        response_cache.clear()
+        computed = []
+
+        def compute():
+            computed.append(1)
+            time.sleep(0.1)
+            return 'value'
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(
+            response_cache.get_or_set('test', 'key', compute)))
+            for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, ['value'] * 4)
+        self.assertEqual(len(computed), 1)
+        self.assertEqual(response_cache.stats()['test']['waits'], 3)
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""JSON renderer and parser tests."""
+
+import json
+from collections import OrderedDict
+from datetime import date, datetime
+from decimal import Decimal
+from io import BytesIO
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.test import override_settings
+from django.utils.six import StringIO
+from django.utils.timezone import utc
+
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase
+
+from api.encoders import BACKENDS, get_backend
+from api.parsers import FastJSONParser
+from api.renderers import FastJSONRenderer
+
+
+class TestJSON(APITestCase):
+    """JSON rendering and parsing tests."""
+
+    def get_data(self):
+        return [OrderedDict([
+            ('price', Decimal('10.50')),
+            ('modified', datetime(2020, 1, 2, 3, 4, 5, 678, tzinfo=utc)),
+            ('day', date(2020, 1, 2)),
+            ('name', u'caf\xe9 / \u2028 \u2029'),
+            ('tags', ('a', 'b')),
+            ('empty', None),
+        ])]
+
+    def test_backends_match_rest_framework(self):
+        """Ensure every installed backend encodes like REST framework."""
+        data = self.get_data()
+        expected = JSONRenderer().render(data)
+        for name, backend_class in BACKENDS.items():
+            try:
+                backend = backend_class()
+            except ImportError:
+                continue
+            content = backend.dumps(data)
+            self.assertEqual(content, expected, name)
+            self.assertEqual(backend.loads(content),
+                             json.loads(expected.decode('utf-8')), name)
+
+    @override_settings(API_JSON_BACKENDS=['missing'])
+    def test_unknown_backend(self):
+        """Ensure an unknown backend is reported."""
+        with self.assertRaises(ImproperlyConfigured):
+            get_backend()
+
+    def test_render_and_parse(self):
+        """Ensure the renderer and parser round trip, and reject bad JSON."""
+        content = FastJSONRenderer().render(self.get_data())
+        self.assertEqual(content, JSONRenderer().render(self.get_data()))
+        self.assertEqual(
+            FastJSONParser().parse(BytesIO(content))[0]['name'],
+            u'caf\xe9 / \u2028 \u2029')
+        with self.assertRaises(ParseError):
+            FastJSONParser().parse(BytesIO(b'{"name": '))
+        self.assertEqual(FastJSONRenderer().render(
+            {'a': 1}, 'application/json; indent=2'), b'{\n  "a": 1\n}')
+
+    def test_bench_json_command(self):
+        """Ensure the JSON benchmark reports REST framework and backends."""
+        call_command('loaddata', 'category', 'country',
+                     'api/tests/fixtures/product', verbosity=0)
+        out = StringIO()
+        call_command('bench_json', rows=3, repeat=2, stdout=out)
+        self.assertIn('rest_framework', out.getvalue())
+        self.assertIn('json ', out.getvalue())
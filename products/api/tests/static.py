@@ -1,18 +1,24 @@
 # -*- coding: utf-8 -*-
 """Static tests."""
 
+from django.test import override_settings
 from django.urls import reverse
 
 from rest_framework import status
 from rest_framework.test import APITestCase
 
-from api.models import Category
+from api.cache import reference_cache, versions
+from api.models import Category, Country
+from api.serializers import StateSerializer
 
 
 class TestCategory(APITestCase):
     """Category tests."""
     fixtures = ['category']
 
+    def setUp(self):
+        reference_cache.clear()
+
     def test_get_categories(self):
         """Return all the categories created."""
         response = self.client.get(reverse('api:category-list'))
@@ -101,3 +107,82 @@ class TestCategory(APITestCase):
         response = self.client.delete(url)
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
         self.assertEqual(Category.objects.count(), 5)
+
+
+class TestReferenceCache(APITestCase):
+    """Reference data cache tests."""
+    fixtures = ['category', 'country', 'state']
+
+    def setUp(self):
+        reference_cache.clear()
+
+    def test_get_categories_without_queries(self):
+        """Ensure the categories are read from the cache once loaded."""
+        url = reverse('api:category-list')
+        with self.assertNumQueries(1):
+            self.client.get(url)
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+            detail = self.client.get(reverse('api:category-detail',
+                                             kwargs={'pk': 2}))
+        self.assertEqual(len(response.data), 5)
+        self.assertEqual(detail.data['id'], 2)
+
+    def test_get_categories_not_modified(self):
+        """
+        Ensure the categories are not serialized again when the client has
+        the current version, should return 304 not modified.
+        """
+        url = reverse('api:category-list')
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        Category.objects.create(name='Tech')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_cache_invalidated_on_save(self):
+        """Ensure a change to a category is visible on the next read."""
+        url = reverse('api:category-list')
+        self.client.get(url)
+        Category.objects.create(name='Tech')
+        response = self.client.get(url)
+        self.assertEqual(len(response.data), 6)
+        Category.objects.filter(name='Tech').get().delete()
+        response = self.client.get(url)
+        self.assertEqual(len(response.data), 5)
+
+    def test_etag_same_in_every_process(self):
+        """
+        Ensure the ETag depends on the rows, not on the version tokens of
+        the process.
+        """
+        url = reverse('api:category-list')
+        etag = self.client.get(url)['ETag']
+        versions.bump(Category._meta.label_lower)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    @override_settings(API_LOCAL_VERSION_TTL=-1)
+    def test_local_versions_expire(self):
+        """Ensure process local tokens expire after API_LOCAL_VERSION_TTL."""
+        label = Category._meta.label_lower
+        versions.bump(label)
+        self.assertNotEqual(versions.get(label), versions.get(label))
+        with self.assertNumQueries(2):
+            reference_cache.all(Category)
+            reference_cache.all(Category)
+
+    def test_validate_related_fields_without_queries(self):
+        """Ensure reference data related fields are validated from cache."""
+        reference_cache.all(Country)
+        serializer = StateSerializer(data={'name': 'Sonora', 'code': 'SO',
+                                           'country': 1})
+        with self.assertNumQueries(0):
+            self.assertTrue(serializer.is_valid())
+        self.assertEqual(serializer.validated_data['country'].code, 'MX')
+        serializer = StateSerializer(data={'name': 'Texas', 'code': 'TX',
+                                           'country': 2})
+        self.assertFalse(serializer.is_valid())
+        self.assertIn('country', serializer.errors)
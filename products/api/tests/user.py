@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""User tests."""
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+from django.utils.six import StringIO
+
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from api.models.user import UserProfile
+from api.tests.mixins import QueryBudgetMixin
+
+
+@override_settings(API_METRICS=True)
+class TestUserProfile(QueryBudgetMixin, APITestCase):
+    """User registration tests."""
+    fixtures = ['country']
+    query_budgets = {
+        'POST api:userprofile-list': 5,
+    }
+
+    def get_signup_data(self, email):
+        return {'first_name': 'Ada', 'last_name': 'Lovelace',
+                'email': email, 'password': 'analytical',
+                'password_confirmation': 'analytical', 'phone': '55010203',
+                'role': 'admin'}
+
+    def test_register_user(self):
+        """Ensure a signup inserts the user and its final profile."""
+        response = self.client.post(
+            reverse('api:userprofile-list'),
+            self.get_signup_data('Ada@example.com'), format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertQueryBudget(response)
+        self.assertEqual(response.data['email'], 'Ada@example.com')
+        user = User.objects.get(username='ada@example.com')
+        self.assertTrue(user.check_password('analytical'))
+        profile = UserProfile.objects.get(user=user)
+        self.assertEqual((profile.phone, profile.role), ('55010203', 'admin'))
+
+    def test_register_existing_email(self):
+        """Ensure an email can only be registered once, in any case."""
+        url = reverse('api:userprofile-list')
+        self.client.post(url, self.get_signup_data('ada@example.com'),
+                         format='json')
+        response = self.client.post(
+            url, self.get_signup_data('ADA@example.com'), format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('email', response.data)
+        self.assertEqual(User.objects.count(), 1)
+
+    def test_register_existing_email_by_username(self):
+        """
+        Ensure the email uniqueness check is an exact lookup, which the
+        username index serves.
+        """
+        User.objects.create(username='ada@example.com',
+                            email='Ada@Example.com')
+        response = self.client.post(
+            reverse('api:userprofile-list'),
+            self.get_signup_data('Ada@Example.com'), format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('email', response.data)
+        sql = response.metrics.queries[0]['sql']
+        self.assertIn('"auth_user"."username" = %s', sql)
+
+    @override_settings(API_PASSWORD_ITERATIONS=1000)
+    def test_password_iterations(self):
+        """Ensure new passwords are hashed with the configured iterations."""
+        self.client.post(reverse('api:userprofile-list'),
+                         self.get_signup_data('ada@example.com'),
+                         format='json')
+        user = User.objects.get()
+        algorithm, iterations = user.password.split('$')[:2]
+        self.assertEqual((algorithm, iterations), ('pbkdf2_sha256', '1000'))
+        self.assertTrue(user.check_password('analytical'))
+
+    @override_settings(API_PASSWORD_ITERATIONS=1000)
+    def test_bench_signup_command(self):
+        """Ensure the signup benchmark reports throughput and cleans up."""
+        out = StringIO()
+        call_command('bench_signup', signups=3, stdout=out)
+        self.assertIn('signups/s', out.getvalue())
+        self.assertFalse(User.objects.exists())
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+"""Vocabulary interning tests across processes."""
+
+import os
+import shutil
+import tempfile
+
+from django.core.management import call_command
+from django.db import connection, connections
+from django.test import TransactionTestCase
+from django.utils.six import StringIO
+
+
+class TestVocabularyStress(TransactionTestCase):
+    """
+    Concurrent interning tests, on a committed database the processes can
+    copy.
+    """
+
+    def test_stress_vocabulary_command(self):
+        """
+        Ensure concurrent processes resolving the same terms insert each
+        of them once, on a file copy of the test database they can share.
+        """
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'stress.sqlite3')
+        with connection.cursor() as cursor:
+            cursor.execute('VACUUM INTO %s', [path])
+        connections.databases['stress'] = dict(connection.settings_dict,
+                                               NAME=path)
+
+        def remove_alias():
+            connections['stress'].close()
+            del connections['stress']
+            del connections.databases['stress']
+        self.addCleanup(remove_alias)
+        out = StringIO()
+        call_command('stress_vocabulary', database='stress', processes=4,
+                     rounds=10, terms=30, stdout=out)
+        self.assertIn('0 errors  0 duplicates  0 conflicts', out.getvalue())
@@ -0,0 +1,17 @@
+# -*- coding: utf-8 -*-
+"""API throttling."""
+
+from django.conf import settings
+
+from rest_framework.throttling import ScopedRateThrottle
+
+
+class SettingsScopedRateThrottle(ScopedRateThrottle):
+    """
+    Scoped throttle that reads its rate from the current settings, a scope
+    without a configured rate is not throttled.
+    """
+
+    def get_rate(self):
+        rest_framework = getattr(settings, 'REST_FRAMEWORK', {})
+        return rest_framework.get('DEFAULT_THROTTLE_RATES', {}).get(self.scope)
@@ -8,6 +8,8 @@ from rest_framework import routers
 from api.views import (IndustryViewSet, CountryViewSet, StateViewSet,
                        CategoryViewSet, UserProfileViewSet)
 from api.views.company import CompanyViewSet
+from api.views.metrics import metrics
+from api.views.product import ProductViewSet
 
 router = routers.DefaultRouter()
 router.register(r'industries', IndustryViewSet)
@@ -16,7 +18,9 @@ router.register(r'states', StateViewSet)
 router.register(r'categories', CategoryViewSet)
 router.register(r'users', UserProfileViewSet)
 router.register(r'companies', CompanyViewSet)
+router.register(r'products', ProductViewSet)
 
 urlpatterns = [
+    url(r'^metrics/$', metrics, name='metrics'),
     url(r'^', include(router.urls)),
 ]
@@ -3,11 +3,27 @@
 
 from rest_framework import viewsets
 
+from api.models import Category, Industry
 from api.models.company import Company
+from api.pagination import CursorPagination
 from api.serializers.company import CompanySerializer
+from api.views.mixins import (MetricsMixin, PrimaryWritesMixin,
+                              ResponseCacheMixin, RowsMixin,
+                              SparseFieldsViewMixin)
 
 
-class CompanyViewSet(viewsets.ModelViewSet):
+class CompanyViewSet(MetricsMixin, PrimaryWritesMixin, ResponseCacheMixin,
+                     SparseFieldsViewMixin, RowsMixin,
+                     viewsets.ModelViewSet):
     """Company view set."""
     queryset = Company.objects.all()
     serializer_class = CompanySerializer
+    pagination_class = CursorPagination
+    cache_models = (Company, Category, Industry)
+
+    def get_queryset(self):
+        queryset = super(CompanyViewSet, self).get_queryset()
+        fields, expand = self.get_sparse_fields()
+        if fields is None or 'product_categories' in fields:
+            queryset = queryset.prefetch_related('product_categories')
+        return queryset
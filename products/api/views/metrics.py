@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+"""Metrics views."""
+
+from django.conf import settings
+from django.http import Http404, JsonResponse
+
+from api.cache import response_cache
+from api.metrics import registry
+
+
+def metrics(request):
+    """
+    Per endpoint request metrics of this process, and the response cache
+    counters under ``response_cache``, only served to the ``INTERNAL_IPS``.
+    """
+    if request.META.get('REMOTE_ADDR') not in settings.INTERNAL_IPS:
+        raise Http404
+    snapshot = registry.snapshot()
+    snapshot['response_cache'] = response_cache.stats()
+    return JsonResponse(snapshot)
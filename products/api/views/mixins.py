@@ -0,0 +1,252 @@
+# -*- coding: utf-8 -*-
+"""View set mixins."""
+
+import hashlib
+from calendar import timegm
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils import six
+from django.utils.cache import get_conditional_response
+from django.utils.encoding import force_bytes
+from django.utils.http import (http_date, parse_etags, parse_http_date_safe,
+                               quote_etag, urlencode)
+
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+
+from api import db
+from api.cache import response_cache
+from api.metrics import timer
+from api.serializers.rows import RowSerializer
+
+
+def make_etag(request, *parts):
+    """
+    Build an ETag from ``parts`` and the requested representation, that is
+    the full path and the negotiated format.
+    """
+    parts = (request.get_full_path(), request.accepted_renderer.format) + parts
+    return hashlib.md5(force_bytes('|'.join(
+        '%s' % part for part in parts))).hexdigest()
+
+
+class ConditionalMixin(object):
+    """
+    Answer conditional ``GET`` requests on list and retrieve with a
+    ``304 Not Modified`` before any serialization work is done.
+
+    View sets provide the validators, an ``(etag, last_modified)`` tuple,
+    through ``get_list_validators`` and ``get_detail_validators``. Both
+    should be much cheaper than building the response.
+    """
+
+    def get_list_validators(self, request):
+        return None, None
+
+    def get_detail_validators(self, request, *args, **kwargs):
+        return None, None
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            self.get_list_validators(request),
+            super(ConditionalMixin, self).list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            self.get_detail_validators(request, *args, **kwargs),
+            super(ConditionalMixin, self).retrieve, request, *args, **kwargs)
+
+    def conditional_response(self, validators, handler, request, *args,
+                             **kwargs):
+        etag, last_modified = validators
+        if last_modified is not None:
+            last_modified = timegm(last_modified.utctimetuple())
+        response = get_conditional_response(request, etag=etag,
+                                            last_modified=last_modified)
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            if etag and not response.has_header('ETag'):
+                response['ETag'] = quote_etag(etag)
+            if last_modified and not response.has_header('Last-Modified'):
+                response['Last-Modified'] = http_date(last_modified)
+        return response
+
+
+class MetricsMixin(object):
+    """
+    Report the time spent turning instances into primitive data to the
+    request metrics, as ``serialize``.
+    """
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super(MetricsMixin, self).get_serializer(*args, **kwargs)
+        to_representation = serializer.to_representation
+
+        def timed(instance):
+            with timer('serialize'):
+                return to_representation(instance)
+
+        serializer.to_representation = timed
+        return serializer
+
+
+class PrimaryWritesMixin(object):
+    """
+    Pin the reads of the request, and of the next ones of the client, to
+    the primary database once the view writes.
+    """
+
+    def perform_create(self, serializer):
+        db.pin_primary()
+        super(PrimaryWritesMixin, self).perform_create(serializer)
+
+    def perform_update(self, serializer):
+        db.pin_primary()
+        super(PrimaryWritesMixin, self).perform_update(serializer)
+
+    def perform_destroy(self, instance):
+        db.pin_primary()
+        super(PrimaryWritesMixin, self).perform_destroy(instance)
+
+
+class SparseFieldsViewMixin(object):
+    """
+    Let safe requests pick the fields to render with ``?fields=`` and the
+    references to render as objects with ``?expand=``, both comma separated,
+    for serializers built on ``api.serializers.mixins.SparseFieldsMixin``.
+    Expanded fields are rendered even when not listed in ``fields``.
+
+    ``get_sparse_fields`` lets ``get_queryset`` load only what is rendered.
+    """
+
+    def get_sparse_fields(self):
+        """
+        Return the names of the requested fields, ``None`` for all of them,
+        and the names of the expanded ones.
+        """
+        request = self.request
+        if request is None or request.method not in SAFE_METHODS:
+            return None, set()
+
+        def names(param):
+            value = request.query_params.get(param)
+            if value is None:
+                return None
+            return set(name.strip() for name in value.split(',')
+                       if name.strip())
+
+        fields, expand = names('fields'), names('expand') or set()
+        if fields is not None:
+            fields.update(expand)
+        return fields, expand
+
+    def get_serializer_context(self):
+        context = super(SparseFieldsViewMixin,
+                        self).get_serializer_context()
+        context['fields'], context['expand'] = self.get_sparse_fields()
+        return context
+
+
+class RowsMixin(object):
+    """
+    Render the ``list`` action from ``values()`` rows with
+    ``api.serializers.rows.RowSerializer``, skipping model instances and
+    the serializer field machinery. Enabled by ``API_ROW_RENDERING`` and
+    ``renders_rows``.
+
+    The rows also hold the ordering fields of the paginator, the cursor
+    pagination reads the positions of the page from them.
+    """
+
+    def renders_rows(self):
+        return getattr(settings, 'API_ROW_RENDERING', False)
+
+    def list(self, request, *args, **kwargs):
+        if not self.renders_rows():
+            return super(RowsMixin, self).list(request, *args, **kwargs)
+        rows = RowSerializer(self.get_serializer())
+        queryset = self.filter_queryset(self.get_queryset())
+        ordering = getattr(self.paginator, 'ordering', ())
+        if isinstance(ordering, six.string_types):
+            ordering = (ordering,)
+        values = rows.values(queryset,
+                             *[field.lstrip('-') for field in ordering])
+        page = self.paginate_queryset(values)
+        with timer('serialize'):
+            data = rows.to_representation(values if page is None else page)
+        if page is None:
+            return Response(data)
+        return self.get_paginated_response(data)
+
+
+class ResponseCacheMixin(object):
+    """
+    Serve ``list`` and ``retrieve`` from ``api.cache.response_cache`` when
+    ``API_RESPONSE_CACHE`` is set, along with ``API_SHARED_CACHE``.
+
+    Successful JSON responses are cached by URL, with sorted query
+    parameters, by negotiated media type and by the versions of
+    ``cache_models``, so they are dropped on any change to the data they are
+    built from. Cached responses still answer conditional requests.
+    """
+    cache_models = ()
+    cached_headers = ('Content-Type', 'ETag', 'Last-Modified')
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(
+            super(ResponseCacheMixin, self).list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super(ResponseCacheMixin, self).retrieve, request, *args,
+            **kwargs)
+
+    def get_response_cache_key(self, request):
+        if (not response_cache.is_enabled() or
+                request.accepted_renderer.format != 'json'):
+            return None
+        query = urlencode(sorted(
+            (name, value) for name, values in request.query_params.lists()
+            for value in values))
+        return response_cache.make_key('|'.join((
+            request.scheme, request.get_host(), request.path, query,
+            request.accepted_media_type)), self.cache_models)
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        key = self.get_response_cache_key(request)
+        if key is None:
+            return handler(request, *args, **kwargs)
+        responses = []
+
+        def compute():
+            response = handler(request, *args, **kwargs)
+            responses.append(response)
+            if response.status_code != 200:
+                return None
+            response = self.finalize_response(request, response, *args,
+                                              **kwargs)
+            response.render()
+            return response.content, [
+                (header, response[header]) for header in self.cached_headers
+                if response.has_header(header)]
+
+        cached = response_cache.get_or_set(
+            request.resolver_match.view_name, key, compute)
+        if responses:
+            return responses[0]
+        content, headers = cached
+        headers = dict(headers)
+        etag = headers.get('ETag')
+        last_modified = headers.get('Last-Modified')
+        response = get_conditional_response(
+            request, etag=parse_etags(etag)[0] if etag else None,
+            last_modified=parse_http_date_safe(last_modified)
+            if last_modified else None)
+        if response is None:
+            response = HttpResponse(content)
+        for header, value in headers.items():
+            if response.status_code == 200 or header != 'Content-Type':
+                response[header] = value
+        return response
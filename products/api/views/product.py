@@ -1,13 +1,155 @@
 # -*- encoding: utf-8 -*-
 """Product views."""
 
-from rest_framework import viewsets
+from django.http import StreamingHttpResponse
 
-from api.models.product import Product
+from rest_framework import status, viewsets
+from rest_framework.decorators import list_route
+from rest_framework.response import Response
+
+from api import db
+from api.cache import derived_cache, versions
+from api.documents import ProductDocumentSerializer, documents_enabled
+from api.filters import ProductFilterBackend
+from api.models import Category, Country
+from api.models.product import Product, chunked
+from api.pagination import ProductPagination, SearchPagination
+from api.renderers import NDJSONRenderer, StreamingJSONRenderer
+from api.search import SearchResults
 from api.serializers.product import ProductSerializer
+from api.throttling import SettingsScopedRateThrottle
+from api.views.mixins import (ConditionalMixin, MetricsMixin,
+                              PrimaryWritesMixin, ResponseCacheMixin,
+                              RowsMixin, SparseFieldsViewMixin, make_etag)
+
+
+class ProductSearchMixin(object):
+    """
+    Rank the product list with the search backend when the ``q`` query
+    parameter is given.
+    """
+
+    def list(self, request, *args, **kwargs):
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return super(ProductSearchMixin, self).list(request, *args,
+                                                        **kwargs)
+        paginator = SearchPagination()
+        results = SearchResults(
+            query, self.filter_queryset(self.get_queryset()),
+            filtered=ProductFilterBackend().is_filtered(request))
+        page = paginator.paginate_queryset(results, request, view=self)
+        serializer = self.get_serializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
 
 
-class ProductViewSet(viewsets.ModelViewSet):
+class ProductViewSet(MetricsMixin, PrimaryWritesMixin, ResponseCacheMixin,
+                     ConditionalMixin, SparseFieldsViewMixin,
+                     ProductSearchMixin, RowsMixin, viewsets.ModelViewSet):
     """Product view set."""
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
+    pagination_class = ProductPagination
+    throttle_classes = (SettingsScopedRateThrottle,)
+    throttle_scope = 'products'
+    filter_backends = (ProductFilterBackend,)
+    export_chunk_size = 500
+    # The catalog version covers the vocabulary, extras and logistics, the
+    # reference models the expanded fields.
+    cache_models = (Product, Category, Country)
+
+    def reads_documents(self):
+        # Sparse fieldsets are cheap enough to render from the tables.
+        fields, expand = self.get_sparse_fields()
+        return (self.action in ('list', 'retrieve') and documents_enabled()
+                and fields is None and not expand)
+
+    def renders_rows(self):
+        return (super(ProductViewSet, self).renders_rows() and
+                not self.reads_documents())
+
+    def get_queryset(self):
+        queryset = super(ProductViewSet, self).get_queryset()
+        if self.reads_documents():
+            # The pagination cursor is all that is read from the products.
+            return queryset.only('pk', 'last_modification')
+        if self.action in ('update', 'partial_update', 'destroy'):
+            # The writes only need the product row, perform_update loads
+            # what the response renders once they are done.
+            return queryset
+        return self.with_rendered(queryset)
+
+    def with_rendered(self, queryset):
+        """Load the relations and flags the requested fields render."""
+        fields, expand = self.get_sparse_fields()
+        queryset = queryset.with_related(fields)
+        if fields is None or 'flags' in fields:
+            queryset = queryset.with_flags()
+        return queryset
+
+    def filter_queryset(self, queryset):
+        # The filters narrow the list and its export, a product is reached
+        # by its URL whatever the query parameters.
+        if self.action not in ('list', 'export'):
+            return queryset
+        return super(ProductViewSet, self).filter_queryset(queryset)
+
+    def get_serializer_class(self):
+        if self.reads_documents():
+            return ProductDocumentSerializer
+        return super(ProductViewSet, self).get_serializer_class()
+
+    def get_list_validators(self, request):
+        # The catalog version changes with the products and the vocabulary
+        # they render, the versions of the reference data with the expanded
+        # categories and countries, and none costs a query. There is no
+        # Last-Modified, last_modification misses the vocabulary changes and
+        # has a one second resolution.
+        return make_etag(request, *[versions.get(model._meta.label_lower)
+                                    for model in self.cache_models]), None
+
+    def get_detail_validators(self, request, *args, **kwargs):
+        # The full path of the request names the product.
+        return self.get_list_validators(request)
+
+    def perform_update(self, serializer):
+        super(ProductViewSet, self).perform_update(serializer)
+        serializer.instance = self.with_rendered(
+            super(ProductViewSet, self).get_queryset()).get(
+                pk=serializer.instance.pk)
+
+    @list_route()
+    def facets(self, request):
+        """
+        Product counts per attribute value and per category, recomputed only
+        after the catalog changes.
+        """
+        return Response(derived_cache.get_or_set(
+            'product-facets', Product, Product.objects.facets))
+
+    @list_route(methods=['post'])
+    def bulk(self, request):
+        """Create a list of products in a single transaction."""
+        serializer = self.get_serializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        db.pin_primary()
+        products = serializer.save()
+        return Response({'count': len(products),
+                         'ids': [product.pk for product in products]},
+                        status=status.HTTP_201_CREATED)
+
+    @list_route(renderer_classes=(StreamingJSONRenderer, NDJSONRenderer))
+    def export(self, request):
+        """
+        Stream every product matching the list filters, as a JSON array or
+        as newline delimited JSON with ``?format=ndjson``.
+        """
+        chunks = chunked(self.filter_queryset(self.get_queryset()),
+                         self.export_chunk_size)
+        serializer = self.get_serializer()
+        serializer.check_requested_fields()
+        rows = (serializer.to_representation(product)
+                for chunk in chunks for product in chunk)
+        renderer = request.accepted_renderer
+        return StreamingHttpResponse(renderer.stream(rows),
+                                     content_type=renderer.media_type)
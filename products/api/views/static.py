@@ -1,32 +1,69 @@
 # -*- coding: utf-8 -*-
 """Static views."""
 
+from django.core.exceptions import ObjectDoesNotExist, ValidationError
+from django.http import Http404
+
 from rest_framework import viewsets
+from rest_framework.response import Response
 
+from api.cache import reference_cache
 from api.models import Industry, Country, State, Category
 from api.serializers import (IndustrySerializer, CountrySerializer,
                              StateSerializer, CategorySerializer)
+from api.views.mixins import ConditionalMixin, MetricsMixin, make_etag
+
+
+class ReferenceDataMixin(object):
+    """Serve list and retrieve from the reference data cache."""
+
+    def list(self, request, *args, **kwargs):
+        rows = reference_cache.all(self.queryset.model)
+        return Response(self.get_serializer(rows, many=True).data)
+
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            instance = reference_cache.get(self.queryset.model,
+                                           kwargs[self.lookup_field])
+        except (ObjectDoesNotExist, ValidationError):
+            raise Http404
+        return Response(self.get_serializer(instance).data)
+
+
+class ReferenceViewSet(MetricsMixin, ConditionalMixin, ReferenceDataMixin,
+                       viewsets.ModelViewSet):
+    """
+    Model view set for reference data, reads come from the reference data
+    cache and are validated by the digest of the table.
+    """
+
+    def get_list_validators(self, request):
+        return make_etag(request, reference_cache.digest(
+            self.queryset.model)), None
+
+    def get_detail_validators(self, request, *args, **kwargs):
+        return self.get_list_validators(request)
 
 
-class IndustryViewSet(viewsets.ModelViewSet):
+class IndustryViewSet(ReferenceViewSet):
     """Industry view set."""
     queryset = Industry.objects.all()
     serializer_class = IndustrySerializer
 
 
-class CountryViewSet(viewsets.ModelViewSet):
+class CountryViewSet(ReferenceViewSet):
     """Country view set."""
     queryset = Country.objects.all()
     serializer_class = CountrySerializer
 
 
-class StateViewSet(viewsets.ModelViewSet):
+class StateViewSet(ReferenceViewSet):
     """State view set."""
     queryset = State.objects.all()
     serializer_class = StateSerializer
 
 
-class CategoryViewSet(viewsets.ModelViewSet):
+class CategoryViewSet(ReferenceViewSet):
     """Category view set."""
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
@@ -5,16 +5,20 @@ from django.contrib.auth.models import User
 from rest_framework import viewsets
 
 from api.models.user import UserProfile
+from api.pagination import UserProfilePagination
 from api.serializers.user import UserSerializer, UserProfileSerializer
+from api.views.mixins import MetricsMixin, PrimaryWritesMixin
 
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(MetricsMixin, viewsets.ModelViewSet):
     """User view set."""
     queryset = User.objects.all()
     serializer_class = UserSerializer
 
 
-class UserProfileViewSet(viewsets.ModelViewSet):
+class UserProfileViewSet(MetricsMixin, PrimaryWritesMixin,
+                         viewsets.ModelViewSet):
     """User profile view set."""
-    queryset = UserProfile.objects.all()
+    queryset = UserProfile.objects.select_related('user')
     serializer_class = UserProfileSerializer
+    pagination_class = UserProfilePagination
@@ -0,0 +1,79 @@
+"""
+ASGI config for Test project.
+
+Django 1.10 has no native ASGI support, so the WSGI application is served
+through asgiref's WSGI adapter: the server event loop handles the
+connections and every request runs, from start to finish, on a worker
+thread of a bounded pool, ``ASGI_THREADS`` wide. A request keeps its thread,
+and its thread local database connection, for its whole duration.
+
+The pool is installed as the default executor of the server event loop on
+the lifespan startup event, and shut down on the shutdown one. The server
+has to send them, uvicorn does with its default ``--lifespan auto``.
+
+It exposes the ASGI callable as a module-level variable named
+``application``. It requires Python 3 and ``requirements-asgi.txt``, the
+adapter relies on the internals of asgiref 3.3.
+"""
+
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import asgiref
+from asgiref.sync import SyncToAsync
+from asgiref.wsgi import WsgiToAsgi, WsgiToAsgiInstance
+from django.core.exceptions import ImproperlyConfigured
+from django.core.wsgi import get_wsgi_application
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "products.settings.default")
+
+if not asgiref.__version__.startswith("3.3."):
+    raise ImproperlyConfigured(
+        "products.asgi requires asgiref 3.3, see requirements-asgi.txt, "
+        "%s is installed." % asgiref.__version__)
+
+
+class PooledWsgiToAsgiInstance(WsgiToAsgiInstance):
+    # Since asgiref 3.3 the adapter runs every request on one shared thread
+    # unless it is told the WSGI application is not thread sensitive.
+    run_wsgi_app = SyncToAsync(vars(WsgiToAsgiInstance)["run_wsgi_app"].func,
+                               thread_sensitive=False)
+
+
+class PooledWsgiToAsgi(WsgiToAsgi):
+
+    def __init__(self, wsgi_application, threads):
+        super(PooledWsgiToAsgi, self).__init__(wsgi_application)
+        self.threads = threads
+        self.executor = None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self.lifespan(receive, send)
+            return
+        if self.executor is None:
+            raise RuntimeError(
+                "The request thread pool is not installed, the ASGI server "
+                "sent no lifespan startup event.")
+        await PooledWsgiToAsgiInstance(self.wsgi_application)(
+            scope, receive, send)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                self.executor = ThreadPoolExecutor(
+                    self.threads, thread_name_prefix="asgi")
+                asyncio.get_event_loop().set_default_executor(self.executor)
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                executor, self.executor = self.executor, None
+                if executor is not None:
+                    executor.shutdown()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+
+application = PooledWsgiToAsgi(get_wsgi_application(),
+                               int(os.environ.get("ASGI_THREADS", 16)))
@@ -27,6 +27,9 @@ DEBUG = True
 
 ALLOWED_HOSTS = []
 
+# Addresses allowed to read the API metrics.
+INTERNAL_IPS = ['127.0.0.1']
+
 
 # Application definition
 
@@ -42,6 +45,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.MetricsMiddleware',
+    'api.middleware.ReplicaPinningMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -82,6 +87,93 @@ DATABASES = {
     }
 }
 
+DATABASE_ROUTERS = ['api.db.ReplicaRouter']
+
+# Aliases the reads of the api models are spread over, see api.db.
+API_DATABASE_REPLICAS = []
+
+# Seconds a client keeps reading from the primary after a write.
+API_REPLICA_LAG = 5
+
+
+# Django REST framework
+# http://www.django-rest-framework.org/api-guide/settings/
+
+REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': (
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'api.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
+    'PAGE_SIZE': 50,
+    'DEFAULT_THROTTLE_RATES': {
+        'products': '600/minute',
+    },
+}
+
+API_MAX_PAGE_SIZE = 200
+
+# JSON libraries of the API renderers and parsers, the first installed one
+# is used, see api.encoders and requirements-json.txt.
+API_JSON_BACKENDS = ['orjson', 'ujson', 'json']
+
+# Cache alias shared by every API process, None keeps the API caches
+# (reference data, version tokens) in process memory only. Required when
+# running several processes, each of them only sees its own writes
+# otherwise, and for API_LOCAL_VERSION_TTL seconds serves data derived from
+# before the writes of the others. The api.E001 check requires it when
+# DEBUG is off.
+API_SHARED_CACHE = None
+API_LOCAL_VERSION_TTL = 60
+
+# Product search backend, see api.search.
+API_SEARCH_BACKEND = 'api.search.SQLiteFTS5Backend'
+
+# Serve the product reads from stored JSON documents, run the
+# rebuild_product_documents command after turning it on.
+API_PRODUCT_DOCUMENTS = False
+
+# Render the product and company lists from values() rows instead of model
+# instances, see api.serializers.rows.
+API_ROW_RENDERING = True
+
+# Cache the product and company list and detail responses, see
+# api.cache.ResponseCache, in an LRU of API_RESPONSE_CACHE_SIZE responses
+# kept API_RESPONSE_CACHE_LOCAL_TTL seconds per process and for
+# API_RESPONSE_CACHE_TIMEOUT seconds in the shared cache. Requires
+# API_SHARED_CACHE, nothing is cached without it, see the api.E002 check.
+API_RESPONSE_CACHE = False
+API_RESPONSE_CACHE_SIZE = 256
+API_RESPONSE_CACHE_LOCAL_TTL = 60
+API_RESPONSE_CACHE_TIMEOUT = 300
+
+# Vocabulary terms kept per process by api.models.product.InternTable, so
+# known keywords and attribute values cost no query. Requires
+# API_SHARED_CACHE, which tells the processes about renamed terms.
+API_VOCABULARY_CACHE_SIZE = 10000
+
+# Record the queries and timings of every request, see api.middleware.
+API_METRICS = False
+
+
+# Password hashing
+# https://docs.djangoproject.com/en/1.10/topics/auth/passwords/
+
+PASSWORD_HASHERS = [
+    'api.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.BCryptPasswordHasher',
+]
+
+# PBKDF2 iterations of new password hashes, see api.hashers. Each signup
+# and login costs one hash, measure with the bench_signup command.
+API_PASSWORD_ITERATIONS = 30000
+
 
 # Password validation
 # https://docs.djangoproject.com/en/1.10/ref/settings/#auth-password-validators
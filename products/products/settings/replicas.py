@@ -0,0 +1,24 @@
+"""
+Local read replica settings for Test project.
+
+The primary is db.sqlite3 and the replica db-replica.sqlite3, a copy taken
+by the sync_replica command, so the replica lags behind the primary until
+the next sync:
+
+    ./manage.py migrate --settings=products.settings.replicas
+    ./manage.py sync_replica --settings=products.settings.replicas
+    ./manage.py runserver --settings=products.settings.replicas
+
+Reads of the api models go to the replica, except for the client which
+just wrote, which reads from the primary for API_REPLICA_LAG seconds.
+"""
+
+from products.settings.default import *  # noqa
+
+DATABASES['replica'] = {
+    'ENGINE': 'django.db.backends.sqlite3',
+    'NAME': os.path.join(BASE_DIR, 'db-replica.sqlite3'),
+    'TEST': {'MIRROR': 'default'},
+}
+
+API_DATABASE_REPLICAS = ['replica']